@@ -0,0 +1,238 @@
+"""
+Local stand-in for the change feed WebSocket API, for portal development and tests
+
+Usage: python backend/benchmarks/changeFeedServer.py [--port 8765]
+
+Speaks the protocol of the deployed feed on ws://localhost:<port>/ (subscribe on connect with
+?beatNumber=3&complaintStatus=Open, or send {"action": "subscribe", ...}) and routes deltas with the
+same code as changeFeedStreamFn, from an in-memory subscription index. Stream records are fed in by
+POSTing a DynamoDB stream event ({"Records": [...]}) to /records, or in-process with publish().
+Only the subset of RFC 6455 browsers use is implemented: unfragmented or continued text frames,
+ping and close.
+"""
+import argparse
+import base64
+import hashlib
+import itertools
+import json
+import os
+import socketserver
+import struct
+import sys
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+sys.path[:0] = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda'),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda', 'layers', 'instrumentation_layer', 'python')
+]
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-west-2")
+
+from changeFeed import SubscriptionError, as_list, change_messages, encode, record_delta, route, subscription_topics
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+TEXT, CLOSE, PING, PONG, CONTINUATION = 0x1, 0x8, 0x9, 0xA, 0x0
+
+
+class Connection:
+    def __init__(self, connection_id, stream):
+        self.connection_id = connection_id
+        self.stream = stream
+        self.topics = []
+        self.lock = threading.Lock()
+
+    def send(self, message, opcode=TEXT):
+        payload = message.encode('utf-8') if isinstance(message, str) else message
+        length = len(payload)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        with self.lock:
+            self.stream.write(header + payload)
+            self.stream.flush()
+
+
+class LocalChangeFeed:
+    """In-memory subscription index and fan-out, the local counterpart of the subscription table"""
+
+    def __init__(self):
+        self.connections = {}
+        self.index = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def connect(self, stream):
+        connection = Connection(f"local-{next(self.ids)}", stream)
+        with self.lock:
+            self.connections[connection.connection_id] = connection
+        return connection
+
+    def subscribe(self, connection, request):
+        topics = subscription_topics(request.get('beatNumber'), request.get('complaintStatus'))
+        with self.lock:
+            for topic in connection.topics:
+                self.index.get(topic, set()).discard(connection.connection_id)
+            for topic in topics:
+                self.index.setdefault(topic, set()).add(connection.connection_id)
+            connection.topics = topics
+        return {
+            "type": "subscribed",
+            "beatNumber": sorted(set(as_list(request.get('beatNumber')))),
+            "complaintStatus": sorted(set(as_list(request.get('complaintStatus'))))
+        }
+
+    def disconnect(self, connection):
+        with self.lock:
+            for topic in connection.topics:
+                self.index.get(topic, set()).discard(connection.connection_id)
+            self.connections.pop(connection.connection_id, None)
+
+    def subscribers(self, topics):
+        with self.lock:
+            return {topic: set(self.index.get(topic, ())) for topic in topics}
+
+    def publish(self, records):
+        """Route the deltas of stream records to the subscribed connections, like changeFeedStreamFn"""
+        deltas = [delta for delta in map(record_delta, records) if delta is not None]
+        routed = route(deltas, self.subscribers)
+        sent = 0
+        for connection_id, connection_deltas in routed.items():
+            connection = self.connections.get(connection_id)
+            if connection is None:
+                continue
+            try:
+                for message in change_messages(connection_deltas):
+                    connection.send(message)
+                sent += len(connection_deltas)
+            except OSError:
+                self.disconnect(connection)
+        return {"deltas": len(deltas), "connections": len(routed), "sent": sent}
+
+
+def read_frame(stream):
+    """(opcode, payload) of the next complete client message, continuation frames joined"""
+    opcode, payload = None, b""
+    while True:
+        header = stream.read(2)
+        if len(header) < 2:
+            return CLOSE, b""
+        first, second = header
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', stream.read(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', stream.read(8))[0]
+        mask = stream.read(4) if second & 0x80 else b"\0\0\0\0"
+        data = bytes(byte ^ mask[index % 4] for index, byte in enumerate(stream.read(length)))
+        frame_opcode = first & 0x0F
+        # Control frames may arrive between the fragments of a message
+        if frame_opcode in (CLOSE, PING, PONG):
+            return frame_opcode, data
+        if frame_opcode != CONTINUATION:
+            opcode = frame_opcode
+        payload += data
+        if first & 0x80:
+            return opcode, payload
+
+
+class ChangeFeedHandler(socketserver.StreamRequestHandler):
+    feed = None
+
+    def handle(self):
+        request_line = self.rfile.readline().decode('latin-1').split()
+        if len(request_line) < 2:
+            return
+        method, target = request_line[0], request_line[1]
+        headers = {}
+        for line in iter(self.rfile.readline, b"\r\n"):
+            if not line:
+                return
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if method == 'POST' and urlsplit(target).path == '/records':
+            body = self.rfile.read(int(headers.get('content-length', 0)))
+            self.respond(200, encode(self.feed.publish(json.loads(body or b'{}').get('Records', []))))
+        elif method == 'GET' and headers.get('upgrade', '').lower() == 'websocket':
+            self.websocket(target, headers)
+        else:
+            self.respond(404, encode({"message": "not found"}))
+
+    def respond(self, status, body):
+        self.wfile.write((
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            "Content-Type: application/json\r\nAccess-Control-Allow-Origin: *\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n{body}"
+        ).encode('utf-8'))
+
+    def websocket(self, target, headers):
+        params = parse_qs(urlsplit(target).query)
+        connection = self.feed.connect(self.wfile)
+        try:
+            if params:
+                # The deployed feed refuses the connection when the subscription is invalid
+                self.feed.subscribe(connection, params)
+        except SubscriptionError as e:
+            self.feed.disconnect(connection)
+            self.respond(400, encode({"type": "error", "message": str(e)}))
+            return
+        accept = base64.b64encode(hashlib.sha1((headers.get('sec-websocket-key', '') + WEBSOCKET_GUID).encode()).digest()).decode()
+        self.wfile.write((
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode('latin-1'))
+        self.wfile.flush()
+
+        try:
+            while True:
+                opcode, payload = read_frame(self.rfile)
+                if opcode == CLOSE:
+                    connection.send(payload[:2], CLOSE)
+                    return
+                if opcode == PING:
+                    connection.send(payload, PONG)
+                elif opcode == TEXT:
+                    connection.send(encode(self.message(connection, payload)))
+        except OSError:
+            pass
+        finally:
+            self.feed.disconnect(connection)
+
+    def message(self, connection, payload):
+        """Reply to a client message, as the subscribe and $default routes of changeFeedSocketFn do"""
+        try:
+            request = json.loads(payload.decode('utf-8') or '{}')
+            if request.get('action') == 'subscribe':
+                return self.feed.subscribe(connection, request)
+            return {"type": "pong"}
+        except (SubscriptionError, ValueError) as e:
+            return {"type": "error", "message": str(e)}
+
+
+class ChangeFeedServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port, feed=None):
+        self.feed = feed or LocalChangeFeed()
+        handler = type('BoundChangeFeedHandler', (ChangeFeedHandler,), {'feed': self.feed})
+        super().__init__(('127.0.0.1', port), handler)
+
+    def publish(self, records):
+        return self.feed.publish(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    with ChangeFeedServer(args.port) as server:
+        print(f"Change feed on ws://127.0.0.1:{args.port}/, stream records to http://127.0.0.1:{args.port}/records")
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,409 @@
+"""
+Handler benchmarks against a moto DynamoDB seeded with synthetic Chandler complaints
+
+Usage: python backend/benchmarks/handlerBenchmark.py [--complaints 10000] [--repeat 10] [--only dbQuery]
+           [--save results.json] [--compare baseline.json] [--tolerance 0.25] [--verbose]
+
+Representative API Gateway events (non-proxy, so the event is the request body) and Lex V2
+events are replayed into each handler in-process. Lambda to Lambda invocations are routed to
+the target handler in-process too, so the chatbot numbers include the dbQueryFn calls they
+fan out to. With --compare the run exits non-zero when a scenario's p95 latency or items
+scanned per call regress past the tolerance.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+LAMBDA_DIR = os.path.join(BENCHMARK_DIR, '..', 'lambda')
+sys.path[:0] = [
+    BENCHMARK_DIR,
+    LAMBDA_DIR,
+    os.path.join(LAMBDA_DIR, 'LexBackendFn'),
+    os.path.join(LAMBDA_DIR, 'layers', 'instrumentation_layer', 'python')
+]
+
+# Function names double as keys of the in-process handler registry
+os.environ.update({
+    "AWS_DEFAULT_REGION": "us-west-2",
+    "AWS_ACCESS_KEY_ID": "benchmark",
+    "AWS_SECRET_ACCESS_KEY": "benchmark",
+    "COMPLAINT_TABLE_NAME": "BenchmarkComplaints",
+    "TREND_TABLE_NAME": "BenchmarkTrends",
+    "TEXT_INDEX_TABLE_NAME": "BenchmarkTextIndex",
+    "LOCATION_TABLE_NAME": "BenchmarkLocations",
+    "TILE_TABLE_NAME": "BenchmarkTiles",
+    "LAMBDA_FN_NAME": "beatRetrievalFn",
+    "DB_QUERY_LAMBDA_NAME": "dbQueryFn",
+    "EMAIL_LAMBDA_NAME": "emailHandlerFn",
+    "SPATIAL_QUERY_LAMBDA_NAME": "spatialQueryFn",
+    "LEXBOT_ID": "benchmark",
+    "LEXBOT_ALIAS_ID": "benchmark",
+    "METRICS_NAMESPACE": "ChandlerPDBenchmark"
+})
+
+import boto3
+from moto import mock_aws
+
+from syntheticComplaints import generate_complaints
+
+# Gate on p95 changes above this many milliseconds so tiny scenarios don't flap on noise
+NOISE_FLOOR_MS = 5
+
+
+def create_tables():
+    dynamodb = boto3.resource('dynamodb')
+    complaints = dynamodb.create_table(
+        TableName=os.environ['COMPLAINT_TABLE_NAME'],
+        KeySchema=[{'AttributeName': 'complaintId', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[
+            {'AttributeName': 'complaintId', 'AttributeType': 'S'},
+            {'AttributeName': 'geohashPrefix', 'AttributeType': 'S'},
+            {'AttributeName': 'geohash', 'AttributeType': 'S'},
+            {'AttributeName': 'priorityBeat', 'AttributeType': 'S'},
+            {'AttributeName': 'priorityKey', 'AttributeType': 'S'},
+            {'AttributeName': 'beatNumber', 'AttributeType': 'S'},
+            {'AttributeName': 'complaintStatus', 'AttributeType': 'S'},
+            {'AttributeName': 'dateOfComplaint', 'AttributeType': 'S'},
+            {'AttributeName': 'duplicateCell', 'AttributeType': 'S'},
+            {'AttributeName': 'submittedAt', 'AttributeType': 'S'},
+            {'AttributeName': 'locationKey', 'AttributeType': 'S'}
+        ],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'geohashIndex',
+            'KeySchema': [
+                {'AttributeName': 'geohashPrefix', 'KeyType': 'HASH'},
+                {'AttributeName': 'geohash', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'}
+        }, {
+            'IndexName': 'priorityIndex',
+            'KeySchema': [
+                {'AttributeName': 'priorityBeat', 'KeyType': 'HASH'},
+                {'AttributeName': 'priorityKey', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'}
+        }] + [{
+            'IndexName': f'{partition}DateIndex',
+            'KeySchema': [
+                {'AttributeName': attribute, 'KeyType': 'HASH'},
+                {'AttributeName': 'dateOfComplaint', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'}
+        } for partition, attribute in [('beat', 'beatNumber'), ('status', 'complaintStatus')]] + [{
+            'IndexName': 'duplicateIndex',
+            'KeySchema': [
+                {'AttributeName': 'duplicateCell', 'KeyType': 'HASH'},
+                {'AttributeName': 'submittedAt', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'}
+        }, {
+            'IndexName': 'locationIndex',
+            'KeySchema': [
+                {'AttributeName': 'locationKey', 'KeyType': 'HASH'},
+                {'AttributeName': 'dateOfComplaint', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'}
+        }],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    dynamodb.create_table(
+        TableName=os.environ['TREND_TABLE_NAME'],
+        KeySchema=[{'AttributeName': 'month', 'KeyType': 'HASH'}, {'AttributeName': 'bucket', 'KeyType': 'RANGE'}],
+        AttributeDefinitions=[
+            {'AttributeName': 'month', 'AttributeType': 'S'},
+            {'AttributeName': 'bucket', 'AttributeType': 'S'}
+        ],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    dynamodb.create_table(
+        TableName=os.environ['TEXT_INDEX_TABLE_NAME'],
+        KeySchema=[{'AttributeName': 'term', 'KeyType': 'HASH'}, {'AttributeName': 'complaintId', 'KeyType': 'RANGE'}],
+        AttributeDefinitions=[
+            {'AttributeName': 'term', 'AttributeType': 'S'},
+            {'AttributeName': 'complaintId', 'AttributeType': 'S'}
+        ],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    dynamodb.create_table(
+        TableName=os.environ['LOCATION_TABLE_NAME'],
+        KeySchema=[{'AttributeName': 'locationKey', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[
+            {'AttributeName': 'locationKey', 'AttributeType': 'S'},
+            {'AttributeName': 'beatNumber', 'AttributeType': 'S'},
+            {'AttributeName': 'complaintCount', 'AttributeType': 'N'}
+        ],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'repeatIndex',
+            'KeySchema': [
+                {'AttributeName': 'beatNumber', 'KeyType': 'HASH'},
+                {'AttributeName': 'complaintCount', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'}
+        }],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    dynamodb.create_table(
+        TableName=os.environ['TILE_TABLE_NAME'],
+        KeySchema=[{'AttributeName': 'cell', 'KeyType': 'HASH'}, {'AttributeName': 'bucket', 'KeyType': 'RANGE'}],
+        AttributeDefinitions=[
+            {'AttributeName': 'cell', 'AttributeType': 'S'},
+            {'AttributeName': 'bucket', 'AttributeType': 'S'}
+        ],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    return complaints
+
+def seed(table, count, seed_value):
+    with table.batch_writer() as batch:
+        for item in generate_complaints(count, seed=seed_value):
+            batch.put_item(Item=item)
+
+
+def json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return str(value)
+
+def register_handlers():
+    """Import the handlers and route their Lambda invocations in-process"""
+    import beatGeometryFn, beatRetrievalFn, complaintTileFn, dashboardBootstrapFn, dbQueryFn, initialHeatmapQueryFn, locationBackfillFn, priorityQueueFn
+    import repeatLocationFn, spatialQueryFn, textIndexRebuildFn, tileRebuildFn, trendFn, trendRebuildFn
+    import lambda_function, utils, databaseSearch, query_complaint_handler, nearby_complaint_handler
+
+    handlers = {
+        "beatGeometryFn": beatGeometryFn.lambda_handler,
+        "beatRetrievalFn": beatRetrievalFn.lambda_handler,
+        "complaintTileFn": complaintTileFn.lambda_handler,
+        "dashboardBootstrapFn": dashboardBootstrapFn.lambda_handler,
+        "dbQueryFn": dbQueryFn.lambda_handler,
+        "initialHeatmapQueryFn": initialHeatmapQueryFn.lambda_handler,
+        "locationBackfillFn": locationBackfillFn.lambda_handler,
+        "priorityQueueFn": priorityQueueFn.lambda_handler,
+        "repeatLocationFn": repeatLocationFn.lambda_handler,
+        "spatialQueryFn": spatialQueryFn.lambda_handler,
+        "textIndexRebuildFn": textIndexRebuildFn.lambda_handler,
+        "tileRebuildFn": tileRebuildFn.lambda_handler,
+        "trendFn": trendFn.lambda_handler,
+        "trendRebuildFn": trendRebuildFn.lambda_handler,
+        "LexBackendFn": lambda_function.lambda_handler
+    }
+    try:
+        import hotspotFn, timeHeatmapFn
+        handlers["hotspotFn"] = hotspotFn.lambda_handler
+        handlers["timeHeatmapFn"] = timeHeatmapFn.lambda_handler
+    except ImportError:
+        print("numpy is not installed, skipping the hotspot and time heatmap scenarios")
+
+    def local_invoke(function_name, payload):
+        # Serialize like the Lambda runtime so callers parse the same payload they would in AWS
+        result = handlers[function_name](json.loads(payload), None)
+        return json.dumps(result, default=json_default).encode()
+
+    for module in [utils, databaseSearch, query_complaint_handler, nearby_complaint_handler, spatialQueryFn]:
+        if hasattr(module, 'invoke_lambda'):
+            module.invoke_lambda = local_invoke
+    return handlers
+
+
+def lex_slot(*values):
+    return {"values": [{"value": {"interpretedValue": value}} for value in values]} if values else None
+
+def lex_event(transcript, beats=(), categories=(), statuses=(), days=(), relative_times=()):
+    return {
+        "sessionId": "benchmark",
+        "inputTranscript": transcript,
+        "sessionState": {
+            "intent": {
+                "name": "Query_Complaint_Info",
+                "state": "InProgress",
+                "slots": {
+                    "beatNums": lex_slot(*beats),
+                    "category": lex_slot(*categories),
+                    "status": lex_slot(*statuses),
+                    "daysOfWeek": lex_slot(*days),
+                    "relativeTimes": lex_slot(*relative_times)
+                }
+            }
+        }
+    }
+
+def portal_window(hour_from, hour_to):
+    """ISO timestamps the portal time pickers send for an Arizona local time window"""
+    return f"2025-01-01T{(hour_from + 7) % 24:02d}:00:00.000Z", f"2025-01-01T{(hour_to + 7) % 24:02d}:00:00.000Z"
+
+def scenarios(handlers):
+    """(name, handler, events) replayed by the benchmark; events are cycled through"""
+    evening_from, evening_to = portal_window(17, 20)
+    # Seeded complaints are dated relative to today; a window with partial months at both ends
+    tiles_from, tiles_to = str(date.today() - timedelta(days=200)), str(date.today() - timedelta(days=20))
+    available = [
+        ("dbQuery.firstPage", "dbQueryFn", [{"page": 1}]),
+        ("dbQuery.beatsAndStatus", "dbQueryFn", [
+            {"beatNumber": ["3", "7"], "complaintStatus": "Open", "page": 1},
+            {"beatNumber": ["9"], "complaintStatus": "Red-Star", "page": 1}
+        ]),
+        ("dbQuery.batchBeats", "dbQueryFn", [
+            {"queries": [{"beatNumber": [beat], "page": 1} for beat in ["3", "7", "9", "12"]]}
+        ]),
+        ("dbQuery.sortedNewestInBeats", "dbQueryFn", [
+            {"beatNumber": ["3", "7", "9"], "sort": "dateDesc", "page": 1}
+        ]),
+        ("dbQuery.sortedUrgency", "dbQueryFn", [{"sort": "urgency", "page": 1}]),
+        ("dbQuery.categoryTimeWindow", "dbQueryFn", [
+            {"problemCategory": ["Racing", "Speed"], "startTime": evening_from, "endTime": evening_to, "page": 2}
+        ]),
+        ("dbQuery.textSearch", "dbQueryFn", [
+            {"text": "racing near Arizona Ave", "page": 1},
+            {"text": "speed", "beatNumber": ["7"], "complaintStatus": "Open", "page": 1}
+        ]),
+        ("heatmap.openCases", "initialHeatmapQueryFn", [{}]),
+        # Proxy integration events
+        ("beatGeometry.topojson", "beatGeometryFn", [
+            {"queryStringParameters": {"zoom": "12"}},
+            {"queryStringParameters": {"zoom": "15", "format": "geojson"}}
+        ]),
+        ("tiles.clusters", "complaintTileFn", [
+            {"pathParameters": {"z": "10", "x": "193", "y": "411"}},
+            {"pathParameters": {"z": "12", "x": "775", "y": "1645"}, "queryStringParameters": {"status": "Open", "from": tiles_from, "to": tiles_to}}
+        ]),
+        ("tiles.points", "complaintTileFn", [
+            {"pathParameters": {"z": "16", "x": "12407", "y": "26331"}},
+            {"pathParameters": {"z": "16", "x": "12407", "y": "26331"}, "queryStringParameters": {"category": "Racing,Speed"}}
+        ]),
+        ("dashboard.bootstrap", "dashboardBootstrapFn", [{}]),
+        ("priority.allBeats", "priorityQueueFn", [{"limit": 5}]),
+        ("repeat.topLocations", "repeatLocationFn", [{"limit": 10, "minCount": 1}, {"beatNumber": ["7"], "minCount": 1}]),
+        ("repeat.atIntersection", "repeatLocationFn", [{
+            "location": "intersection", "intersection1Street": "W Ray Rd", "intersection2Direction": "north",
+            "intersection2Street": "Arizona Avenue", "intersectionZipcode": "85224"
+        }]),
+        ("spatial.radius", "spatialQueryFn", [
+            {"lat": 33.3062, "lon": -111.8413, "radius": 800},
+            {"lat": 33.2500, "lon": -111.8750, "radius": 1500, "complaintStatus": "Open"}
+        ]),
+        ("trends.weeklyByBeat", "trendFn", [{"queryStringParameters": {"granularity": "week", "groupBy": "beatNumber"}}]),
+        ("hotspots.racing", "hotspotFn", [{"problemCategory": ["Racing"]}]),
+        ("timeHeatmap.all", "timeHeatmapFn", [{}]),
+        ("lex.beatStatus", "LexBackendFn", [lex_event("show open complaints in beat 7", beats=["7"], statuses=["Open"])]),
+        ("lex.categoryAllStatuses", "LexBackendFn", [
+            lex_event("racing complaints this month", categories=["Racing"], relative_times=["This month"])
+        ]),
+        ("lex.weekendDays", "LexBackendFn", [
+            lex_event("speeding on weekends in beat 9", beats=["9"], categories=["Speed"], days=["Saturday", "Sunday"])
+        ])
+    ]
+    return [(name, handlers[function], events) for name, function, events in available if function in handlers]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest rank percentile"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def run_scenario(handler, events, repeat):
+    import instrumentation
+
+    handler(events[0], None)  # warm up module caches, like a warm Lambda container
+
+    latencies = []
+    with instrumentation.collecting() as collector:
+        for index in range(repeat):
+            start = time.perf_counter()
+            handler(events[index % len(events)], None)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    # Memory is measured on a separate call since tracemalloc slows everything down
+    tracemalloc.start()
+    with instrumentation.collecting():
+        handler(events[0], None)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "calls": repeat,
+        "p50Ms": round(percentile(latencies, 0.50), 2),
+        "p95Ms": round(percentile(latencies, 0.95), 2),
+        "p99Ms": round(percentile(latencies, 0.99), 2),
+        "maxMs": round(latencies[-1], 2),
+        "itemsScanned": round(sum(collector.metric("ItemsScanned")) / repeat, 1),
+        "itemsReturned": round(sum(collector.metric("ItemsReturned")) / repeat, 1),
+        "readCapacity": round(sum(collector.metric("DynamoDBReadCapacity")) / repeat, 1),
+        "peakMemoryMB": round(peak / 1e6, 1)
+    }
+
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        limit = previous["p95Ms"] * (1 + tolerance)
+        if result["p95Ms"] > limit and result["p95Ms"] - previous["p95Ms"] > NOISE_FLOOR_MS:
+            regressions.append(f"{name}: p95 {previous['p95Ms']} -> {result['p95Ms']} ms")
+        if result["itemsScanned"] > previous["itemsScanned"] * (1 + tolerance):
+            regressions.append(f"{name}: items scanned {previous['itemsScanned']} -> {result['itemsScanned']}")
+    return regressions
+
+def print_table(results):
+    columns = ["p50Ms", "p95Ms", "p99Ms", "maxMs", "itemsScanned", "itemsReturned", "readCapacity", "peakMemoryMB"]
+    width = max(len(name) for name in results) + 2
+    print("scenario".ljust(width) + "".join(column.rjust(14) for column in columns))
+    for name, result in results.items():
+        print(name.ljust(width) + "".join(str(result[column]).rjust(14) for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--complaints', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--only', help="Run scenarios whose name starts with this prefix")
+    parser.add_argument('--save', help="Write results as JSON, e.g. to use as a baseline")
+    parser.add_argument('--compare', help="Baseline JSON from a previous --save run")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--verbose', action='store_true', help="Show what the handlers print")
+    args = parser.parse_args()
+
+    with mock_aws():
+        start = time.perf_counter()
+        seed(create_tables(), args.complaints, args.seed)
+        print(f"Seeded {args.complaints} synthetic complaints in {time.perf_counter() - start:.1f}s")
+
+        handlers = register_handlers()
+        results = {}
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+            handlers["trendRebuildFn"]({}, None)
+            handlers["textIndexRebuildFn"]({}, None)
+            handlers["locationBackfillFn"]({}, None)
+            handlers["tileRebuildFn"]({}, None)
+            for name, handler, events in scenarios(handlers):
+                if args.only and not name.startswith(args.only):
+                    continue
+                results[name] = run_scenario(handler, events, args.repeat)
+
+    print(f"\nHandler benchmark: {args.complaints} complaints, {args.repeat} calls per scenario")
+    print_table(results)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against " + args.compare + ":\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions against " + args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark for the hotspot engine on synthetic complaints
+
+Usage: python backend/benchmarks/hotspotBenchmark.py [--points 100000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from hotspotEngine import DAYS_OF_WEEK, build_point_arrays, filter_mask, detect_hotspots, to_geojson
+
+CATEGORIES = ["Stop sign", "School traffic complaint", "Racing", "Speed", "Red light", "Reckless Driving"]
+STATUSES = ["Open", "Follow-Up", "Closed", "Red-Star"]
+# Rough Chandler extent
+MIN_LON, MAX_LON, MIN_LAT, MAX_LAT = -111.98, -111.72, 33.20, 33.36
+
+
+def synthetic_items(n, seed=7):
+    """Complaint items with 30% of points around a handful of intersections"""
+    rng = random.Random(seed)
+    centers = [(rng.uniform(MIN_LON, MAX_LON), rng.uniform(MIN_LAT, MAX_LAT)) for _ in range(12)]
+    items = []
+    for _ in range(n):
+        if rng.random() < 0.3:
+            lon, lat = rng.choice(centers)
+            lon, lat = rng.gauss(lon, 0.0008), rng.gauss(lat, 0.0008)
+        else:
+            lon, lat = rng.uniform(MIN_LON, MAX_LON), rng.uniform(MIN_LAT, MAX_LAT)
+        start = rng.randrange(0, 1440)
+        items.append({
+            "coordinates": (str(lon), str(lat)),
+            "problemCategory": rng.choice(CATEGORIES),
+            "complaintStatus": rng.choice(STATUSES),
+            "daysOfWeek": rng.sample(DAYS_OF_WEEK, rng.randint(1, 3)),
+            "startTime": f"{start // 60:02d}:{start % 60:02d}:00",
+            "endTime": f"{(start + 120) % 1440 // 60:02d}:{(start + 120) % 60:02d}:00",
+            "dateOfComplaint": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        })
+    return items
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    items = synthetic_items(args.points)
+    print(f"Hotspot benchmark: {args.points} points, best of {args.repeat}")
+
+    best = {}
+    for _ in range(args.repeat):
+        points, t_build = timed(build_point_arrays, items)
+        mask, t_filter = timed(filter_mask, points, ["Racing", "Speed"], ["Open", "Red-Star"], ["Friday", "Saturday"], "20:00", "02:00")
+        hotspots, t_all = timed(detect_hotspots, points['lon'], points['lat'])
+        filtered, t_filtered = timed(detect_hotspots, points['lon'][mask], points['lat'][mask], min_points=2)
+        geojson, t_geojson = timed(to_geojson, hotspots, include_cells=True)
+        for name, value in [("build arrays", t_build), ("filter", t_filter), ("detect (all points)", t_all),
+                            ("detect (filtered)", t_filtered), ("geojson", t_geojson)]:
+            best[name] = min(best.get(name, value), value)
+
+    # Memory is traced in a separate pass since tracing slows everything down
+    tracemalloc.start()
+    points = build_point_arrays(items)
+    to_geojson(detect_hotspots(points['lon'], points['lat']), include_cells=True)
+    best["peak memory MB"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+
+    for name, value in best.items():
+        unit = "" if name.endswith("MB") else " ms"
+        print(f"  {name:<22} {value:10.1f}{unit}")
+    print(f"  clusters (all points)  {len(hotspots['clusters']):10d}")
+    print(f"  matching filter        {int(mask.sum()):10d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Synthetic Chandler complaints for benchmarks
+
+Points are sampled inside the real beat polygons with a skewed beat, category and status
+mix, and each complaint gets weekday and time-of-day windows shaped by its category.
+Items go through build_complaint_item so they carry the same attributes as portal intake.
+"""
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'lambda'))
+
+from beatGeometry import beat_numbers, load_beats, point_in_beat
+from complaintItems import build_complaint_item
+
+PHOENIX = timezone(timedelta(hours=-7))
+
+# Every beat of the beat data, so 0, 18 and 3M get complaints too
+BEAT_NUMBERS = beat_numbers()
+# Share of complaints geocoded outside every beat, stored without a beat number
+NO_BEAT_SHARE = 0.02
+
+CATEGORY_WEIGHTS = {
+    "Speed": 0.32, "Racing": 0.20, "Reckless Driving": 0.18,
+    "Stop sign": 0.12, "Red light": 0.10, "School traffic complaint": 0.08
+}
+STATUS_WEIGHTS = {"Closed": 0.45, "Open": 0.35, "Follow-Up": 0.14, "Red-Star": 0.06}
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+WEEKEND = ["Saturday", "Sunday"]
+
+# (start hour, spread in hours) of the windows each category is usually reported for
+TIME_PROFILES = {
+    "School traffic complaint": [(7, 0.5), (14.5, 0.5)],
+    "Racing": [(22, 1.5)],
+    "Reckless Driving": [(17, 2), (23, 1.5)],
+    "Speed": [(8, 1.5), (17, 1.5)],
+    "Stop sign": [(8, 2), (16, 2)],
+    "Red light": [(12, 4)]
+}
+
+STREETS = ["Arizona Ave", "Alma School Rd", "Dobson Rd", "McQueen Rd", "Gilbert Rd", "Chandler Blvd", "Ray Rd", "Warner Rd"]
+
+
+def weighted_choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+def beat_weights(beats, rng):
+    """Zipf-like weights so a few beats get most complaints, as in the real data"""
+    order = list(range(len(beats)))
+    rng.shuffle(order)
+    return [1 / (order[index] + 1) ** 0.8 for index in range(len(beats))]
+
+def sample_point(beat, rng):
+    """Rejection sample a (lon, lat) inside a beat polygon"""
+    min_lon, min_lat, max_lon, max_lat = beat['bbox']
+    while True:
+        lon, lat = rng.uniform(min_lon, max_lon), rng.uniform(min_lat, max_lat)
+        if point_in_beat(lon, lat, beat):
+            return lon, lat
+
+def sample_days(rng):
+    if rng.random() < 0.7:
+        return sorted(rng.sample(WEEKDAYS, rng.randint(1, 3)), key=WEEKDAYS.index)
+    return rng.sample(WEEKEND, rng.randint(1, 2))
+
+def sample_window(category, day, rng):
+    """Local start and end datetimes of the reported activity window"""
+    hour, spread = rng.choice(TIME_PROFILES[category])
+    start_minutes = int(rng.gauss(hour, spread) * 60) % (24 * 60)
+    start_minutes -= start_minutes % 5
+    start = datetime(day.year, day.month, day.day, tzinfo=PHOENIX) + timedelta(minutes=start_minutes)
+    return start, start + timedelta(minutes=rng.choice([15, 30, 60, 90, 120, 180]))
+
+def generate_complaints(n, seed=7, days_back=365, today=None):
+    """Yield n synthetic complaint items"""
+    rng = random.Random(seed)
+    beats = [beat for beat in load_beats() if beat['beat'] in BEAT_NUMBERS]
+    weights = beat_weights(beats, rng)
+    today = today or date.today()
+
+    for index in range(n):
+        beat = rng.choices(beats, weights=weights)[0]
+        lon, lat = sample_point(beat, rng)
+        category = weighted_choice(rng, CATEGORY_WEIGHTS)
+        day = today - timedelta(days=int(rng.triangular(0, days_back, 0)))
+        start, end = sample_window(category, day, rng)
+        event = {
+            "firstName": "Test",
+            "lastName": f"Resident{index % 500}",
+            "daysOfWeek": sample_days(rng),
+            "startTime": start.isoformat(),
+            "endTime": end.isoformat(),
+            "location": "address",
+            "addressDirection": rng.choice(["N", "S", "E", "W"]),
+            "addressStreet": f"{rng.randint(100, 4999)} {rng.choice(STREETS)}",
+            "addressZipcode": rng.choice(["85224", "85225", "85226", "85286", "85248", "85249"]),
+            "problemCategory": category,
+            "description": f"Synthetic {category.lower()} complaint near {rng.choice(STREETS)}",
+            "isUrgentChecked": rng.random() < 0.05,
+            "subscribeToAlerts": rng.choice(["Yes", "No"])
+        }
+        yield build_complaint_item(
+            event,
+            f"{index:08x}",
+            "" if rng.random() < NO_BEAT_SHARE else beat['beat'],
+            (str(round(lon, 6)), str(round(lat, 6))),
+            status=weighted_choice(rng, STATUS_WEIGHTS),
+            date_of_complaint=day
+        )
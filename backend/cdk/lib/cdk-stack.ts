@@ -3,7 +3,13 @@ import { Construct } from "constructs";
 import * as lambda from "aws-cdk-lib/aws-lambda";
 import * as dynamodb from "aws-cdk-lib/aws-dynamodb";
 import * as apigateway from "aws-cdk-lib/aws-apigateway";
+import * as apigatewayv2 from "aws-cdk-lib/aws-apigatewayv2";
+import * as apigatewayv2Integrations from "aws-cdk-lib/aws-apigatewayv2-integrations";
 import * as ses from "aws-cdk-lib/aws-ses";
+import * as s3 from "aws-cdk-lib/aws-s3";
+import * as lambdaEventSources from "aws-cdk-lib/aws-lambda-event-sources";
+import * as events from "aws-cdk-lib/aws-events";
+import * as targets from "aws-cdk-lib/aws-events-targets";
 import * as amplify from "@aws-cdk/aws-amplify-alpha";
 import * as secretsmanager from "aws-cdk-lib/aws-secretsmanager";
 import * as iam from "aws-cdk-lib/aws-iam";
@@ -29,10 +35,140 @@ export class CdkStack extends cdk.Stack {
     // add api gateway, dynamodb, ses and 4 lambda functions: Add/update complaint, Query db, email invocation, chatbot open, chatbot process and heatmap api
     const complaintTable = new dynamodb.Table(this, "ComplaintTable", {
       partitionKey: { name: "complaintId", type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
       removalPolicy: cdk.RemovalPolicy.DESTROY,
+      stream: dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
     });
     const complaintTableArn = complaintTable.tableArn;
 
+    // CloudFormation adds at most one GSI per table in a stack update. A new stack creates every index with its
+    // table; an existing one is brought up to date with `-c indexRolloutStep=N`, N = 1, 2, ... on successive
+    // deploys, which keeps only the first N indexes of each list below (see "Upgrading an existing stack" in the README).
+    // New indexes therefore go at the end of their table's list
+    const indexRolloutStep = this.node.tryGetContext("indexRolloutStep");
+    const rolledOut = (indexes: dynamodb.GlobalSecondaryIndexProps[]) =>
+      indexRolloutStep === undefined ? indexes : indexes.slice(0, Number(indexRolloutStep));
+
+    const complaintIndexes: dynamodb.GlobalSecondaryIndexProps[] = [
+      // Sparse index over complaints with coordinates, partitioned by a ~5 km geohash prefix
+      {
+        indexName: "geohashIndex",
+        partitionKey: { name: "geohashPrefix", type: dynamodb.AttributeType.STRING },
+        sortKey: { name: "geohash", type: dynamodb.AttributeType.STRING },
+        projectionType: dynamodb.ProjectionType.ALL,
+      },
+      // Sparse index over open urgent or Red-Star complaints, per beat, sorted by "rank#submission time".
+      // Full rows, so sorted views can filter on any attribute and return grid rows directly
+      {
+        indexName: "priorityIndex",
+        partitionKey: { name: "priorityBeat", type: dynamodb.AttributeType.STRING },
+        sortKey: { name: "priorityKey", type: dynamodb.AttributeType.STRING },
+        projectionType: dynamodb.ProjectionType.ALL,
+      },
+      // Complaints of a beat / of a status newest first, read by the sorted views of the filter API
+      {
+        indexName: "beatDateIndex",
+        partitionKey: { name: "beatNumber", type: dynamodb.AttributeType.STRING },
+        sortKey: { name: "dateOfComplaint", type: dynamodb.AttributeType.STRING },
+        projectionType: dynamodb.ProjectionType.ALL,
+      },
+      {
+        indexName: "statusDateIndex",
+        partitionKey: { name: "complaintStatus", type: dynamodb.AttributeType.STRING },
+        sortKey: { name: "dateOfComplaint", type: dynamodb.AttributeType.STRING },
+        projectionType: dynamodb.ProjectionType.ALL,
+      },
+      // Sparse index of recent-complaint candidates for duplicate detection at intake, per ~1 km geohash
+      // cell and category, sorted by submission time; carries only what the similarity score reads
+      {
+        indexName: "duplicateIndex",
+        partitionKey: { name: "duplicateCell", type: dynamodb.AttributeType.STRING },
+        sortKey: { name: "submittedAt", type: dynamodb.AttributeType.STRING },
+        projectionType: dynamodb.ProjectionType.INCLUDE,
+        nonKeyAttributes: [
+          "description", "activeSlots", "startTime", "endTime", "daysOfWeek",
+          "lat", "lon", "beatNumber", "complaintStatus", "duplicateOf",
+        ],
+      },
+      // Complaints at one canonical address or intersection newest first, read by the repeat-location API
+      {
+        indexName: "locationIndex",
+        partitionKey: { name: "locationKey", type: dynamodb.AttributeType.STRING },
+        sortKey: { name: "dateOfComplaint", type: dynamodb.AttributeType.STRING },
+        projectionType: dynamodb.ProjectionType.ALL,
+      },
+    ];
+    rolledOut(complaintIndexes).forEach((index) => complaintTable.addGlobalSecondaryIndex(index));
+
+    // Complaints closed for longer than the retention window, moved out of the complaints table by the archive job
+    const archiveTable = new dynamodb.Table(this, "ComplaintArchiveTable", {
+      partitionKey: { name: "complaintId", type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+    // The sorted views merge archived complaints in when the filters reach the archive, as the unsorted ones do
+    const archiveIndexes: dynamodb.GlobalSecondaryIndexProps[] = [
+      {
+        indexName: "beatDateIndex",
+        partitionKey: { name: "beatNumber", type: dynamodb.AttributeType.STRING },
+        sortKey: { name: "dateOfComplaint", type: dynamodb.AttributeType.STRING },
+        projectionType: dynamodb.ProjectionType.ALL,
+      },
+      {
+        indexName: "statusDateIndex",
+        partitionKey: { name: "complaintStatus", type: dynamodb.AttributeType.STRING },
+        sortKey: { name: "dateOfComplaint", type: dynamodb.AttributeType.STRING },
+        projectionType: dynamodb.ProjectionType.ALL,
+      },
+    ];
+    rolledOut(archiveIndexes).forEach((index) => archiveTable.addGlobalSecondaryIndex(index));
+
+    // Daily complaint counts per beat, category and status, partitioned by month
+    const trendTable = new dynamodb.Table(this, "ComplaintTrendTable", {
+      partitionKey: { name: "month", type: dynamodb.AttributeType.STRING },
+      sortKey: { name: "bucket", type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+
+    // Inverted index over complaint descriptions and officer notes: one posting per (term, complaint)
+    const textIndexTable = new dynamodb.Table(this, "ComplaintTextIndexTable", {
+      partitionKey: { name: "term", type: dynamodb.AttributeType.STRING },
+      sortKey: { name: "complaintId", type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+
+    // Complaint counts per canonical location, kept by the table stream; indexed per beat by count for the top repeat locations
+    const locationTable = new dynamodb.Table(this, "ComplaintLocationTable", {
+      partitionKey: { name: "locationKey", type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+    locationTable.addGlobalSecondaryIndex({
+      indexName: "repeatIndex",
+      partitionKey: { name: "beatNumber", type: dynamodb.AttributeType.STRING },
+      sortKey: { name: "complaintCount", type: dynamodb.AttributeType.NUMBER },
+      projectionType: dynamodb.ProjectionType.ALL,
+    });
+
+    // Complaint counts and coordinate sums per geohash cell and month/day, status and category, kept by the table stream for the map tiles
+    const tileTable = new dynamodb.Table(this, "ComplaintTileTable", {
+      partitionKey: { name: "cell", type: dynamodb.AttributeType.STRING },
+      sortKey: { name: "bucket", type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+    });
+
+    // Change feed subscription index: one item per (beat#status topic, WebSocket connection), plus one per connection listing its topics
+    const subscriptionTable = new dynamodb.Table(this, "ChangeFeedSubscriptionTable", {
+      partitionKey: { name: "topic", type: dynamodb.AttributeType.STRING },
+      sortKey: { name: "connectionId", type: dynamodb.AttributeType.STRING },
+      billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      timeToLiveAttribute: "expiresAt",
+    });
+
     // Create the lambda layer for time zone conversions
     const lexBackendLayer = new lambda.LayerVersion(this, "LexBackendLayer", {
       code: lambda.Code.fromAsset("../lambda/layers/lex_backend_layer"),
@@ -46,22 +182,43 @@ export class CdkStack extends cdk.Stack {
       description: "Layer for beat retrieval dependencies",
     });
 
+    // Shared metrics and structured logging, used by every handler
+    const instrumentationLayer = new lambda.LayerVersion(this, "InstrumentationLayer", {
+      code: lambda.Code.fromAsset("../lambda/layers/instrumentation_layer"),
+      compatibleRuntimes: [lambda.Runtime.PYTHON_3_13],
+      description: "Layer for embedded metric instrumentation and structured logging",
+    });
+
+    // AWS managed SDK for pandas layer, provides numpy for the analytics functions
+    const numpyLayer = lambda.LayerVersion.fromLayerVersionArn(
+      this,
+      "NumpyLayer",
+      this.node.tryGetContext("numpyLayerArn") || `arn:aws:lambda:${cdk.Stack.of(this).region}:336392948345:layer:AWSSDKPandas-Python313:1`
+    );
+
     const beatRetrievalLambda = new lambda.Function(this, "beatRetrievalLambda", {
       runtime: lambda.Runtime.PYTHON_3_13,
       handler: "beatRetrievalFn.lambda_handler",
       code: lambda.Code.fromAsset("../lambda"),
+      // Bulk imports send up to 500 addresses: five batch geocoder requests plus single lookups for the misses
+      timeout: cdk.Duration.minutes(5),
+      memorySize: 512,
       environment: {
         COMPLAINT_TABLE_NAME: complaintTable.tableName,
       },
-      layers: [beatRetrievalLayer],
+      layers: [beatRetrievalLayer, instrumentationLayer],
     });
 
     const DBManagementLambda = new lambda.Function(this, "DBManagementLambda", {
       runtime: lambda.Runtime.PYTHON_3_13,
       handler: "dbManagementFn.lambda_handler",
       code: lambda.Code.fromAsset("../lambda"),
+      // A bulk update applies up to 500 UpdateItems, 16 at a time, well past the default 3 s
+      timeout: cdk.Duration.seconds(60),
+      memorySize: 512,
       environment: {
         COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        ARCHIVE_TABLE_NAME: archiveTable.tableName,
         LAMBDA_FN_NAME: beatRetrievalLambda.functionName,
       },
       role: new iam.Role(this, "DBManagementLambdaRole", {
@@ -78,14 +235,53 @@ export class CdkStack extends cdk.Stack {
           }),
         },
       }),
+      layers: [instrumentationLayer],
+    });
+    // Bucket holding bulk import files and their progress checkpoints
+    const importBucket = new s3.Bucket(this, "ComplaintImportBucket", {
+      removalPolicy: cdk.RemovalPolicy.DESTROY,
+      autoDeleteObjects: true,
+    });
+
+    const bulkImportLambda = new lambda.Function(this, "BulkImportLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "bulkImportFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 1024,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        LAMBDA_FN_NAME: beatRetrievalLambda.functionName,
+        IMPORT_BUCKET_NAME: importBucket.bucketName,
+      },
+      role: new iam.Role(this, "BulkImportLambdaRole", {
+        assumedBy: new iam.ServicePrincipal("lambda.amazonaws.com"),
+        managedPolicies: [iam.ManagedPolicy.fromAwsManagedPolicyName("service-role/AWSLambdaBasicExecutionRole")],
+        inlinePolicies: {
+          LambdaInvokePolicy: new iam.PolicyDocument({
+            statements: [
+              new iam.PolicyStatement({
+                actions: ["lambda:InvokeFunction"],
+                resources: ["*"],
+              }),
+            ],
+          }),
+        },
+      }),
+      layers: [instrumentationLayer],
     });
+    importBucket.grantReadWrite(bulkImportLambda);
+
     const dbQueryLambda = new lambda.Function(this, "dbQueryLambda", {
       runtime: lambda.Runtime.PYTHON_3_13,
       handler: "dbQueryFn.lambda_handler",
       code: lambda.Code.fromAsset("../lambda"),
       environment: {
         COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        ARCHIVE_TABLE_NAME: archiveTable.tableName,
+        TEXT_INDEX_TABLE_NAME: textIndexTable.tableName,
       },
+      layers: [instrumentationLayer],
     });
     const emailHandlerLambda = new lambda.Function(this, "EmailHandlerLambda", {
       runtime: lambda.Runtime.PYTHON_3_13,
@@ -99,6 +295,7 @@ export class CdkStack extends cdk.Stack {
         assumedBy: new iam.ServicePrincipal("lambda.amazonaws.com"),
         managedPolicies: [iam.ManagedPolicy.fromAwsManagedPolicyName("service-role/AWSLambdaBasicExecutionRole"), iam.ManagedPolicy.fromAwsManagedPolicyName("AmazonSESFullAccess")],
       }),
+      layers: [instrumentationLayer],
     });
     const heatmapLambda = new lambda.Function(this, "HeatmapLambda", {
       runtime: lambda.Runtime.PYTHON_3_13,
@@ -107,6 +304,365 @@ export class CdkStack extends cdk.Stack {
       environment: {
         COMPLAINT_TABLE_NAME: complaintTable.tableName,
       },
+      layers: [instrumentationLayer],
+    });
+    // Top urgent / Red-Star complaints per beat, one Query of the priority index per beat
+    const priorityQueueLambda = new lambda.Function(this, "PriorityQueueLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "priorityQueueFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(30),
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    // Simplified beat boundaries per zoom level; the geometry ships with the function in data/beats.json
+    const beatGeometryLambda = new lambda.Function(this, "BeatGeometryLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "beatGeometryFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(10),
+      layers: [instrumentationLayer],
+    });
+    // Writes the priority index attributes on complaints stored before the index existed
+    const priorityBackfillLambda = new lambda.Function(this, "PriorityBackfillLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "priorityBackfillFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 1024,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    // Everything the portal needs on load in one response, replacing beat-open-cases + the first filter query
+    const dashboardBootstrapLambda = new lambda.Function(this, "DashboardBootstrapLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "dashboardBootstrapFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(30),
+      memorySize: 512,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    const hotspotLambda = new lambda.Function(this, "HotspotLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "hotspotFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(60),
+      memorySize: 1536,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+      },
+      layers: [numpyLayer, instrumentationLayer],
+    });
+    const timeHeatmapLambda = new lambda.Function(this, "TimeHeatmapLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "timeHeatmapFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(60),
+      memorySize: 1024,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+      },
+      layers: [numpyLayer, instrumentationLayer],
+    });
+    const spatialQueryLambda = new lambda.Function(this, "SpatialQueryLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "spatialQueryFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(30),
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        ARCHIVE_TABLE_NAME: archiveTable.tableName,
+        LAMBDA_FN_NAME: beatRetrievalLambda.functionName,
+      },
+      layers: [instrumentationLayer],
+    });
+    beatRetrievalLambda.grantInvoke(spatialQueryLambda);
+
+    // One-off migration adding lat/lon and geohash attributes to existing complaints
+    const geohashBackfillLambda = new lambda.Function(this, "GeohashBackfillLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "geohashBackfillFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 1024,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+
+    // One-off migration rewriting legacy complaint items in the compact encoding
+    const itemCompactionLambda = new lambda.Function(this, "ItemCompactionLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "itemCompactionFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 1024,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        ARCHIVE_TABLE_NAME: archiveTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+
+    const trendStreamLambda = new lambda.Function(this, "TrendStreamLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "trendStreamFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(60),
+      deadLetterQueueEnabled: true,
+      environment: {
+        TREND_TABLE_NAME: trendTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    const trendLambda = new lambda.Function(this, "TrendLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "trendFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(30),
+      environment: {
+        TREND_TABLE_NAME: trendTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    // Rebuilds the trend buckets from history, run once after deploying and whenever counts drift
+    const trendRebuildLambda = new lambda.Function(this, "TrendRebuildLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "trendRebuildFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 1024,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        ARCHIVE_TABLE_NAME: archiveTable.tableName,
+        TREND_TABLE_NAME: trendTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    const textIndexStreamLambda = new lambda.Function(this, "TextIndexStreamLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "textIndexStreamFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(60),
+      deadLetterQueueEnabled: true,
+      environment: {
+        TEXT_INDEX_TABLE_NAME: textIndexTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    // Builds the text index from existing complaints, run once after deploying and whenever it drifts
+    const textIndexRebuildLambda = new lambda.Function(this, "TextIndexRebuildLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "textIndexRebuildFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 1024,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        ARCHIVE_TABLE_NAME: archiveTable.tableName,
+        TEXT_INDEX_TABLE_NAME: textIndexTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    const locationStreamLambda = new lambda.Function(this, "LocationStreamLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "locationStreamFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(60),
+      deadLetterQueueEnabled: true,
+      environment: {
+        LOCATION_TABLE_NAME: locationTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    // Complaints at one location, or the top repeat locations per beat
+    const repeatLocationLambda = new lambda.Function(this, "RepeatLocationLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "repeatLocationFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(30),
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        LOCATION_TABLE_NAME: locationTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    // Writes location keys on existing complaints and rebuilds the counters, run once after deploying and whenever they drift
+    const locationBackfillLambda = new lambda.Function(this, "LocationBackfillLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "locationBackfillFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 1024,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        ARCHIVE_TABLE_NAME: archiveTable.tableName,
+        LOCATION_TABLE_NAME: locationTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    // Reassigns stored beat numbers from coordinates after beat boundaries change; resumable, checkpoints in the import bucket
+    const rebeatLambda = new lambda.Function(this, "RebeatLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "rebeatFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 1536,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        ARCHIVE_TABLE_NAME: archiveTable.tableName,
+        IMPORT_BUCKET_NAME: importBucket.bucketName,
+        // Archived complaints have no table stream, so their derived tables are rebuilt after they move beats
+        TREND_REBUILD_FN_NAME: trendRebuildLambda.functionName,
+        TEXT_INDEX_REBUILD_FN_NAME: textIndexRebuildLambda.functionName,
+        LOCATION_BACKFILL_FN_NAME: locationBackfillLambda.functionName,
+      },
+      role: new iam.Role(this, "RebeatLambdaRole", {
+        assumedBy: new iam.ServicePrincipal("lambda.amazonaws.com"),
+        managedPolicies: [iam.ManagedPolicy.fromAwsManagedPolicyName("service-role/AWSLambdaBasicExecutionRole")],
+        inlinePolicies: {
+          LambdaInvokePolicy: new iam.PolicyDocument({
+            statements: [
+              new iam.PolicyStatement({
+                actions: ["lambda:InvokeFunction"],
+                resources: ["*"],
+              }),
+            ],
+          }),
+        },
+      }),
+      layers: [numpyLayer, instrumentationLayer],
+    });
+    importBucket.grantReadWrite(rebeatLambda);
+    const tileStreamLambda = new lambda.Function(this, "TileStreamLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "tileStreamFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(60),
+      deadLetterQueueEnabled: true,
+      environment: {
+        TILE_TABLE_NAME: tileTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    // Rebuilds the tile buckets from the complaints table, run once after deploying and whenever they drift
+    const tileRebuildLambda = new lambda.Function(this, "TileRebuildLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "tileRebuildFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 1024,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        TILE_TABLE_NAME: tileTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    // Complaint map tiles: clusters from the tile buckets at low zoom, individual complaints when zoomed in
+    const complaintTileLambda = new lambda.Function(this, "ComplaintTileLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "complaintTileFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(10),
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        TILE_TABLE_NAME: tileTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    // Live change feed: portal sessions subscribe by beat and status over a WebSocket API and receive complaint deltas from the table stream
+    const changeFeedSocketLambda = new lambda.Function(this, "ChangeFeedSocketLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "changeFeedSocketFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(10),
+      environment: {
+        SUBSCRIPTION_TABLE_NAME: subscriptionTable.tableName,
+      },
+      layers: [instrumentationLayer],
+    });
+    const changeFeedApi = new apigatewayv2.WebSocketApi(this, "ChangeFeedApi", {
+      connectRouteOptions: { integration: new apigatewayv2Integrations.WebSocketLambdaIntegration("ChangeFeedConnect", changeFeedSocketLambda) },
+      disconnectRouteOptions: { integration: new apigatewayv2Integrations.WebSocketLambdaIntegration("ChangeFeedDisconnect", changeFeedSocketLambda) },
+      defaultRouteOptions: { integration: new apigatewayv2Integrations.WebSocketLambdaIntegration("ChangeFeedDefault", changeFeedSocketLambda), returnResponse: true },
+    });
+    changeFeedApi.addRoute("subscribe", {
+      integration: new apigatewayv2Integrations.WebSocketLambdaIntegration("ChangeFeedSubscribe", changeFeedSocketLambda),
+      returnResponse: true,
+    });
+    const changeFeedStage = new apigatewayv2.WebSocketStage(this, "ChangeFeedStage", {
+      webSocketApi: changeFeedApi,
+      stageName: "live",
+      autoDeploy: true,
+    });
+    const changeFeedStreamLambda = new lambda.Function(this, "ChangeFeedStreamLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "changeFeedStreamFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(60),
+      deadLetterQueueEnabled: true,
+      environment: {
+        SUBSCRIPTION_TABLE_NAME: subscriptionTable.tableName,
+        CHANGE_FEED_ENDPOINT: changeFeedStage.callbackUrl,
+      },
+      layers: [instrumentationLayer],
+    });
+    changeFeedApi.grantManageConnections(changeFeedStreamLambda);
+    // The only reader of the complaints table stream: a shard serves about two, so the stream handlers above are
+    // invoked asynchronously from here. Each retries on its own and keeps batches it still fails on in its dead-letter queue.
+    // LATEST, so replacing the former per-handler consumers does not apply the last 24 hours of changes twice
+    const streamDispatchLambda = new lambda.Function(this, "StreamDispatchLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "streamDispatchFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.seconds(60),
+      environment: {
+        TREND_STREAM_FN_NAME: trendStreamLambda.functionName,
+        TEXT_INDEX_STREAM_FN_NAME: textIndexStreamLambda.functionName,
+        LOCATION_STREAM_FN_NAME: locationStreamLambda.functionName,
+        TILE_STREAM_FN_NAME: tileStreamLambda.functionName,
+        CHANGE_FEED_STREAM_FN_NAME: changeFeedStreamLambda.functionName,
+      },
+      layers: [instrumentationLayer],
+    });
+    streamDispatchLambda.addEventSource(
+      new lambdaEventSources.DynamoEventSource(complaintTable, {
+        startingPosition: lambda.StartingPosition.LATEST,
+        batchSize: 100,
+        // Short, since the change feed pushes these to open portal sessions
+        maxBatchingWindow: cdk.Duration.seconds(1),
+        bisectBatchOnError: true,
+        retryAttempts: 5,
+      })
+    );
+    for (const streamHandler of [trendStreamLambda, textIndexStreamLambda, locationStreamLambda, tileStreamLambda, changeFeedStreamLambda]) {
+      streamHandler.grantInvoke(streamDispatchLambda);
+    }
+    // Moves complaints closed for more than ARCHIVE_AFTER_DAYS to the archive table every night
+    const archiveLambda = new lambda.Function(this, "ArchiveLambda", {
+      runtime: lambda.Runtime.PYTHON_3_13,
+      handler: "archiveFn.lambda_handler",
+      code: lambda.Code.fromAsset("../lambda"),
+      timeout: cdk.Duration.minutes(15),
+      memorySize: 512,
+      environment: {
+        COMPLAINT_TABLE_NAME: complaintTable.tableName,
+        ARCHIVE_TABLE_NAME: archiveTable.tableName,
+        ARCHIVE_AFTER_DAYS: "180",
+      },
+      layers: [instrumentationLayer],
+    });
+    new events.Rule(this, "ArchiveSchedule", {
+      schedule: events.Schedule.cron({ minute: "0", hour: "10" }),
+      targets: [new targets.LambdaFunction(archiveLambda)],
     });
 
     // Create IAM role for Lex
@@ -148,7 +704,9 @@ export class CdkStack extends cdk.Stack {
       }),
       environment: {
         LEXBOT_ID: lexBot.botId,
+        CHAT_CACHE_TTL_SECONDS: "300",
       },
+      layers: [instrumentationLayer],
     });
 
     // Create the Lambda function that processes chatbot actions in the backend
@@ -167,8 +725,9 @@ export class CdkStack extends cdk.Stack {
         COMPLAINT_TABLE_NAME: complaintTable.tableName,
         DB_QUERY_LAMBDA_NAME: dbQueryLambda.functionName,
         EMAIL_LAMBDA_NAME: emailHandlerLambda.functionName,
+        SPATIAL_QUERY_LAMBDA_NAME: spatialQueryLambda.functionName,
       },
-      layers: [lexBackendLayer],
+      layers: [lexBackendLayer, instrumentationLayer],
     });
 
     // Define the Lex bot ARN pattern that allows any alias
@@ -217,7 +776,46 @@ export class CdkStack extends cdk.Stack {
     complaintTable.grantReadWriteData(DBManagementLambda);
     complaintTable.grantReadWriteData(dbQueryLambda);
     complaintTable.grantReadWriteData(heatmapLambda);
+    complaintTable.grantReadData(dashboardBootstrapLambda);
+    complaintTable.grantReadData(priorityQueueLambda);
+    complaintTable.grantReadWriteData(priorityBackfillLambda);
+    complaintTable.grantReadWriteData(itemCompactionLambda);
+    archiveTable.grantReadWriteData(itemCompactionLambda);
     complaintTable.grantReadWriteData(beatRetrievalLambda);
+    complaintTable.grantReadWriteData(bulkImportLambda);
+    complaintTable.grantReadData(hotspotLambda);
+    complaintTable.grantReadData(spatialQueryLambda);
+    complaintTable.grantReadData(timeHeatmapLambda);
+    complaintTable.grantReadWriteData(geohashBackfillLambda);
+    complaintTable.grantReadData(trendRebuildLambda);
+    complaintTable.grantReadWriteData(archiveLambda);
+    archiveTable.grantReadWriteData(archiveLambda);
+    archiveTable.grantReadWriteData(DBManagementLambda);
+    archiveTable.grantReadData(dbQueryLambda);
+    archiveTable.grantReadData(trendRebuildLambda);
+    trendTable.grantReadWriteData(trendStreamLambda);
+    trendTable.grantReadData(trendLambda);
+    trendTable.grantReadWriteData(trendRebuildLambda);
+    complaintTable.grantReadData(textIndexRebuildLambda);
+    archiveTable.grantReadData(textIndexRebuildLambda);
+    textIndexTable.grantReadWriteData(textIndexStreamLambda);
+    textIndexTable.grantReadWriteData(textIndexRebuildLambda);
+    textIndexTable.grantReadData(dbQueryLambda);
+    complaintTable.grantReadData(repeatLocationLambda);
+    complaintTable.grantReadWriteData(locationBackfillLambda);
+    archiveTable.grantReadWriteData(locationBackfillLambda);
+    complaintTable.grantReadWriteData(rebeatLambda);
+    archiveTable.grantReadWriteData(rebeatLambda);
+    locationTable.grantReadWriteData(locationStreamLambda);
+    locationTable.grantReadWriteData(locationBackfillLambda);
+    locationTable.grantReadData(repeatLocationLambda);
+    complaintTable.grantReadData(tileRebuildLambda);
+    complaintTable.grantReadData(complaintTileLambda);
+    tileTable.grantReadWriteData(tileStreamLambda);
+    tileTable.grantReadWriteData(tileRebuildLambda);
+    tileTable.grantReadData(complaintTileLambda);
+    subscriptionTable.grantReadWriteData(changeFeedSocketLambda);
+    subscriptionTable.grantReadWriteData(changeFeedStreamLambda);
 
     // Create a new api gateway
 
@@ -232,6 +830,8 @@ export class CdkStack extends cdk.Stack {
       deployOptions: {
         stageName: "prod",
       },
+      // Long Markdown chatbot answers and table pages are gzip-compressed for clients sending Accept-Encoding
+      minCompressionSize: cdk.Size.kibibytes(1),
     });
 
     const rootResource = api.root;
@@ -449,6 +1049,202 @@ export class CdkStack extends cdk.Stack {
     );
     emailResource.defaultCorsPreflightOptions;
 
+    const bulkImportResource = rootResource.addResource("bulk-import");
+    bulkImportResource.addMethod(
+      "POST",
+      new apigateway.LambdaIntegration(bulkImportLambda, {
+        proxy: false,
+        integrationResponses: [
+          {
+            statusCode: "200",
+            responseParameters: {
+              "method.response.header.Access-Control-Allow-Origin": "'*'",
+              "method.response.header.Access-Control-Allow-Credentials": "'true'",
+            },
+          },
+        ],
+        passthroughBehavior: apigateway.PassthroughBehavior.WHEN_NO_MATCH,
+      }),
+      {
+        methodResponses: [
+          {
+            statusCode: "200",
+            responseParameters: {
+              "method.response.header.Access-Control-Allow-Origin": true,
+              "method.response.header.Access-Control-Allow-Credentials": true,
+            },
+          },
+        ],
+      }
+    );
+    bulkImportResource.defaultCorsPreflightOptions;
+
+    const hotspotResource = rootResource.addResource("hotspots");
+    hotspotResource.addMethod(
+      "POST",
+      new apigateway.LambdaIntegration(hotspotLambda, {
+        proxy: false,
+        integrationResponses: [
+          {
+            statusCode: "200",
+            responseParameters: {
+              "method.response.header.Access-Control-Allow-Origin": "'*'",
+              "method.response.header.Access-Control-Allow-Credentials": "'true'",
+            },
+          },
+        ],
+        passthroughBehavior: apigateway.PassthroughBehavior.WHEN_NO_MATCH,
+      }),
+      {
+        methodResponses: [
+          {
+            statusCode: "200",
+            responseParameters: {
+              "method.response.header.Access-Control-Allow-Origin": true,
+              "method.response.header.Access-Control-Allow-Credentials": true,
+            },
+          },
+        ],
+      }
+    );
+    hotspotResource.defaultCorsPreflightOptions;
+
+    const timeHeatmapResource = rootResource.addResource("time-heatmap");
+    timeHeatmapResource.addMethod(
+      "POST",
+      new apigateway.LambdaIntegration(timeHeatmapLambda, {
+        proxy: false,
+        integrationResponses: [
+          {
+            statusCode: "200",
+            responseParameters: {
+              "method.response.header.Access-Control-Allow-Origin": "'*'",
+              "method.response.header.Access-Control-Allow-Credentials": "'true'",
+            },
+          },
+        ],
+        passthroughBehavior: apigateway.PassthroughBehavior.WHEN_NO_MATCH,
+      }),
+      {
+        methodResponses: [
+          {
+            statusCode: "200",
+            responseParameters: {
+              "method.response.header.Access-Control-Allow-Origin": true,
+              "method.response.header.Access-Control-Allow-Credentials": true,
+            },
+          },
+        ],
+      }
+    );
+    timeHeatmapResource.defaultCorsPreflightOptions;
+
+    // GET through a proxy integration, so browsers cache the counts and revalidate them with a real 304
+    const trendResource = rootResource.addResource("trends");
+    trendResource.addMethod("GET", new apigateway.LambdaIntegration(trendLambda, { proxy: true }));
+
+    // Proxy integration so the browser's revalidation after max-age gets a real 304 with the ETag
+    const dashboardBootstrapResource = rootResource.addResource("dashboard-bootstrap");
+    dashboardBootstrapResource.addMethod("GET", new apigateway.LambdaIntegration(dashboardBootstrapLambda, { proxy: true }));
+
+    const priorityQueueResource = rootResource.addResource("priority-queue");
+    priorityQueueResource.addMethod(
+      "POST",
+      new apigateway.LambdaIntegration(priorityQueueLambda, {
+        proxy: false,
+        integrationResponses: [
+          {
+            statusCode: "200",
+            responseParameters: {
+              "method.response.header.Access-Control-Allow-Origin": "'*'",
+              "method.response.header.Access-Control-Allow-Credentials": "'true'",
+            },
+          },
+        ],
+        passthroughBehavior: apigateway.PassthroughBehavior.WHEN_NO_MATCH,
+      }),
+      {
+        methodResponses: [
+          {
+            statusCode: "200",
+            responseParameters: {
+              "method.response.header.Access-Control-Allow-Origin": true,
+              "method.response.header.Access-Control-Allow-Credentials": true,
+            },
+          },
+        ],
+      }
+    );
+    priorityQueueResource.defaultCorsPreflightOptions;
+
+    const spatialQueryResource = rootResource.addResource("spatial-query");
+    spatialQueryResource.addMethod(
+      "POST",
+      new apigateway.LambdaIntegration(spatialQueryLambda, {
+        proxy: false,
+        integrationResponses: [
+          {
+            statusCode: "200",
+            responseParameters: {
+              "method.response.header.Access-Control-Allow-Origin": "'*'",
+              "method.response.header.Access-Control-Allow-Credentials": "'true'",
+            },
+          },
+        ],
+        passthroughBehavior: apigateway.PassthroughBehavior.WHEN_NO_MATCH,
+      }),
+      {
+        methodResponses: [
+          {
+            statusCode: "200",
+            responseParameters: {
+              "method.response.header.Access-Control-Allow-Origin": true,
+              "method.response.header.Access-Control-Allow-Credentials": true,
+            },
+          },
+        ],
+      }
+    );
+    spatialQueryResource.defaultCorsPreflightOptions;
+
+    const repeatLocationResource = rootResource.addResource("repeat-locations");
+    repeatLocationResource.addMethod(
+      "POST",
+      new apigateway.LambdaIntegration(repeatLocationLambda, {
+        proxy: false,
+        integrationResponses: [
+          {
+            statusCode: "200",
+            responseParameters: {
+              "method.response.header.Access-Control-Allow-Origin": "'*'",
+              "method.response.header.Access-Control-Allow-Credentials": "'true'",
+            },
+          },
+        ],
+        passthroughBehavior: apigateway.PassthroughBehavior.WHEN_NO_MATCH,
+      }),
+      {
+        methodResponses: [
+          {
+            statusCode: "200",
+            responseParameters: {
+              "method.response.header.Access-Control-Allow-Origin": true,
+              "method.response.header.Access-Control-Allow-Credentials": true,
+            },
+          },
+        ],
+      }
+    );
+    repeatLocationResource.defaultCorsPreflightOptions;
+
+    // Proxy integration so the function sets ETag / Cache-Control and answers conditional requests with 304
+    const beatGeometryResource = rootResource.addResource("beat-geometry");
+    beatGeometryResource.addMethod("GET", new apigateway.LambdaIntegration(beatGeometryLambda, { proxy: true }));
+
+    // complaint-tiles/{z}/{x}/{y}?status=&category=&from=&to=, proxied for the same conditional caching
+    const complaintTileResource = rootResource.addResource("complaint-tiles").addResource("{z}").addResource("{x}").addResource("{y}");
+    complaintTileResource.addMethod("GET", new apigateway.LambdaIntegration(complaintTileLambda, { proxy: true }));
+
     const apiUrl = api.url;
 
     // 🔐 Store GitHub token in Secrets Manager
@@ -497,6 +1293,7 @@ export class CdkStack extends cdk.Stack {
     // const complaintsPortalUrl = `https://${complaintsPortalBranch.branchName}.${complaintsPortalApp.defaultDomain}`; // <-- get generated Amplify domain
 
     complaintsPortalBranch.addEnvironment("VITE_API_URL", apiUrl);
+    complaintsPortalBranch.addEnvironment("VITE_CHANGE_FEED_URL", changeFeedStage.url);
     complaintsPortalBranch.addEnvironment("VITE_CLIENT_ID", props.clientId);
     complaintsPortalBranch.addEnvironment("VITE_CLIENT_SECRET", props.clientSecret);
     complaintsPortalBranch.addEnvironment("VITE_REDIRECT_URI", props.redirectUri); // ✅ set auto redirect
@@ -3,6 +3,7 @@ import os
 table_name = os.environ["COMPLAINT_TABLE_NAME"]
 lambda_name = os.environ["DB_QUERY_LAMBDA_NAME"]
 email_lambda_name = os.environ["EMAIL_LAMBDA_NAME"]
+spatial_lambda_name = os.environ["SPATIAL_QUERY_LAMBDA_NAME"]
 
 
 botId = os.environ["LEXBOT_ID"]
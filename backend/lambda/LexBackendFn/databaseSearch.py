@@ -1,19 +1,25 @@
 import json
-import logging
 import datetime
 import pytz
 from config import table_name, lambda_name
 from utils import invoke_lambda, normalize_filters, convert_relative_times
+from instrumentation import timed
+from structuredlog import get_logger
 
 # Configure logger
-logger = logging.getLogger()
+logger = get_logger(__name__)
 
-def search_complaints(raw_filters):
+# Complaints per query Lambda page; each page re-runs the scan, so pages are large
+SEARCH_PAGE_SIZE = 500
+
+@timed("ComplaintSearch")
+def search_complaints(raw_filters, fields=None):
     """
     Search for complaints based on the provided filters
     
     Parameters:
     raw_filters (dict): The raw filter parameters from the Lex V2 request
+    fields (list): Attributes to fetch for each complaint, all of them when omitted
     
     Returns:
     tuple: (all_complaints, status_counts, total_complaints)
@@ -26,13 +32,13 @@ def search_complaints(raw_filters):
     
     # Get current date and time in Arizona
     current_az_time = datetime.datetime.now(arizona_tz)
-    logger.info(f"Current Arizona time: {current_az_time}")
+    logger.debug("Current Arizona time", time=current_az_time)
     
     # Valid options definition
     valid_options = {
         "beatNumber": ["1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "11", "12", "13", "14", "15", "16", "17"],
         "problemCategory": ["Stop sign", "School traffic complaint", "Racing", "Speed", "Red light", "Reckless Driving"],
-        "complaintStatus": ["Open", "Follow-Up", "Closed", "Red-Star"],
+        "complaintStatus": ["Open", "Follow-Up", "Closed", "Red-Star", "Duplicate"],
         "daysOfWeek": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"],
         "relativeTimes": ["Today", "Yesterday", "This week", "Last week", "This month", "Last month"]
     }
@@ -44,7 +50,7 @@ def search_complaints(raw_filters):
     date_range = ("", "")
     if filters["relativeTimes"]:
         date_range = convert_relative_times(filters["relativeTimes"])
-        logger.info(f"Converted relative times {filters['relativeTimes']} to Arizona time date range: {date_range}")
+        logger.info("Converted relative times to Arizona date range", relativeTimes=filters['relativeTimes'], dateRange=date_range)
     
     # Query results storage
     all_complaints = []
@@ -54,7 +60,7 @@ def search_complaints(raw_filters):
     if not filters["statuses"]:
         # If no statuses provided, use all possible statuses
         search_statuses = valid_options["complaintStatus"]
-        logger.info("No statuses provided, using all statuses for search")
+        logger.debug("No statuses provided, using all statuses for search")
     else:
         search_statuses = filters["statuses"]
 
@@ -63,6 +69,7 @@ def search_complaints(raw_filters):
         status_filtered_complaints = []
         current_page = 1
         total_pages = 1  # Will be updated with the first call
+        fetched_count = 0
         
         # Fetch all pages for this status
         while current_page <= total_pages:
@@ -73,9 +80,14 @@ def search_complaints(raw_filters):
                 "problemCategory": filters["categories"],     # List of problem categories 
                 "complaintStatus": status,         # Single status
                 "page": current_page,              # Current page number
+                "pageSize": SEARCH_PAGE_SIZE,
                 "timezone": "America/Phoenix"      # Specify Arizona timezone
             }
             
+            # Only the listed attributes, plus the days the day-of-week filter below reads
+            if fields:
+                payload["fields"] = list(dict.fromkeys(fields + ["daysOfWeek"]))
+            
             # Add date range to payload if relative times were provided
             if filters["relativeTimes"]:
                 payload["startDate"] = date_range[0]
@@ -86,7 +98,7 @@ def search_complaints(raw_filters):
             
             # Invoke the Lambda function
             try:
-                logger.info(f"Invoking Lambda for status {status}, page {current_page}/{total_pages}")
+                logger.debug("Invoking query Lambda", status=status, page=current_page, totalPages=total_pages)
                 response_payload = invoke_lambda(lambda_name, payload_json)
                 
                 # Parse the response
@@ -98,22 +110,16 @@ def search_complaints(raw_filters):
                 # Get page complaints
                 page_complaints = response_data.get('complaintsData', [])
                 
-                # Filter complaints by day of week if days_of_week filter is not empty
-                filtered_page_complaints = []
+                fetched_count += len(page_complaints)
+                
+                # Filter complaints by day of week if days_of_week filter is not empty,
+                # keeping complaints where any of their days matches the filter
                 if filters['daysOfWeek']:
-                    logger.info(f"Filtering by days of week: {filters['daysOfWeek']}")
-                    for complaint in page_complaints:
-                        # Check if the complaint has daysOfWeek field
-                        complaint_days = complaint.get('daysOfWeek', [])
-                        
-                        # Check if any day in the filter matches any day in the complaint
-                        days_overlap = any(day in complaint_days for day in filters['daysOfWeek'])
-                        
-                        if days_overlap:
-                            filtered_page_complaints.append(complaint)
-                            logger.info(f"Complaint {complaint.get('complaintId')} matches day filter: {complaint_days}")
-                        else:
-                            logger.info(f"Complaint {complaint.get('complaintId')} days {complaint_days} don't match filter {filters['daysOfWeek']}")
+                    filter_days = set(filters['daysOfWeek'])
+                    filtered_page_complaints = [
+                        complaint for complaint in page_complaints
+                        if not filter_days.isdisjoint(complaint.get('daysOfWeek', []))
+                    ]
                 else:
                     # If no days filter, include all complaints
                     filtered_page_complaints = page_complaints
@@ -121,13 +127,11 @@ def search_complaints(raw_filters):
                 # Add filtered complaints to our status-specific list
                 status_filtered_complaints.extend(filtered_page_complaints)
                 
-                logger.info(f"Status {status}, Page {current_page}: Retrieved {len(filtered_page_complaints)} complaints after filtering")
-                
                 # Move to the next page
                 current_page += 1
                 
             except Exception as e:
-                logger.error(f"Error querying for status {status}, page {current_page}: {str(e)}")
+                logger.error("Error querying complaints", status=status, page=current_page, error=str(e))
                 break  # Stop trying further pages if we encounter an error
         
         # After processing all pages for this status:
@@ -135,9 +139,35 @@ def search_complaints(raw_filters):
         all_complaints.extend(status_filtered_complaints)
         # 2. Update the status count based on the complete filtered results
         status_counts[status] = len(status_filtered_complaints)
+        # One summary line per status instead of one per complaint
+        logger.info(
+            "Fetched complaints for status",
+            status=status,
+            pages=current_page - 1,
+            fetched=fetched_count,
+            kept=len(status_filtered_complaints),
+            daysOfWeek=filters['daysOfWeek']
+        )
     
     # Calculate total from status counts after all statuses have been processed
     total_complaints = sum(status_counts.values())
     
     # Return the complaints, counts, and total as a tuple
-    return all_complaints, status_counts, total_complaints, filters, date_range
\ No newline at end of file
+    return all_complaints, status_counts, total_complaints, filters, date_range
+
+@timed("ComplaintFetch")
+def fetch_complaints(complaint_ids):
+    """
+    Fetch complaints by key, in the order of the given IDs
+
+    Parameters:
+    complaint_ids (list): IDs of the complaints to fetch
+
+    Returns:
+    list: The complaints that still exist, in the requested order and in the API shape
+    """
+    # The query Lambda reads archived ones too and fills in what compact items leave out
+    response = json.loads(invoke_lambda(lambda_name, json.dumps({"complaintIds": complaint_ids})))
+    if response.get('status') != 200:
+        raise RuntimeError(response.get('message', 'Complaint fetch failed'))
+    return response['complaintsData']
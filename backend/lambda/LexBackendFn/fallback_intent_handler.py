@@ -1,9 +1,8 @@
 import json
-import logging
+from structuredlog import get_logger
 
 # Configure logger
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger(__name__)
 
 def handle(event):
     """
@@ -16,11 +15,13 @@ def handle(event):
     dict: The response for Amazon Lex V2
     """
     # Log the incoming event for this specific handler
-    logger.info('Handling FallbackIntent: %s', json.dumps(event))
+    logger.debug('Handling FallbackIntent', event=event)
     
     try:
         # Extract any relevant information from the event
         session_attributes = event.get('sessionState', {}).get('sessionAttributes', {})
+        # Not marked cacheableTranscript: Lex also falls back in the middle of a dialog, where the
+        # same words answer a prompt and must reach the intent handlers
         
         # Process the fallback logic
         # This is where you would implement your specific fallback handling
@@ -47,7 +48,7 @@ def handle(event):
     
     except Exception as e:
         # Log the error
-        logger.error('Error in fallback handler: %s', str(e))
+        logger.error('Error in fallback handler', error=str(e))
         
         # Return an error response
         return {
@@ -1,13 +1,15 @@
 import json
-import logging
+from structuredlog import get_logger
 import query_complaint_handler
 import send_email_handler
 import fallback_intent_handler  # Added import for the new fallback handler
+import nearby_complaint_handler
+from instrumentation import instrumented, set_dimension, set_property
 
 # Configure logger
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger(__name__)
 
+@instrumented
 def lambda_handler(event, context):
     """
     Main Lambda handler function that routes intents to their respective handlers
@@ -19,12 +21,28 @@ def lambda_handler(event, context):
     Returns:
     dict: The response for Amazon Lex V2
     """
-    # Log the incoming event for debugging
-    logger.info('Received event: %s', json.dumps(event))
+    # Log the incoming event for debugging; the full event only on sampled invocations
+    logger.debug('Received event', event=event)
     
     try:
         # Extract the intent name to determine which handler to use
         intent_name = event['sessionState']['intent']['name']
+        set_dimension("Intent", intent_name)
+        # Too many distinct values for a dimension, but lets one conversation's records be found
+        set_property("SessionId", event.get('sessionId', ''))
+        logger.info('Routing intent', intent=intent_name, transcriptLength=len(event.get('inputTranscript', '')))
+        
+        # "show more" pages through the previous answer whichever intent Lex matched
+        if intent_name in ['Query_Complaint_Info', 'FallbackIntent'] and query_complaint_handler.is_show_more_request(event.get('inputTranscript', '')):
+            return query_complaint_handler.handle_show_more(event)
+        
+        # Spatial questions ("complaints near Chandler High") are answered whichever intent Lex matched
+        nearby_request = nearby_complaint_handler.parse_nearby_request(event.get('inputTranscript', ''))
+        if nearby_request and intent_name in ['Query_Complaint_Info', 'FallbackIntent']:
+            nearby_response = nearby_complaint_handler.handle(event, nearby_request)
+            # Places the geocoder cannot resolve confidently are left to the intent's own handler
+            if nearby_response is not None:
+                return nearby_response
         
         # Route to the appropriate handler based on intent name
         if intent_name == 'Query_Complaint_Info':
@@ -55,7 +73,7 @@ def lambda_handler(event, context):
     
     except Exception as e:
         # Log the error
-        logger.error('Error processing request: %s', str(e))
+        logger.error('Error processing request', error=str(e))
         
         # Return a generic error response
         return {
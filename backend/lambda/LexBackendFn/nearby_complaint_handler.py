@@ -0,0 +1,125 @@
+import json
+import re
+from config import spatial_lambda_name
+from utils import invoke_lambda
+from instrumentation import timed
+from structuredlog import get_logger
+
+# Configure logger
+logger = get_logger(__name__)
+
+# Radius used when the question does not give one
+DEFAULT_RADIUS_METERS = 500
+
+UNIT_TO_METERS = {
+    "m": 1, "meter": 1, "meters": 1,
+    "km": 1000, "kilometer": 1000, "kilometers": 1000,
+    "mi": 1609.34, "mile": 1609.34, "miles": 1609.34,
+    "ft": 0.3048, "feet": 0.3048
+}
+
+# "... within 1 km of Chandler High" or "... near Chandler High (within 300 m)"
+WITHIN_PATTERN = re.compile(r"within\s+(\d+(?:\.\d+)?)\s*([a-z]+)\s+(?:of|from)\s+(.+?)[?.!]*$", re.IGNORECASE)
+NEAR_PATTERN = re.compile(r"\b(?:near|around|close to|nearby)\s+(.+?)(?:\s+within\s+(\d+(?:\.\d+)?)\s*([a-z]+))?[?.!]*$", re.IGNORECASE)
+# "around 5pm", "around 17:30" or "near Friday" are times, not places
+TIME_PATTERN = re.compile(r"^\d{1,2}(?::\d\d)?\s*(?:am|pm|a\.m\.|p\.m\.|o'?clock)?$|^\d{1,2}:\d\d\b|^\d{1,2}\s*(?:am|pm|a\.m\.|p\.m\.|o'?clock)\b", re.IGNORECASE)
+TIME_WORDS = {
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "mondays", "tuesdays", "wednesdays", "thursdays", "fridays", "saturdays", "sundays", "weekend", "weekends",
+    "january", "february", "march", "april", "may", "june", "july", "august", "september", "october", "november", "december",
+    "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+    "today", "tonight", "yesterday", "noon", "midnight", "morning", "afternoon", "evening", "night", "lunchtime",
+    "week", "month", "year"
+}
+# "this morning", "last week"
+RELATIVE_WORDS = {"this", "last", "next", "past"}
+
+def is_time_phrase(text):
+    """Whether a captured place is really a time or date, as in 'complaints around 5pm on Friday'"""
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    if TIME_PATTERN.match(text.strip()) or not words or words[0] in TIME_WORDS:
+        return True
+    return words[0] in RELATIVE_WORDS and len(words) > 1 and words[1] in TIME_WORDS
+
+def parse_nearby_request(transcript):
+    """
+    Detect spatial questions in the raw user transcript
+
+    Parameters:
+    transcript (str): The inputTranscript of the Lex V2 request
+
+    Returns:
+    dict or None: {"place", "radius"} when the question asks about complaints near a place
+    """
+    if not transcript or ('complaint' not in transcript.lower() and 'issue' not in transcript.lower()):
+        return None
+
+    match = WITHIN_PATTERN.search(transcript)
+    if match:
+        amount, unit, place = match.groups()
+    else:
+        match = NEAR_PATTERN.search(transcript)
+        if not match:
+            return None
+        place, amount, unit = match.groups()
+    if is_time_phrase(place):
+        return None
+
+    radius = DEFAULT_RADIUS_METERS
+    if amount and unit and unit.lower() in UNIT_TO_METERS:
+        radius = float(amount) * UNIT_TO_METERS[unit.lower()]
+    return {"place": place.strip(), "radius": radius}
+
+@timed("NearbySearch")
+def handle(event, nearby_request):
+    """
+    Answer "complaints near <place>" questions through the spatial query Lambda
+
+    Parameters:
+    event (dict): The event dictionary containing the Lex V2 request details
+    nearby_request (dict): The parsed place and radius
+
+    Returns:
+    dict or None: Response for Lex V2 listing the closest complaints, None when the place could not be
+    located so the question goes to the intent's own handler
+    """
+    intent_name = event['sessionState']['intent']['name']
+    payload = {"place": nearby_request["place"], "radius": nearby_request["radius"], "limit": 5}
+    logger.info('Running spatial query', **payload)
+
+    response_data = json.loads(invoke_lambda(spatial_lambda_name, json.dumps(payload)))
+    radius_text = f"{int(nearby_request['radius'])} m"
+
+    if response_data.get('statusCode') == 404:
+        logger.info('Place not located, using the intent handler', place=nearby_request['place'])
+        return None
+    if response_data.get('statusCode') != 200:
+        message = f"I couldn't locate **{nearby_request['place']}**. Try a street address or intersection instead."
+    elif response_data['body']['total'] == 0:
+        message = f"I couldn't find any complaints within {radius_text} of **{nearby_request['place']}**."
+    else:
+        body = response_data['body']
+        message = f"   \n\n### Complaints within {radius_text} of {nearby_request['place']}\n"
+        message += f"I found **{body['total']}** complaint{'s' if body['total'] > 1 else ''}. The closest are:\n\n"
+        for complaint in body['complaints']:
+            message += f"- **{complaint['complaintId']}** ({complaint['distanceMeters']} m): "
+            message += f"{complaint.get('problemCategory', 'Not specified')}, {complaint.get('complaintStatus', 'Not specified')}, "
+            message += f"beat {complaint.get('beatNumber', 'Not specified')}, filed {complaint.get('dateOfComplaint', 'Unknown date')}\n"
+
+    return {
+        "sessionState": {
+            "dialogAction": {
+                "type": "Close"
+            },
+            "intent": {
+                "name": intent_name,
+                "state": "Fulfilled"
+            }
+        },
+        "messages": [
+            {
+                "contentType": "SSML",
+                "content": message
+            }
+        ]
+    }
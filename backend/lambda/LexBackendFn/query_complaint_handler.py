@@ -1,14 +1,23 @@
 import json
-import logging
+import re
 import boto3
 import datetime
 import pytz
 from config import table_name, lambda_name
 from utils import invoke_lambda
-from databaseSearch import search_complaints
+from databaseSearch import search_complaints, fetch_complaints
+from structuredlog import get_logger
 
 # Configure logger
-logger = logging.getLogger()
+logger = get_logger(__name__)
+
+# Complaints shown per answer
+PAGE_SIZE = 5
+# IDs kept in the session for "show more"; Lex session attributes are small
+MAX_CURSOR_IDS = 400
+
+# "show more", "next 5", "more results", ...
+SHOW_MORE_PATTERN = re.compile(r"^\s*(?:show(?: me)?\s+)?(?:the\s+)?(?:more|next)(?:\s+(?:\d+|five))?(?:\s+(?:results|complaints|ones))?(?:\s+please)?[?.!\s]*$", re.IGNORECASE)
 
 def handle(event):
     """
@@ -32,20 +41,87 @@ def handle(event):
     # Extract filter values from slots
     raw_filters = extract_filters_from_slots(slots)
     
-    # Use the search_complaints function from databaseSearch.py
-    all_complaints, status_counts, total_complaints, filters, date_range = search_complaints(raw_filters)
+    # Only the IDs of matching complaints are fetched; the ones displayed are then read by key
+    matches, status_counts, total_complaints, filters, date_range = search_complaints(raw_filters, fields=["complaintId"])
+    complaint_ids = [complaint['complaintId'] for complaint in matches]
+    complaints = fetch_complaints(complaint_ids[:PAGE_SIZE])
+    
+    # The rest of the IDs are the cursor "show more" pages through without searching again
+    session_attributes = dict(event['sessionState'].get('sessionAttributes') or {})
+    session_attributes.update(cursor_attributes(complaint_ids[PAGE_SIZE:], len(complaint_ids[:PAGE_SIZE]), total_complaints))
     
     # Format and return the response
     return format_response(
         intent_name, 
         filters, 
         date_range, 
-        all_complaints, 
+        complaints, 
         status_counts, 
         total_complaints, 
-        current_az_time
+        current_az_time,
+        session_attributes
     )
 
+def is_show_more_request(transcript):
+    """Whether the user asked for the next complaints of the previous answer"""
+    return bool(transcript and SHOW_MORE_PATTERN.match(transcript))
+
+def cursor_attributes(remaining_ids, shown, total):
+    """Session attributes holding the result cursor"""
+    return {
+        "resultCursor": ",".join(remaining_ids[:MAX_CURSOR_IDS]),
+        "resultShown": str(shown),
+        "resultTotal": str(total)
+    }
+
+def handle_show_more(event):
+    """
+    Answer "show more" with the next complaints of the previous search
+
+    Parameters:
+    event (dict): The event dictionary containing the Lex V2 request details
+
+    Returns:
+    dict: Response for Lex V2 with the next page of complaints
+    """
+    intent_name = event['sessionState']['intent']['name']
+    session_attributes = dict(event['sessionState'].get('sessionAttributes') or {})
+    cursor = [complaint_id for complaint_id in session_attributes.get('resultCursor', '').split(',') if complaint_id]
+    shown = int(session_attributes.get('resultShown', 0))
+    total = int(session_attributes.get('resultTotal', 0))
+    
+    if not cursor:
+        message = "There are no more complaints to show. Ask a new question to search again."
+    else:
+        page_ids = cursor[:PAGE_SIZE]
+        complaints = fetch_complaints(page_ids)
+        logger.info('Showing more complaints', requested=len(page_ids), found=len(complaints), shown=shown, total=total)
+        
+        message = f"   \n\n### Complaints {shown + 1} to {shown + len(page_ids)} of {total}\n"
+        message += format_complaints(complaints, shown)
+        shown += len(page_ids)
+        message += more_results_note(total - shown, len(cursor) - len(page_ids))
+        session_attributes.update(cursor_attributes(cursor[PAGE_SIZE:], shown, total))
+    
+    return {
+        "sessionState": {
+            "dialogAction": {
+                "type": "Close"
+            },
+            "intent": {
+                "name": intent_name,
+                "state": "Fulfilled"
+            },
+            "sessionAttributes": session_attributes
+        },
+        "messages": [
+            {
+                "contentType": "SSML",
+                "content": message
+            }
+        ]
+    }
+
 def extract_filters_from_slots(slots):
     """
     Extract filter values from the Lex slots
@@ -89,7 +165,7 @@ def extract_filters_from_slots(slots):
         "relativeTimes": relative_times
     }
 
-def format_response(intent_name, filters, date_range, all_complaints, status_counts, total_complaints, current_az_time):
+def format_response(intent_name, filters, date_range, complaints, status_counts, total_complaints, current_az_time, session_attributes):
     """
     Format the response for Lex V2
     
@@ -97,10 +173,11 @@ def format_response(intent_name, filters, date_range, all_complaints, status_cou
     intent_name (str): The name of the Lex intent
     filters (dict): The normalized filters used for search
     date_range (tuple): Start and end dates for time-based filters
-    all_complaints (list): List of complaint objects matching the filters
+    complaints (list): The first complaints matching the filters, the ones displayed
     status_counts (dict): Dictionary with counts by status
     total_complaints (int): Total number of matching complaints
     current_az_time (datetime): Current time in Arizona
+    session_attributes (dict): Session attributes carrying the result cursor
     
     Returns:
     dict: Formatted response for Lex V2
@@ -141,54 +218,10 @@ def format_response(intent_name, filters, date_range, all_complaints, status_cou
         
         # Add detailed information about each complaint
         message += "\n### Complaint Details\n"
+        message += format_complaints(complaints, 0)
         
-        # Limit to first 5 complaints to avoid very long messages
-        max_complaints_to_show = min(5, len(all_complaints))
-        for i in range(max_complaints_to_show):
-            complaint = all_complaints[i]
-            
-            # Format date if available
-            complaint_date = complaint.get('dateOfComplaint', 'Unknown date')
-            
-            # Format the time information
-            time_info = ""
-            if 'daysOfWeek' in complaint and complaint['daysOfWeek']:
-                days = ", ".join(complaint['daysOfWeek'])
-                time_info += f"on {days}"
-            
-            if 'startTime' in complaint and 'endTime' in complaint:
-                # Convert 24h format to more readable time if needed
-                start = complaint['startTime'][:5]  # Take only HH:MM
-                end = complaint['endTime'][:5]      # Take only HH:MM
-                if time_info:
-                    time_info += f" between {start} and {end} (Arizona time)"
-                else:
-                    time_info = f"between {start} and {end} (Arizona time)"
-            
-            # Format the address
-            address = complaint.get('addressStreet', 'Unknown location')
-            
-            message += f"#### Complaint #{i+1} (ID: {complaint['complaintId']})\n"
-            # Make sure each item is on its own line by using double line breaks
-            message += f"**Reported by**: {complaint.get('firstName', '')} {complaint.get('lastName', '')}\n\n"
-            message += f"**Filed on**: {complaint_date} (Arizona time)\n\n"
-            message += f"**Category**: {complaint.get('problemCategory', 'Not specified')}\n\n"
-            message += f"**Beat**: {complaint.get('beatNumber', 'Not specified')}\n\n"
-            message += f"**Status**: {complaint.get('complaintStatus', 'Not specified')}\n\n"
-            message += f"**Location**: {address}\n\n"
-            message += f"**Occurs**: {time_info}\n"
-            
-            # Include the description
-            if 'description' in complaint and complaint['description']:
-                message += f"\n**Issue Description**:\n"
-                message += f"> {complaint['description']}\n"
-            
-            # Add a divider between complaints
-            if i < max_complaints_to_show - 1:
-                message += "\n---\n"
-        
-        if len(all_complaints) > max_complaints_to_show:
-            message += f"\n\n_...and {len(all_complaints) - max_complaints_to_show} more complaints not shown. Please refine your search if you need more specific results._"
+        cursor_size = len([complaint_id for complaint_id in session_attributes['resultCursor'].split(',') if complaint_id])
+        message += more_results_note(total_complaints - len(complaints), cursor_size)
     else:
         message += "I couldn't find any complaints matching your criteria. Try adjusting your filters for different results."
     
@@ -201,7 +234,8 @@ def format_response(intent_name, filters, date_range, all_complaints, status_cou
             "intent": {
                 "name": intent_name,
                 "state": "Fulfilled"
-            }
+            },
+            "sessionAttributes": session_attributes
         },
         "messages": [
             {
@@ -209,4 +243,66 @@ def format_response(intent_name, filters, date_range, all_complaints, status_cou
                 "content": message
             }
         ]
-    }
\ No newline at end of file
+    }
+
+def more_results_note(not_shown, in_cursor):
+    """Footer telling the user how many complaints are left and how to see them"""
+    if not_shown <= 0:
+        return ""
+    if in_cursor > 0:
+        return f"\n\n_...and {not_shown} more complaints not shown. Say **show more** to see the next {min(PAGE_SIZE, in_cursor)}, or refine your search for more specific results._"
+    return f"\n\n_...and {not_shown} more complaints not shown. Please refine your search if you need more specific results._"
+
+def format_complaints(complaints, offset):
+    """
+    Markdown details of complaints, numbered from offset + 1
+
+    Parameters:
+    complaints (list): The complaints to describe
+    offset (int): How many complaints earlier answers already showed
+
+    Returns:
+    str: The complaint details separated by dividers
+    """
+    message = ""
+    for i, complaint in enumerate(complaints):
+        # Format date if available
+        complaint_date = complaint.get('dateOfComplaint', 'Unknown date')
+        
+        # Format the time information
+        time_info = ""
+        if 'daysOfWeek' in complaint and complaint['daysOfWeek']:
+            days = ", ".join(complaint['daysOfWeek'])
+            time_info += f"on {days}"
+        
+        if 'startTime' in complaint and 'endTime' in complaint:
+            # Convert 24h format to more readable time if needed
+            start = complaint['startTime'][:5]  # Take only HH:MM
+            end = complaint['endTime'][:5]      # Take only HH:MM
+            if time_info:
+                time_info += f" between {start} and {end} (Arizona time)"
+            else:
+                time_info = f"between {start} and {end} (Arizona time)"
+        
+        # Format the address
+        address = complaint.get('addressStreet', 'Unknown location')
+        
+        message += f"#### Complaint #{offset + i + 1} (ID: {complaint['complaintId']})\n"
+        # Make sure each item is on its own line by using double line breaks
+        message += f"**Reported by**: {complaint.get('firstName', '')} {complaint.get('lastName', '')}\n\n"
+        message += f"**Filed on**: {complaint_date} (Arizona time)\n\n"
+        message += f"**Category**: {complaint.get('problemCategory', 'Not specified')}\n\n"
+        message += f"**Beat**: {complaint.get('beatNumber', 'Not specified')}\n\n"
+        message += f"**Status**: {complaint.get('complaintStatus', 'Not specified')}\n\n"
+        message += f"**Location**: {address}\n\n"
+        message += f"**Occurs**: {time_info}\n"
+        
+        # Include the description
+        if 'description' in complaint and complaint['description']:
+            message += f"\n**Issue Description**:\n"
+            message += f"> {complaint['description']}\n"
+        
+        # Add a divider between complaints
+        if i < len(complaints) - 1:
+            message += "\n---\n"
+    return message
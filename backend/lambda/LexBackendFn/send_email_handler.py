@@ -1,18 +1,18 @@
 import json
-import logging
 import boto3
 from utils import invoke_lambda
 import config
 from databaseSearch import search_complaints
+from instrumentation import instrument_client
+from structuredlog import get_logger
 
 # Configure logger
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger(__name__)
 
 # Initialize AWS Lambda client
-lambda_client = boto3.client('lambda')
+lambda_client = instrument_client(boto3.client('lambda'))
 # Initialize the Lex V2 client
-lex_client = boto3.client('lexv2-runtime')
+lex_client = instrument_client(boto3.client('lexv2-runtime'))
 
 def handle(event):
     """
@@ -25,7 +25,7 @@ def handle(event):
     dict: Response message confirming the email address
     """
     # Log the incoming event for debugging
-    logger.info('Received sendEmail event: %s', json.dumps(event))
+    logger.debug('Received sendEmail event', event=event)
     
     # Extract intent name for the response
     intent_name = event['sessionState']['intent']['name']
@@ -48,9 +48,9 @@ def handle(event):
             # Extract filters from the session response
             session_filters = extract_filters_from_response(session_response)
             # Log the extracted filters
-            logger.info('Extracted session filters: %s', json.dumps(session_filters))
+            logger.info('Extracted session filters', filters=session_filters)
         except Exception as e:
-            logger.error(f"Error getting session information: {str(e)}")
+            logger.error('Error getting session information', error=str(e))
     
     # Extract the email address from the slots
     email_address = None
@@ -102,16 +102,19 @@ def handle(event):
         complaints_to_send, status_counts, total_complaints, applied_filters, date_range = search_complaints(session_filters)
         
         # Log the search results
-        logger.info(f'Found {total_complaints} complaints matching the filters')
-        logger.info(f'Status counts: {status_counts}')
-        logger.info(f'Applied filters: {applied_filters}')
-        logger.info(f'Date range: {date_range}')
+        logger.info(
+            'Found complaints matching the filters',
+            total=total_complaints,
+            statusCounts=status_counts,
+            filters=applied_filters,
+            dateRange=date_range
+        )
         
         # If no complaints were found, log a warning
         if not complaints_to_send:
             logger.warning('No complaints found matching the filters')
     except Exception as e:
-        logger.error(f"Error searching for complaints: {str(e)}")
+        logger.error('Error searching for complaints', error=str(e))
         # In case of error, return an empty list
         complaints_to_send = []
     
@@ -128,11 +131,11 @@ def handle(event):
     
     try:
         # Invoke the email Lambda function using the utility function
-        logger.info(f"Invoking emailHandlerLambdaFn with sendTo: {email_address}")
+        logger.info('Invoking emailHandlerLambdaFn', sendTo=email_address, complaints=len(complaints_to_send))
         response_payload = invoke_lambda(config.email_lambda_name, email_payload_json)
         
         # Parse the response to handle different error cases
-        logger.info(f"Email Lambda response: {response_payload}")
+        logger.debug('Email Lambda response', response=lambda: json.loads(response_payload))
         email_response = json.loads(response_payload)
         
         # Check the status code from the email lambda
@@ -210,7 +213,7 @@ def handle(event):
             }
         else:
             # Handle other error cases
-            logger.error(f"Email sending failed with status {status_code}: {response_message}")
+            logger.error('Email sending failed', statusCode=status_code, response=response_message)
             return {
                 "sessionState": {
                     "dialogAction": {
@@ -230,7 +233,7 @@ def handle(event):
             }
         
     except Exception as e:
-        logger.error(f"Error sending email: {str(e)}")
+        logger.error('Error sending email', error=str(e))
         
         # Return error response
         return {
@@ -1,15 +1,15 @@
 import boto3
-import logging
 import datetime
 from typing import List, Tuple
 import pytz
+from instrumentation import instrument_client
+from structuredlog import get_logger
 
 # Configure logger
-logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger = get_logger(__name__)
 
 # Initialize Lambda client
-lambda_client = boto3.client('lambda')
+lambda_client = instrument_client(boto3.client('lambda'))
 
 def invoke_lambda(function_name, payload):
     """Invoke another Lambda function with the given payload"""
@@ -22,7 +22,7 @@ def invoke_lambda(function_name, payload):
         )
         return response['Payload'].read()
     except Exception as e:
-        logger.error(f"Error invoking Lambda function: {str(e)}")
+        logger.error('Error invoking Lambda function', function=function_name, error=str(e))
         raise e
 
 
@@ -16,12 +16,65 @@ lexConnectorLambdaArn = os.environ.get("LEXBOT_LAMBDA_ARN_CONNECTOR")
 client = boto3.client("lexv2-models")
 lambda_client = boto3.client("lambda")
 
+localeId = "en_US"
+
+# Readiness polling backs off from the initial delay up to the max delay between checks, and
+# gives up this long before the Lambda timeout so a failure can still be reported to CloudFormation
+INITIAL_POLL_DELAY_S = 5
+MAX_POLL_DELAY_S = 30
+BACKOFF_FACTOR = 2
+DEADLINE_MARGIN_S = 60
+
+def wait_until(description, check, deadline):
+    """
+    Poll check() with exponential backoff until it reports ready
+
+    check returns (ready, status) and raises when the resource reached a failed state.
+    Raises TimeoutError when the deadline (epoch seconds) passes first.
+    """
+    start = time.time()
+    delay = INITIAL_POLL_DELAY_S
+    attempt = 1
+    while True:
+        ready, status = check()
+        logger.info(f"{description}: {status} (attempt {attempt}, {time.time() - start:.0f}s elapsed)")
+        if ready:
+            return status
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise TimeoutError(f"{description} not ready after {time.time() - start:.0f}s, last status {status}")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * BACKOFF_FACTOR, MAX_POLL_DELAY_S)
+        attempt += 1
+
+def check_status(status, ready_statuses, failed_statuses, description):
+    if status in failed_statuses:
+        raise RuntimeError(f"{description} is in state {status}")
+    return status in ready_statuses, status
+
+def wait_for_draft_bot(deadline):
+    """Wait for the imported bot and its DRAFT locale to be built, starting the build if needed"""
+    wait_until(
+        "Bot",
+        lambda: check_status(client.describe_bot(botId=botId)['botStatus'], ['Available'], ['Failed', 'Inactive', 'Deleting'], "Bot"),
+        deadline
+    )
+
+    def locale_status():
+        status = client.describe_bot_locale(botId=botId, botVersion='DRAFT', localeId=localeId)['botLocaleStatus']
+        if status == 'NotBuilt':
+            logger.info(f"Locale {localeId} is not built, starting a build")
+            client.build_bot_locale(botId=botId, botVersion='DRAFT', localeId=localeId)
+            return False, status
+        return check_status(status, ['Built'], ['Failed', 'Deleting'], f"Locale {localeId}")
+
+    wait_until(f"DRAFT locale {localeId}", locale_status, deadline)
+
 def lambda_handler(event, context):
     """
     Custom Resource Lambda handler for creating Lex bot versions and aliases.
     """
     logger.info("Received event: %s", json.dumps(event))
-    time.sleep(660)  # Allow time for the event to be fully received
     
     # Extract request details
     request_type = event['RequestType']
@@ -40,7 +93,9 @@ def lambda_handler(event, context):
         if request_type == 'Create':
             logger.info("Handling Create request")
             # Create bot version and alias
-            response_data = create_bot_version_and_alias()
+            deadline = time.time() + context.get_remaining_time_in_millis() / 1000 - DEADLINE_MARGIN_S
+            wait_for_draft_bot(deadline)
+            response_data = create_bot_version_and_alias(deadline)
             physical_id = f"{botId}-version-{response_data.get('botVersion', 'unknown')}"
         
         elif request_type == 'Update':
@@ -82,10 +137,11 @@ def lambda_handler(event, context):
         # Re-raise for Lambda logging
         raise
 
-def create_bot_version_and_alias():
+def create_bot_version_and_alias(deadline):
     """
     Creates a bot version from DRAFT and an alias pointing to that version.
     Then updates Lambda function environment variables with the alias ID.
+    Each step waits until Lex reports the previous one ready or the deadline passes.
     """
     logger.info(f"Creating bot version for bot ID: {botId}")
     
@@ -94,7 +150,7 @@ def create_bot_version_and_alias():
         botId=botId,
         description="Created by CloudFormation custom resource",
         botVersionLocaleSpecification={
-            'en_US': {
+            localeId: {
                 'sourceBotVersion': 'DRAFT',
             }
         }
@@ -104,8 +160,14 @@ def create_bot_version_and_alias():
     logger.info(f"Created bot version: {bot_version}")
     
     # Wait for bot version to be built
-    logger.info(f"Waiting for bot version {bot_version} to be available")
-    time.sleep(60)
+    wait_until(
+        f"Bot version {bot_version}",
+        lambda: check_status(
+            client.describe_bot_version(botId=botId, botVersion=bot_version)['botStatus'],
+            ['Available'], ['Failed', 'Deleting', 'Inactive'], f"Bot version {bot_version}"
+        ),
+        deadline
+    )
     
     # Create an alias for the bot version
     logger.info(f"Creating bot alias for bot ID: {botId} and version: {bot_version}")
@@ -115,7 +177,7 @@ def create_bot_version_and_alias():
         botAliasName="PROD",
         description="Created by CloudFormation custom resource",
         botAliasLocaleSettings={
-            'en_US': {
+            localeId: {
                 'enabled': True,
                 'codeHookSpecification': {
                     'lambdaCodeHook': {
@@ -131,8 +193,14 @@ def create_bot_version_and_alias():
     logger.info(f"Created bot alias with ID: {bot_alias_id}")
     
     # Wait for bot alias to be available
-    logger.info(f"Waiting for bot alias {bot_alias_id} to be available")
-    time.sleep(60)
+    wait_until(
+        f"Bot alias {bot_alias_id}",
+        lambda: check_status(
+            client.describe_bot_alias(botId=botId, botAliasId=bot_alias_id)['botAliasStatus'],
+            ['Available'], ['Failed', 'Deleting'], f"Bot alias {bot_alias_id}"
+        ),
+        deadline
+    )
     
     # Update environment variables for the Lambda functions
     update_lambda_environment(lexBackendLambdaArn, bot_alias_id)
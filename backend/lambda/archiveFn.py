@@ -0,0 +1,96 @@
+#lambda function that moves complaints closed for longer than the retention window to the archive table
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from tableScan import parallel_scan
+from archiveTier import COMPLAINTS_TABLE, ARCHIVE_TABLE, ARCHIVED_MARKER, archive_cutoff, closed_on, now_iso
+from instrumentation import instrumented, instrument_client, add_metric
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+MOVE_WORKERS = 8
+
+
+def closed_candidates(cutoff):
+    """IDs of closed complaints whose closing date is before the cutoff"""
+    items = parallel_scan(
+        COMPLAINTS_TABLE,
+        FilterExpression=Attr('complaintStatus').eq('Closed'),
+        ProjectionExpression="complaintId, statusUpdatedAt, dateOfComplaint"
+    )
+    return [item['complaintId'] for item in items if closed_on(item) < cutoff], len(items)
+
+def archive_complaint(complaint_id):
+    """
+    Move one complaint to the archive, returning whether it moved
+
+    The complaint is first marked (only while it is still closed) so the stream consumer can tell this
+    removal from a deletion, then copied and deleted in one transaction that fails if it was reopened.
+    """
+    table = dynamodb.Table(COMPLAINTS_TABLE)
+    try:
+        item = table.update_item(
+            Key={'complaintId': complaint_id},
+            UpdateExpression='SET #marker = :now',
+            ConditionExpression=Attr('complaintStatus').eq('Closed'),
+            ExpressionAttributeNames={'#marker': ARCHIVED_MARKER},
+            ExpressionAttributeValues={':now': now_iso()},
+            ReturnValues='ALL_NEW'
+        )['Attributes']
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {'Put': {'TableName': ARCHIVE_TABLE, 'Item': item}},
+            {'Delete': {
+                'TableName': COMPLAINTS_TABLE,
+                'Key': {'complaintId': complaint_id},
+                'ConditionExpression': 'attribute_exists(#marker) AND complaintStatus = :closed',
+                'ExpressionAttributeNames': {'#marker': ARCHIVED_MARKER},
+                'ExpressionAttributeValues': {':closed': 'Closed'}
+            }}
+        ])
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        # Reopened between the two steps: it stays in the complaints table, without the marker
+        table.update_item(
+            Key={'complaintId': complaint_id},
+            UpdateExpression='REMOVE #marker',
+            ExpressionAttributeNames={'#marker': ARCHIVED_MARKER}
+        )
+        return False
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    dry_run = event.get('dryRun', False)
+    cutoff = archive_cutoff(days=event.get('olderThanDays'))
+
+    candidates, closed = closed_candidates(cutoff)
+    archived = 0
+    if not dry_run:
+        with ThreadPoolExecutor(max_workers=MOVE_WORKERS) as executor:
+            archived = sum(executor.map(archive_complaint, candidates))
+    add_metric("ComplaintsArchived", archived)
+    logger.info("Archived closed complaints", cutoff=cutoff, closed=closed, candidates=len(candidates), archived=archived, dryRun=dry_run)
+
+    return {
+        'statusCode': 200,
+        'body': {
+            "cutoff": cutoff,
+            "closedComplaints": closed,
+            "eligible": len(candidates),
+            "archived": archived,
+            "skipped": len(candidates) - archived if not dry_run else 0,
+            "dryRun": dry_run
+        }
+    }
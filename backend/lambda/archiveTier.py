@@ -0,0 +1,78 @@
+# Archive tier: complaints closed for longer than ARCHIVE_AFTER_DAYS live in a separate table
+# so scans of the complaints table are bounded by the active caseload
+import os
+from datetime import date, datetime, timedelta, timezone
+import boto3
+from instrumentation import instrument_client
+
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+# The stream consumer only needs the markers and runs without the table names
+COMPLAINTS_TABLE = os.environ.get('COMPLAINT_TABLE_NAME')
+# Unset when the stack has no archive table, in which case every read stays on the complaints table
+ARCHIVE_TABLE = os.environ.get('ARCHIVE_TABLE_NAME')
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '180'))
+
+# Set on a complaint just before it is moved to the archive; the stream consumer skips that removal
+ARCHIVED_MARKER = 'archivedAt'
+# Set on a complaint moved back from the archive; the stream consumer skips that insert
+RESTORED_MARKER = 'restoredAt'
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+def archive_cutoff(today=None, days=None):
+    """Date string before which closed complaints belong to the archive"""
+    today = today or date.today()
+    return (today - timedelta(days=ARCHIVE_AFTER_DAYS if days is None else days)).isoformat()
+
+def closed_on(item):
+    """When a complaint was closed; complaints closed before this was recorded fall back to their filing date"""
+    return str(item.get('statusUpdatedAt') or item.get('dateOfComplaint') or '')[:10]
+
+def wants_archive(spec):
+    """
+    Whether a filter specification can match archived complaints: it asks for closed complaints,
+    for specific complaint IDs, for archived data explicitly, or for dates older than the cutoff
+    """
+    if not ARCHIVE_TABLE:
+        return False
+    status = spec.get('complaintStatus')
+    if spec.get('includeArchived') or spec.get('complaintId'):
+        return True
+    if isinstance(status, str) and status.lower() == 'closed':
+        return True
+    earliest = spec.get('startDate') or spec.get('date')
+    return bool(earliest) and earliest < archive_cutoff()
+
+def is_tier_move(record):
+    """Stream records written by moving a complaint between the tiers, which change no counts"""
+    if record.get('eventName') == 'REMOVE':
+        return ARCHIVED_MARKER in record['dynamodb'].get('OldImage', {})
+    if record.get('eventName') == 'INSERT':
+        return RESTORED_MARKER in record['dynamodb'].get('NewImage', {})
+    return False
+
+def restore_complaint(complaint_id):
+    """Move an archived complaint back to the complaints table, returning it or None when it is not archived"""
+    if not ARCHIVE_TABLE:
+        return None
+    item = dynamodb.Table(ARCHIVE_TABLE).get_item(Key={'complaintId': complaint_id}).get('Item')
+    if not item:
+        return None
+    item.pop(ARCHIVED_MARKER, None)
+    item[RESTORED_MARKER] = now_iso()
+    dynamodb.meta.client.transact_write_items(TransactItems=[
+        {'Put': {
+            'TableName': COMPLAINTS_TABLE,
+            'Item': item,
+            'ConditionExpression': 'attribute_not_exists(complaintId)'
+        }},
+        {'Delete': {
+            'TableName': ARCHIVE_TABLE,
+            'Key': {'complaintId': complaint_id}
+        }}
+    ])
+    return item
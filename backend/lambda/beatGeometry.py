@@ -0,0 +1,148 @@
+import json
+import math
+import os
+
+# Beat polygons exported from the portal's beats.js (Esri FeatureSet, State Plane feet)
+BEATS_PATH = os.environ.get('BEATS_DATA_PATH', os.path.join(os.path.dirname(__file__), 'data', 'beats.json'))
+
+# NAD 1983 HARN StatePlane Arizona Central FIPS 0202 (Transverse Mercator, international feet)
+FOOT = 0.3048
+SEMI_MAJOR = 6378137.0
+FLATTENING = 1 / 298.257222101
+SCALE_FACTOR = 0.9999
+FALSE_EASTING = 700000.0 * FOOT
+FALSE_NORTHING = 0.0
+CENTRAL_MERIDIAN = math.radians(-111.9166666666667)
+LATITUDE_OF_ORIGIN = math.radians(31.0)
+
+E2 = FLATTENING * (2 - FLATTENING)
+EP2 = E2 / (1 - E2)
+
+_beats_cache = {}
+
+
+def _meridian_arc(phi):
+    """Meridional distance from the equator to latitude phi (radians)"""
+    e4 = E2 * E2
+    e6 = e4 * E2
+    return SEMI_MAJOR * (
+        (1 - E2 / 4 - 3 * e4 / 64 - 5 * e6 / 256) * phi
+        - (3 * E2 / 8 + 3 * e4 / 32 + 45 * e6 / 1024) * math.sin(2 * phi)
+        + (15 * e4 / 256 + 45 * e6 / 1024) * math.sin(4 * phi)
+        - (35 * e6 / 3072) * math.sin(6 * phi)
+    )
+
+
+M0 = _meridian_arc(LATITUDE_OF_ORIGIN)
+
+
+def state_plane_to_wgs84(x_ft, y_ft):
+    """Convert Arizona Central State Plane feet to (lon, lat) degrees"""
+    x = x_ft * FOOT - FALSE_EASTING
+    y = y_ft * FOOT - FALSE_NORTHING
+
+    m = M0 + y / SCALE_FACTOR
+    mu = m / (SEMI_MAJOR * (1 - E2 / 4 - 3 * E2 ** 2 / 64 - 5 * E2 ** 3 / 256))
+    e1 = (1 - math.sqrt(1 - E2)) / (1 + math.sqrt(1 - E2))
+    phi1 = (mu
+            + (3 * e1 / 2 - 27 * e1 ** 3 / 32) * math.sin(2 * mu)
+            + (21 * e1 ** 2 / 16 - 55 * e1 ** 4 / 32) * math.sin(4 * mu)
+            + (151 * e1 ** 3 / 96) * math.sin(6 * mu)
+            + (1097 * e1 ** 4 / 512) * math.sin(8 * mu))
+
+    sin1, cos1, tan1 = math.sin(phi1), math.cos(phi1), math.tan(phi1)
+    c1 = EP2 * cos1 ** 2
+    t1 = tan1 ** 2
+    n1 = SEMI_MAJOR / math.sqrt(1 - E2 * sin1 ** 2)
+    r1 = SEMI_MAJOR * (1 - E2) / (1 - E2 * sin1 ** 2) ** 1.5
+    d = x / (n1 * SCALE_FACTOR)
+
+    lat = phi1 - (n1 * tan1 / r1) * (
+        d ** 2 / 2
+        - (5 + 3 * t1 + 10 * c1 - 4 * c1 ** 2 - 9 * EP2) * d ** 4 / 24
+        + (61 + 90 * t1 + 298 * c1 + 45 * t1 ** 2 - 252 * EP2 - 3 * c1 ** 2) * d ** 6 / 720
+    )
+    lon = CENTRAL_MERIDIAN + (
+        d
+        - (1 + 2 * t1 + c1) * d ** 3 / 6
+        + (5 - 2 * c1 + 28 * t1 - 3 * c1 ** 2 + 8 * EP2 + 24 * t1 ** 2) * d ** 5 / 120
+    ) / cos1
+
+    return math.degrees(lon), math.degrees(lat)
+
+
+def load_beats(path=BEATS_PATH):
+    """
+    Load beat polygons projected to WGS84
+
+    Returns a list of dicts with beat, district, attributes, rings ([[lon, lat], ...])
+    and bbox (min_lon, min_lat, max_lon, max_lat). Results are cached per path.
+    """
+    if path in _beats_cache:
+        return _beats_cache[path]
+
+    with open(path) as f:
+        feature_set = json.load(f)
+
+    beats = []
+    for feature in feature_set['features']:
+        attributes = feature['attributes']
+        rings = [[list(state_plane_to_wgs84(x, y)) for x, y in ring] for ring in feature['geometry']['rings']]
+        lons = [p[0] for ring in rings for p in ring]
+        lats = [p[1] for ring in rings for p in ring]
+        beats.append({
+            'beat': str(attributes.get('POLICE_BEAT', '')),
+            'district': attributes.get('POLICE_DISTRICT'),
+            'attributes': attributes,
+            'rings': rings,
+            'bbox': (min(lons), min(lats), max(lons), max(lats))
+        })
+
+    _beats_cache[path] = beats
+    return beats
+
+
+def point_in_ring(lon, lat, ring):
+    """Even-odd ray casting test for a single ring"""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat) and lon < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def point_in_beat(lon, lat, beat):
+    """Check whether a point falls inside a beat (rings combined with the even-odd rule)"""
+    min_lon, min_lat, max_lon, max_lat = beat['bbox']
+    if lon < min_lon or lon > max_lon or lat < min_lat or lat > max_lat:
+        return False
+    inside = False
+    for ring in beat['rings']:
+        if point_in_ring(lon, lat, ring):
+            inside = not inside
+    return inside
+
+
+def beats_bbox(beats=None):
+    """(min_lon, min_lat, max_lon, max_lat) around every beat"""
+    boxes = [beat['bbox'] for beat in (beats if beats is not None else load_beats())]
+    return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+            max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+
+def beat_numbers(beats=None):
+    """Distinct beat numbers in the beat data, numeric ones first in order, e.g. 0, 1 ... 18, 3M"""
+    numbers = {beat['beat'] for beat in (beats if beats is not None else load_beats()) if beat['beat']}
+    return sorted(numbers, key=lambda number: (not number.isdigit(), int(number) if number.isdigit() else 0, number))
+
+
+def find_beat(lon, lat, beats=None):
+    """Return the beat number containing (lon, lat), or "" when outside every beat"""
+    for beat in beats if beats is not None else load_beats():
+        if point_in_beat(lon, lat, beat):
+            return beat['beat']
+    return ""
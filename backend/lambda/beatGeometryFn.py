@@ -0,0 +1,70 @@
+#lambda function serving simplified beat boundaries as TopoJSON or GeoJSON, with ETags and long-lived caching
+import hashlib
+import json
+from beatTopology import MIN_ZOOM, MAX_ZOOM, build_topology, clamp_zoom, to_topojson, to_geojson
+from instrumentation import instrumented
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+
+FORMATS = {
+    "topojson": (to_topojson, "application/json"),
+    "geojson": (to_geojson, "application/geo+json")
+}
+DEFAULT_FORMAT = "topojson"
+DEFAULT_ZOOM = 12
+# A URL pinned to the current version never changes, anything else is rechecked hourly against the ETag
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATED_CACHE = "public, max-age=3600"
+
+# Serialized bodies and their ETags per (format, zoom), computed once per container
+_responses = {}
+
+
+def rendered(file_format, zoom):
+    """Body and strong ETag of one format and zoom level"""
+    key = (file_format, zoom)
+    if key not in _responses:
+        serialize, _ = FORMATS[file_format]
+        body = json.dumps(serialize(build_topology(), zoom), separators=(',', ':'))
+        _responses[key] = body, '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"'
+    return _responses[key]
+
+def header(headers, name):
+    """Case-insensitive request header lookup"""
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag in tags
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    params = event.get('queryStringParameters') or {}
+    file_format = str(params.get('format') or DEFAULT_FORMAT).lower()
+    if file_format not in FORMATS:
+        return {'statusCode': 400, 'headers': {'Access-Control-Allow-Origin': '*'}, 'body': f"format must be one of {', '.join(FORMATS)}"}
+    try:
+        zoom = clamp_zoom(params.get('zoom') or DEFAULT_ZOOM)
+    except ValueError:
+        return {'statusCode': 400, 'headers': {'Access-Control-Allow-Origin': '*'}, 'body': f"zoom must be an integer, served for {MIN_ZOOM} to {MAX_ZOOM}"}
+
+    body, etag = rendered(file_format, zoom)
+    version = build_topology()["version"]
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Expose-Headers': 'ETag, X-Geometry-Version',
+        'Content-Type': FORMATS[file_format][1],
+        'ETag': etag,
+        'X-Geometry-Version': version,
+        'Cache-Control': IMMUTABLE_CACHE if params.get('v') == version else REVALIDATED_CACHE
+    }
+    if etag_matches(header(event.get('headers'), 'if-none-match'), etag):
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    return {'statusCode': 200, 'headers': headers, 'body': body}
@@ -1,13 +1,104 @@
 import json
+import math
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import instrumented, span
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
 
 
 # TODO: Make URL and env variable
 url = "https://gistest.chandleraz.gov/appsanonymous/rest/services/Geocoders/PoliceBeat_Composite/GeocodeServer/findAddressCandidates"
+batch_url = "https://gistest.chandleraz.gov/appsanonymous/rest/services/Geocoders/PoliceBeat_Composite/GeocodeServer/geocodeAddresses"
+
+# Largest batch the geocoder accepts per geocodeAddresses request
+BATCH_SIZE = 100
+# Batch matches (score 0-100) below this are geocoded again one at a time, like unmatched addresses
+MIN_BATCH_SCORE = 80
+
+def find_candidates(location_data):
+    """Geocode a single address and return the raw candidate list"""
+    payload = {
+        "Address": location_data,
+        "City": "chandler",
+        "outFields": "Shape, Match_addr, Score, Loc_name, City, PoliceBeat",
+        "outSR": "4326",
+        "f": "json"
+    }
+    with span("Geocode"):
+        response = requests.post(url, data=payload)
+    return response.json().get('candidates', [])
+
+def is_batch_match(location):
+    """
+    Whether a geocodeAddresses result located its address: unmatched ones still come back, with
+    "NaN" coordinates and a score of 0
+    """
+    point = location.get('location') or {}
+    try:
+        x, y, score = float(point.get('x')), float(point.get('y')), float(location.get('score', 0))
+    except (TypeError, ValueError):
+        return False
+    return math.isfinite(x) and math.isfinite(y) and score >= MIN_BATCH_SCORE
+
+def geocode_batch(addresses):
+    """
+    Geocode a list of {"id", "location_data"} records with the geocodeAddresses batch operation
+
+    Returns a dict of id -> candidate list in the same shape as findAddressCandidates so
+    callers can reuse the single address candidate selection. Addresses the batch call
+    failed on or could not match confidently are geocoded one at a time.
+    """
+    results = {}
+    for start in range(0, len(addresses), BATCH_SIZE):
+        chunk = addresses[start:start + BATCH_SIZE]
+        records = [
+            {"attributes": {"OBJECTID": index, "SingleLine": record['location_data'], "City": "chandler"}}
+            for index, record in enumerate(chunk)
+        ]
+        try:
+            with span("GeocodeBatch"):
+                response = requests.post(batch_url, data={
+                    "addresses": json.dumps({"records": records}),
+                    "outFields": "Match_addr, Score, Loc_name, City, PoliceBeat",
+                    "outSR": "4326",
+                    "f": "json"
+                })
+            locations = response.json().get('locations', [])
+        except Exception as e:
+            logger.warning("Batch geocode failed, falling back to single requests", error=str(e))
+            locations = []
 
+        for location in locations:
+            result_id = location.get('attributes', {}).get('ResultID')
+            if result_id is None or not is_batch_match(location):
+                continue
+            results[chunk[result_id]['id']] = [{
+                "address": location.get('address', ''),
+                "location": location['location'],
+                "score": location.get('score', 0),
+                "attributes": {"PoliceBeat": location.get('attributes', {}).get('PoliceBeat', '')}
+            }]
+
+        missing = [record for record in chunk if record['id'] not in results]
+        if missing:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                for record, candidates in zip(missing, executor.map(lambda r: find_candidates(r['location_data']), missing)):
+                    results[record['id']] = candidates
+    return results
+
+@instrumented
 def lambda_handler(event, context):
-    print(event)
+    logger.debug("Received event", event=event)
     try:
+        # Batch mode used by bulk imports
+        if 'addresses' in event:
+            return {
+                'statusCode': 200,
+                'body': {"results": geocode_batch(event['addresses'])}
+            }
+
         payload = {
             "Address": event.get('location_data', ""),
             "City": "chandler",
@@ -17,7 +108,8 @@ def lambda_handler(event, context):
         }
 
         # Send the POST request with the payload
-        response = requests.post(url, data=payload)
+        with span("Geocode"):
+            response = requests.post(url, data=payload)
         data = response.json()
 
         if "candidates" in data:
@@ -37,4 +129,4 @@ def lambda_handler(event, context):
         }
 
 
-    
+
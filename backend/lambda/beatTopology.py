@@ -0,0 +1,246 @@
+# Beat boundaries as a topology: shared borders are stored once as arcs and simplified once, so
+# neighbouring beats keep a common edge at every zoom level. Serialized as quantized TopoJSON or GeoJSON.
+import hashlib
+import math
+from beatGeometry import BEATS_PATH, load_beats
+
+# Zoom levels simplified for; requests outside are clamped. Chandler fills a screen around zoom 11-12
+MIN_ZOOM = 8
+MAX_ZOOM = 16
+# Simplification tolerance in screen pixels, and output grid steps per tolerance
+TOLERANCE_PX = 1.0
+STEPS_PER_TOLERANCE = 2
+# Web Mercator ground resolution at the equator, meters per pixel at zoom 0 with 256 px tiles
+EQUATOR_RESOLUTION_M = 156543.03392
+METERS_PER_DEGREE = 111320.0
+# Beat properties carried into the output
+PROPERTIES = {"beat": "POLICE_BEAT", "district": "POLICE_DISTRICT", "effectiveDate": "EFFECTIVE_DATE"}
+
+_topology_cache = {}
+
+
+def geometry_version(path=BEATS_PATH):
+    """Content hash of the boundary source, which changes exactly when the geometry does"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def clamp_zoom(zoom):
+    return max(MIN_ZOOM, min(MAX_ZOOM, int(zoom)))
+
+def tolerance_m(zoom, latitude):
+    return TOLERANCE_PX * EQUATOR_RESOLUTION_M * math.cos(math.radians(latitude)) / 2 ** zoom
+
+def ring_junctions(rings):
+    """
+    Indices of the vertices where each ring's neighbourhood changes: the ring starts or stops sharing
+    its border with another ring there
+    """
+    edge_rings = {}
+    for ring_index, ring in enumerate(rings):
+        for a, b in zip(ring, ring[1:]):
+            edge_rings.setdefault(frozenset((a, b)), set()).add(ring_index)
+    junctions = []
+    for ring in rings:
+        # ring[0] == ring[-1], so vertex i has incoming edge (i - 1, i) and outgoing edge (i, i + 1)
+        points = ring[:-1]
+        count = len(points)
+        junctions.append([
+            index for index in range(count)
+            if edge_rings[frozenset((points[index - 1], points[index]))] != edge_rings[frozenset((points[index], points[(index + 1) % count]))]
+        ])
+    return junctions
+
+def canonical_closed(points):
+    """Rotation of a closed arc starting at its smallest vertex, so equal rings map to one arc"""
+    open_points = points[:-1]
+    start = open_points.index(min(open_points))
+    rotated = open_points[start:] + open_points[:start]
+    return rotated + rotated[:1]
+
+def significance(points, project):
+    """
+    Douglas-Peucker significance of each vertex: the largest tolerance (meters) at which it survives.
+    Endpoints are always kept. Computed once per arc; simplifying at a tolerance keeps the vertices at
+    or above it, which is the same result as running Douglas-Peucker at that tolerance.
+    """
+    xy = [project(point) for point in points]
+    result = [math.inf] * len(points)
+    stack = [(0, len(points) - 1, math.inf)]
+    while stack:
+        first, last, ceiling = stack.pop()
+        if last - first < 2:
+            continue
+        (x1, y1), (x2, y2) = xy[first], xy[last]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+        best, best_index = -1.0, first + 1
+        for index in range(first + 1, last):
+            x, y = xy[index]
+            # Distance to the chord, or to its start when the arc is closed
+            distance = abs(dy * (x - x1) - dx * (y - y1)) / length if length else math.hypot(x - x1, y - y1)
+            if distance > best:
+                best, best_index = distance, index
+        # A vertex never outlives the split that made its chord
+        result[best_index] = min(best, ceiling)
+        stack.append((first, best_index, result[best_index]))
+        stack.append((best_index, last, result[best_index]))
+    return result
+
+def build_topology(path=BEATS_PATH):
+    """
+    Arcs and beat geometries of the boundary source
+
+    Returns {"arcs": [{"points", "significance", "minInterior"}], "geometries": [{"arcs", "properties"}],
+    "bbox", "version"}. A geometry's arc index i means arc i forward, ~i arc i reversed (TopoJSON).
+    """
+    if path in _topology_cache:
+        return _topology_cache[path]
+
+    beats = load_beats(path)
+    rings = [[tuple(point) for point in ring] for beat in beats for ring in beat['rings']]
+    lons = [point[0] for ring in rings for point in ring]
+    lats = [point[1] for ring in rings for point in ring]
+    bbox = (min(lons), min(lats), max(lons), max(lats))
+    scale_x = METERS_PER_DEGREE * math.cos(math.radians((bbox[1] + bbox[3]) / 2))
+
+    def project(point):
+        return (point[0] - bbox[0]) * scale_x, (point[1] - bbox[1]) * METERS_PER_DEGREE
+
+    arcs, arc_index = [], {}
+
+    def add_arc(points, min_interior):
+        key = tuple(points)
+        if key in arc_index:
+            index = arc_index[key]
+        elif key[::-1] in arc_index:
+            index = ~arc_index[key[::-1]]
+        else:
+            index = arc_index[key] = len(arcs)
+            arcs.append({"points": points, "significance": significance(points, project), "minInterior": 0})
+        arc = arcs[index if index >= 0 else ~index]
+        # A ring needs three distinct vertices; with fewer junctions its arcs must keep some interior ones
+        arc["minInterior"] = max(arc["minInterior"], min_interior, 0)
+        return index
+
+    ring_arcs = []
+    for ring, junctions in zip(rings, ring_junctions(rings)):
+        if not junctions:
+            ring_arcs.append([add_arc(canonical_closed(ring), 2)])
+            continue
+        points = ring[:-1]
+        # Walk the ring from its first junction, cutting an arc at every junction
+        rotated = points[junctions[0]:] + points[:junctions[0]]
+        cuts = [index - junctions[0] for index in junctions] + [len(points)]
+        rotated.append(rotated[0])
+        ring_arcs.append([add_arc(rotated[start:end + 1], 3 - len(junctions)) for start, end in zip(cuts, cuts[1:])])
+
+    geometries = []
+    ring_offset = 0
+    for beat in beats:
+        count = len(beat['rings'])
+        geometries.append({
+            "arcs": ring_arcs[ring_offset:ring_offset + count],
+            "properties": {name: beat['attributes'].get(source) for name, source in PROPERTIES.items()}
+        })
+        ring_offset += count
+
+    topology = {"arcs": arcs, "geometries": geometries, "bbox": bbox, "version": geometry_version(path)}
+    _topology_cache[path] = topology
+    return topology
+
+def simplified_arc(arc, tolerance):
+    """Arc vertices kept at a tolerance, with at least the arc's minimum of interior vertices"""
+    ranked = sorted(range(1, len(arc["points"]) - 1), key=lambda index: -arc["significance"][index])
+    keep = {0, len(arc["points"]) - 1}
+    keep.update(ranked[:arc["minInterior"]])
+    keep.update(index for index in ranked if arc["significance"][index] >= tolerance)
+    return [arc["points"][index] for index in sorted(keep)]
+
+def quantizer(topology, zoom):
+    """Grid of the output at a zoom: point -> integer (x, y), plus the TopoJSON transform"""
+    min_lon, min_lat, max_lon, max_lat = topology["bbox"]
+    middle = (min_lat + max_lat) / 2
+    step_m = tolerance_m(zoom, middle) / STEPS_PER_TOLERANCE
+    scale_x = step_m / (METERS_PER_DEGREE * math.cos(math.radians(middle)))
+    scale_y = step_m / METERS_PER_DEGREE
+
+    def quantize(point):
+        return round((point[0] - min_lon) / scale_x), round((point[1] - min_lat) / scale_y)
+    return quantize, {"scale": [scale_x, scale_y], "translate": [min_lon, min_lat]}
+
+def quantized_arcs(topology, zoom):
+    """Simplified arcs of a zoom level on its output grid, repeated grid points removed"""
+    min_lat, max_lat = topology["bbox"][1], topology["bbox"][3]
+    tolerance = tolerance_m(zoom, (min_lat + max_lat) / 2)
+    quantize, transform = quantizer(topology, zoom)
+    arcs = []
+    for arc in topology["arcs"]:
+        points = []
+        for point in map(quantize, simplified_arc(arc, tolerance)):
+            if not points or point != points[-1]:
+                points.append(point)
+        # Keep both ends of an arc that collapsed onto one grid point, so rings still join up
+        if len(points) == 1:
+            points.append(points[0])
+        arcs.append(points)
+    return arcs, transform
+
+def to_topojson(topology, zoom):
+    """Delta-encoded, quantized TopoJSON of the beats at a zoom level"""
+    arcs, transform = quantized_arcs(topology, zoom)
+    encoded = []
+    for points in arcs:
+        deltas = [list(points[0])]
+        deltas += [[x - previous[0], y - previous[1]] for previous, (x, y) in zip(points, points[1:])]
+        encoded.append(deltas)
+    return {
+        "type": "Topology",
+        "version": topology["version"],
+        "zoom": zoom,
+        "transform": transform,
+        "objects": {"beats": {"type": "GeometryCollection", "geometries": [
+            {"type": "Polygon", "arcs": geometry["arcs"], "properties": geometry["properties"]}
+            for geometry in topology["geometries"]
+        ]}},
+        "arcs": encoded
+    }
+
+def signed_area(ring):
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:])) / 2
+
+def to_geojson(topology, zoom):
+    """
+    GeoJSON FeatureCollection of the beats at a zoom level, coordinates rounded to the zoom's grid
+
+    Rings are stitched from the same simplified arcs as the TopoJSON, so neighbouring beats still share
+    their borders exactly; exterior rings are counter-clockwise and holes clockwise per RFC 7946.
+    """
+    arcs, transform = quantized_arcs(topology, zoom)
+    (scale_x, scale_y), (origin_lon, origin_lat) = transform["scale"], transform["translate"]
+    # Enough decimals to tell grid steps apart
+    digits = max(0, math.ceil(-math.log10(min(scale_x, scale_y))) + 1)
+
+    def ring_coordinates(ring, exterior):
+        points = []
+        for index in ring:
+            arc = arcs[index] if index >= 0 else arcs[~index][::-1]
+            points.extend(arc if not points else arc[1:])
+        if (signed_area(points) < 0) == exterior:
+            points.reverse()
+        return [[round(origin_lon + x * scale_x, digits), round(origin_lat + y * scale_y, digits)] for x, y in points]
+
+    return {
+        "type": "FeatureCollection",
+        "version": topology["version"],
+        "zoom": zoom,
+        "features": [
+            {
+                "type": "Feature",
+                "properties": geometry["properties"],
+                "geometry": {"type": "Polygon", "coordinates": [
+                    ring_coordinates(ring, index == 0) for index, ring in enumerate(geometry["arcs"])
+                ]}
+            }
+            for geometry in topology["geometries"]
+        ]
+    }
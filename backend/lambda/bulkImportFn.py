@@ -0,0 +1,338 @@
+#lambda function to bulk import historical complaints from CSV or JSONL files in S3
+import boto3
+import codecs
+import csv
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timezone, date
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from complaintItems import (
+    VALID_STATUSES, VALID_CATEGORIES, VALID_DAYS,
+    build_location_data, select_beat_candidate, build_complaint_item, convert_to_utc7
+)
+from beatGeometry import find_beat
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+s3_client = instrument_client(boto3.client('s3'))
+# Waits out the beat retrieval function's 5 minute timeout: the 60 s default would invoke a slow geocode batch again
+lambda_client = instrument_client(boto3.client('lambda', config=Config(read_timeout=310)))
+
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+LAMBDA_API_FN = os.environ['LAMBDA_FN_NAME']
+IMPORT_BUCKET = os.environ['IMPORT_BUCKET_NAME']
+
+# Rows validated, geocoded and written between two checkpoints
+PAGE_SIZE = 500
+# BatchWriteItem accepts at most 25 put requests per call
+BATCH_WRITE_SIZE = 25
+WRITE_WORKERS = 8
+MAX_WRITE_ATTEMPTS = 8
+# Stop and hand over to a fresh invocation when less than this much time is left
+TIME_MARGIN_MS = 90 * 1000
+# Invalid rows kept in the checkpoint report
+MAX_REPORTED_ERRORS = 200
+
+TRUE_VALUES = ["true", "yes", "y", "1"]
+
+
+class RowError(ValueError):
+    """Raised when an import row cannot be normalized"""
+
+
+def invoke_lambda(function_name, payload, invocation_type='RequestResponse'):
+    """Invoke another Lambda function with the given payload"""
+
+    try:
+        response = lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType=invocation_type,
+            Payload=payload
+        )
+        return response['Payload'].read()
+    except Exception as e:
+        logger.error("Error invoking Lambda function", function=function_name, error=str(e))
+        raise e
+
+def checkpoint_key(key):
+    """S3 key of the progress checkpoint for an import file"""
+    return f"checkpoints/{key}.json"
+
+def load_checkpoint(bucket, key):
+    """Load the checkpoint of an import, or None when it has not started yet"""
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=checkpoint_key(key))
+        return json.loads(response['Body'].read())
+    except s3_client.exceptions.NoSuchKey:
+        return None
+
+def save_checkpoint(bucket, key, checkpoint):
+    """Persist the checkpoint so an interrupted import can resume"""
+    checkpoint['updatedAt'] = datetime.now(timezone.utc).isoformat()
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=checkpoint_key(key),
+        Body=json.dumps(checkpoint).encode('utf-8'),
+        ContentType='application/json'
+    )
+
+def iter_rows(bucket, key, file_format):
+    """Stream rows from the import file without loading it into memory"""
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+    text_stream = codecs.getreader('utf-8-sig')(body)
+    if file_format == 'csv':
+        for row in csv.DictReader(text_stream):
+            yield row
+    else:
+        for line in text_stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Malformed lines are reported as invalid rows instead of failing the import
+                yield None
+
+def split_list(value):
+    """Read a list column that may be a JSON array or a comma/semicolon separated string"""
+    if value is None or value == "":
+        return []
+    if isinstance(value, list):
+        return value
+    value = str(value).strip()
+    if value.startswith('['):
+        return json.loads(value)
+    return [part.strip() for part in value.replace(';', ',').split(',') if part.strip()]
+
+def match_option(value, options, field):
+    """Case-insensitive match of a value against the allowed options"""
+    for option in options:
+        if str(value).strip().lower() == option.lower():
+            return option
+    raise RowError(f"Invalid {field}: {value}")
+
+def parse_coordinates(row):
+    """Return (lon, lat) floats when the row carries coordinates, otherwise None"""
+    if row.get('longitude') not in (None, "") and row.get('latitude') not in (None, ""):
+        lon, lat = row['longitude'], row['latitude']
+    elif row.get('coordinates') not in (None, "", []):
+        parts = split_list(row['coordinates'])
+        if len(parts) != 2 or "" in parts:
+            return None
+        lon, lat = parts
+    else:
+        return None
+    try:
+        return float(lon), float(lat)
+    except (TypeError, ValueError):
+        raise RowError(f"Invalid coordinates: {lon}, {lat}")
+
+def normalize_row(row, import_id, row_number):
+    """
+    Validate a raw import row and turn it into the event shape used by dbManagementFn
+
+    Returns:
+    dict: normalized event with complaintId, complaintStatus, dateOfComplaint and lonLat
+    """
+    if not isinstance(row, dict):
+        raise RowError("Malformed row")
+    event = {k: (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k is not None}
+
+    location = str(event.get('location', '')).lower()
+    if location not in ['address', 'intersection']:
+        raise RowError(f"Invalid location: {event.get('location', '')}")
+    event['location'] = location
+    if location == 'address' and not event.get('addressStreet'):
+        raise RowError("Missing addressStreet")
+    if location == 'intersection' and not (event.get('intersection1Street') and event.get('intersection2Street')):
+        raise RowError("Missing intersection streets")
+
+    event['problemCategory'] = match_option(event.get('problemCategory', ''), VALID_CATEGORIES, 'problemCategory')
+    event['complaintStatus'] = match_option(event.get('complaintStatus') or 'Open', VALID_STATUSES, 'complaintStatus')
+    event['daysOfWeek'] = [match_option(day, VALID_DAYS, 'daysOfWeek') for day in split_list(event.get('daysOfWeek'))]
+    event['isUrgentChecked'] = str(event.get('isUrgentChecked', '')).lower() in TRUE_VALUES
+
+    # Legacy system exports may name the notes column after the stored attribute
+    if 'officersNotes' in event and 'officersNote' not in event:
+        event['officersNote'] = event['officersNotes']
+
+    for field in ['startTime', 'endTime']:
+        try:
+            convert_to_utc7(event.get(field) or "")
+        except (TypeError, ValueError):
+            raise RowError(f"Invalid {field}: {event.get(field)}")
+
+    if event.get('dateOfComplaint'):
+        try:
+            event['dateOfComplaint'] = date.fromisoformat(str(event['dateOfComplaint'])[:10]).isoformat()
+        except ValueError:
+            raise RowError(f"Invalid dateOfComplaint: {event['dateOfComplaint']}")
+
+    # Deterministic ids make a resumed import overwrite rather than duplicate rows.
+    # They are longer than live 8 character ids so the two can never collide.
+    if not event.get('complaintId'):
+        event['complaintId'] = hashlib.sha1(f"{import_id}:{row_number}".encode('utf-8')).hexdigest()[:12]
+
+    event['lonLat'] = parse_coordinates(event)
+    return event
+
+def resolve_beats(events):
+    """
+    Assign beat numbers and coordinates to a page of normalized rows
+
+    Rows with coordinates are resolved locally with point-in-polygon, the rest are
+    geocoded together through the beat retrieval batch mode.
+    """
+    resolved = {}
+    to_geocode = []
+    for event in events:
+        if event['lonLat'] is not None:
+            lon, lat = event['lonLat']
+            resolved[event['complaintId']] = (find_beat(lon, lat) or event.get('beatNumber', ''), (str(lon), str(lat)))
+        else:
+            to_geocode.append({"id": event['complaintId'], "location_data": build_location_data(event)})
+
+    if to_geocode:
+        beat_data = invoke_lambda(LAMBDA_API_FN, json.dumps({"addresses": to_geocode}))
+        results = json.loads(beat_data)['body']['results']
+        for record in to_geocode:
+            resolved[record['id']] = select_beat_candidate(results.get(record['id'], []))
+    return resolved
+
+def write_chunk(items):
+    """Write up to 25 items with BatchWriteItem, retrying unprocessed items with backoff"""
+    request_items = {COMPLAINTS_TABLE: [{'PutRequest': {'Item': item}} for item in items]}
+    for attempt in range(MAX_WRITE_ATTEMPTS):
+        response = dynamodb.meta.client.batch_write_item(RequestItems=request_items)
+        request_items = response.get('UnprocessedItems', {})
+        if not request_items:
+            return len(items)
+        time.sleep(min(0.05 * (2 ** attempt), 5) * (1 + random.random()))
+    raise RuntimeError(f"{len(request_items.get(COMPLAINTS_TABLE, []))} items still unprocessed after {MAX_WRITE_ATTEMPTS} attempts")
+
+def write_items(items):
+    """Write a page of items as concurrent 25 item BatchWriteItem chunks"""
+    # A single BatchWriteItem call rejects duplicate keys, keep the last row per id
+    unique_items = list({item['complaintId']: item for item in items}.values())
+    chunks = [unique_items[i:i + BATCH_WRITE_SIZE] for i in range(0, len(unique_items), BATCH_WRITE_SIZE)]
+    with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as executor:
+        return sum(executor.map(write_chunk, chunks))
+
+def process_page(page, checkpoint, import_id):
+    """Validate, geocode and write one page of (row_number, row) pairs"""
+    events = []
+    for row_number, row in page:
+        try:
+            events.append(normalize_row(row, import_id, row_number))
+        except (RowError, ValueError) as e:
+            checkpoint['invalid'] += 1
+            if len(checkpoint['errors']) < MAX_REPORTED_ERRORS:
+                checkpoint['errors'].append({"row": row_number, "error": str(e)})
+
+    beats = resolve_beats(events)
+    items = []
+    for event in events:
+        beat_no, coordinates = beats[event['complaintId']]
+        items.append(build_complaint_item(
+            event, event['complaintId'], beat_no, coordinates,
+            status=event['complaintStatus'],
+            date_of_complaint=event.get('dateOfComplaint')
+        ))
+    checkpoint['imported'] += write_items(items)
+
+def run_import(event, context):
+    """Run (or resume) an import until the file is done or the invocation runs out of time"""
+    bucket = event.get('bucket', IMPORT_BUCKET)
+    key = event['key']
+    file_format = event.get('format') or ('csv' if key.lower().endswith('.csv') else 'jsonl')
+
+    checkpoint = None if event.get('restart', False) else load_checkpoint(bucket, key)
+    if checkpoint is None:
+        checkpoint = {"bucket": bucket, "key": key, "format": file_format, "nextRow": 0,
+                      "imported": 0, "invalid": 0, "errors": [], "done": False}
+    if checkpoint['done']:
+        return {'statusCode': 200, 'body': checkpoint}
+
+    import_id = f"{bucket}/{key}"
+    page = []
+    for row_number, row in enumerate(iter_rows(bucket, key, file_format)):
+        if row_number < checkpoint['nextRow']:
+            continue
+        page.append((row_number, row))
+        if len(page) < PAGE_SIZE:
+            continue
+
+        process_page(page, checkpoint, import_id)
+        checkpoint['nextRow'] = row_number + 1
+        save_checkpoint(bucket, key, checkpoint)
+        page = []
+        logger.info("Import progress", key=key, imported=checkpoint['imported'], invalid=checkpoint['invalid'], nextRow=checkpoint['nextRow'])
+
+        if context is not None and context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+            # Hand over to a fresh invocation which resumes from the checkpoint
+            invoke_lambda(context.function_name, json.dumps({"action": "run", "bucket": bucket, "key": key, "format": file_format}), 'Event')
+            return {'statusCode': 200, 'body': checkpoint}
+
+    if page:
+        process_page(page, checkpoint, import_id)
+        checkpoint['nextRow'] = page[-1][0] + 1
+    checkpoint['done'] = True
+    save_checkpoint(bucket, key, checkpoint)
+    return {'statusCode': 200, 'body': checkpoint}
+
+def start_import(event, context):
+    """Stage inline data if needed and start the import asynchronously"""
+    bucket = event.get('bucket', IMPORT_BUCKET)
+    key = event.get('key')
+    file_format = event.get('format')
+
+    if key is None:
+        if 'data' not in event:
+            return {'statusCode': 400, 'body': "Either key or data must be provided"}
+        file_format = file_format or 'jsonl'
+        key = f"imports/{uuid.uuid4()}.{file_format}"
+        s3_client.put_object(Bucket=bucket, Key=key, Body=event['data'].encode('utf-8'))
+
+    invoke_lambda(context.function_name, json.dumps({
+        "action": "run",
+        "bucket": bucket,
+        "key": key,
+        "format": file_format,
+        "restart": event.get('restart', False)
+    }), 'Event')
+    return {
+        'statusCode': 200,
+        'message': 'Import started',
+        'body': {"bucket": bucket, "key": key, "checkpoint": checkpoint_key(key)}
+    }
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=lambda: {k: v for k, v in event.items() if k != 'data'})
+    action = event.get('action', 'start')
+
+    # Worker failures propagate so the asynchronous invocation is retried from the checkpoint
+    if action == 'run':
+        return run_import(event, context)
+
+    try:
+        if action == 'status':
+            checkpoint = load_checkpoint(event.get('bucket', IMPORT_BUCKET), event['key'])
+            return {'statusCode': 200 if checkpoint else 404, 'body': checkpoint or "Import not found"}
+        else:
+            return start_import(event, context)
+    except Exception as e:
+        logger.error("Import failed", error=str(e))
+        return {
+            'statusCode': 500,
+            'body': f"Error: {str(e)}"
+        }
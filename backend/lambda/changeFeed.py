@@ -0,0 +1,170 @@
+# Live change feed: the complaints table stream turned into compact deltas for subscribed portal sessions.
+# Sessions subscribe by beat and status. The subscription index holds one item per (topic, connection),
+# where a topic is "<beat>#<status>" and ALL stands for any beat or any status, so the connections
+# interested in a complaint are found by reading at most four topics for each of its old and new states.
+import json
+from decimal import Decimal
+from boto3.dynamodb.types import TypeDeserializer
+from complaintItems import ATTRIBUTE_DEFAULTS, VALID_STATUSES, expand_item
+from duplicateDetection import PARENT_ATTRIBUTE, COUNT_ATTRIBUTE
+from archiveTier import is_tier_move
+
+SEPARATOR = "#"
+ALL = "*"
+# Partition of a connection's own item, which lists its topics so they can be removed with it
+CONNECTION_PREFIX = "#connection#"
+# Beats x statuses one session may subscribe to
+MAX_TOPICS = 100
+# API Gateway drops WebSocket connections after two hours; the index forgets them a little later
+CONNECTION_TTL_SECONDS = 3 * 60 * 60
+# Below the 128 KB WebSocket message limit of API Gateway
+MAX_MESSAGE_BYTES = 96 * 1024
+# Attributes the portal shows, in the shape dbQueryFn returns them
+FEED_FIELDS = list(ATTRIBUTE_DEFAULTS) + [
+    "complaintId", "complaintStatus", "coordinates", "startDate", "endDate", "submittedAt", PARENT_ATTRIBUTE, COUNT_ATTRIBUTE
+]
+# Sent with every delta so clients can apply their other filters and move counts between statuses
+KEY_FIELDS = ["beatNumber", "complaintStatus", "problemCategory", "dateOfComplaint"]
+
+deserializer = TypeDeserializer()
+
+
+class SubscriptionError(ValueError):
+    """Raised for a subscription the feed does not accept"""
+
+
+def deserialize(image):
+    return {name: deserializer.deserialize(value) for name, value in (image or {}).items()}
+
+def topic(beat, status):
+    return f"{beat}{SEPARATOR}{status}"
+
+def as_list(value):
+    if value is None or value == "":
+        return []
+    return [str(each) for each in (value if isinstance(value, list) else [value]) if str(each)]
+
+def subscription_topics(beats, statuses):
+    """Topics of a subscription to some beats and statuses, no beats or no statuses meaning all of them"""
+    beats, statuses = sorted(set(as_list(beats))), sorted(set(as_list(statuses)))
+    unknown = [status for status in statuses if status not in VALID_STATUSES]
+    if unknown:
+        raise SubscriptionError(f"unknown complaintStatus: {', '.join(unknown)}")
+    if any(SEPARATOR in beat or beat == ALL for beat in beats):
+        raise SubscriptionError("invalid beatNumber")
+    topics = [topic(beat, status) for beat in beats or [ALL] for status in statuses or [ALL]]
+    if len(topics) > MAX_TOPICS:
+        raise SubscriptionError(f"at most {MAX_TOPICS} beat and status combinations per subscription")
+    return topics
+
+def delta_topics(delta):
+    """Topics whose subscribers receive a delta: those of the complaint's state before and after it"""
+    topics = set()
+    states = [delta["keys"], dict(delta["keys"], **delta.get("previous", {}))]
+    for state in states:
+        beat, status = state.get("beatNumber") or "", state.get("complaintStatus") or ""
+        topics.update(topic(b, s) for b in [beat, ALL] for s in [status, ALL] if b and s)
+    return topics
+
+def feed_view(item):
+    expanded = expand_item(item, FEED_FIELDS)
+    return {name: expanded[name] for name in FEED_FIELDS if name in expanded}
+
+def record_delta(record):
+    """
+    Compact delta of one stream record, None when nothing the portal shows changed
+
+    {"type": "insert", "complaintId", "keys", "complaint"}: the new complaint as dbQueryFn returns it
+    {"type": "update", "complaintId", "keys", "changes", "previous"}: changed attributes only, and the
+        old values of the keys that changed
+    {"type": "remove", "complaintId", "keys"}
+    Moves between the complaints table and the archive are not changes.
+    """
+    if is_tier_move(record):
+        return None
+    old = deserialize(record['dynamodb'].get('OldImage'))
+    new = deserialize(record['dynamodb'].get('NewImage'))
+    current = new or old
+    if not current.get('complaintId'):
+        return None
+    keys = {name: current.get(name, "") for name in KEY_FIELDS}
+    event_name = record.get('eventName')
+
+    if event_name == 'INSERT':
+        return {"type": "insert", "complaintId": new['complaintId'], "keys": keys, "complaint": feed_view(new)}
+    if event_name == 'REMOVE':
+        return {"type": "remove", "complaintId": old['complaintId'], "keys": keys}
+
+    before, after = feed_view(old), feed_view(new)
+    changes = {name: value for name, value in after.items() if before.get(name) != value}
+    if not changes:
+        return None
+    delta = {"type": "update", "complaintId": new['complaintId'], "keys": keys, "changes": changes}
+    previous = {name: old.get(name, "") for name in KEY_FIELDS if old.get(name, "") != keys[name]}
+    if previous:
+        delta["previous"] = previous
+    return delta
+
+def route(deltas, subscribers):
+    """
+    {connection: [delta, ...]} for a batch of deltas, each connection's list in stream order
+
+    `subscribers(topics)` returns {topic: connection ids}, so the index is read once per batch.
+    """
+    topics_of = [delta_topics(delta) for delta in deltas]
+    connections_of = subscribers(set().union(*topics_of)) if deltas else {}
+    routed = {}
+    for delta, topics in zip(deltas, topics_of):
+        receivers = set()
+        for each in topics:
+            receivers.update(connections_of.get(each, ()))
+        for connection in receivers:
+            routed.setdefault(connection, []).append(delta)
+    return routed
+
+def json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, set):
+        return sorted(value)
+    return str(value)
+
+def encode(message):
+    return json.dumps(message, separators=(',', ':'), default=json_default)
+
+def change_messages(deltas):
+    """Serialized {"type": "changes", "deltas"} messages carrying the deltas, each under MAX_MESSAGE_BYTES"""
+    messages, batch, size = [], [], 0
+    for delta in deltas:
+        encoded = encode(delta)
+        if batch and size + len(encoded) > MAX_MESSAGE_BYTES:
+            messages.append('{"type":"changes","deltas":[' + ','.join(batch) + ']}')
+            batch, size = [], 0
+        batch.append(encoded)
+        size += len(encoded) + 1
+    if batch:
+        messages.append('{"type":"changes","deltas":[' + ','.join(batch) + ']}')
+    return messages
+
+def connection_key(connection_id):
+    return {'topic': CONNECTION_PREFIX + connection_id, 'connectionId': connection_id}
+
+def save_subscription(table, connection_id, topics, now):
+    """Replace the topics of a connection in the subscription index"""
+    previous = table.get_item(Key=connection_key(connection_id)).get('Item', {}).get('topics', [])
+    expires_at = int(now) + CONNECTION_TTL_SECONDS
+    with table.batch_writer() as batch:
+        for each in set(previous) - set(topics):
+            batch.delete_item(Key={'topic': each, 'connectionId': connection_id})
+        for each in topics:
+            batch.put_item(Item={'topic': each, 'connectionId': connection_id, 'expiresAt': expires_at})
+        batch.put_item(Item=dict(connection_key(connection_id), topics=topics, expiresAt=expires_at))
+
+def remove_connection(table, connection_id):
+    """Drop a connection and all of its subscriptions from the index"""
+    topics = table.get_item(Key=connection_key(connection_id)).get('Item', {}).get('topics', [])
+    with table.batch_writer() as batch:
+        for each in topics:
+            batch.delete_item(Key={'topic': each, 'connectionId': connection_id})
+        batch.delete_item(Key=connection_key(connection_id))
+    return len(topics)
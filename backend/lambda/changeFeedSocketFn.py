@@ -0,0 +1,54 @@
+#lambda function handling the change feed WebSocket routes: connect, subscribe by beat and status, disconnect
+import boto3
+import json
+import os
+import time
+from changeFeed import SubscriptionError, subscription_topics, save_subscription, remove_connection, as_list, encode
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+SUBSCRIPTION_TABLE = os.environ['SUBSCRIPTION_TABLE_NAME']
+
+
+def subscribe(connection_id, request):
+    """Replace a connection's subscription, returning the acknowledgement sent back to it"""
+    topics = subscription_topics(request.get('beatNumber'), request.get('complaintStatus'))
+    save_subscription(dynamodb.Table(SUBSCRIPTION_TABLE), connection_id, topics, time.time())
+    logger.info("Subscribed to the change feed", connectionId=connection_id, topics=len(topics))
+    return {
+        "type": "subscribed",
+        "beatNumber": sorted(set(as_list(request.get('beatNumber')))),
+        "complaintStatus": sorted(set(as_list(request.get('complaintStatus'))))
+    }
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    request_context = event.get('requestContext', {})
+    route_key = request_context.get('routeKey')
+    connection_id = request_context.get('connectionId')
+
+    try:
+        if route_key == '$connect':
+            # The filters can come with the connection, e.g. wss://.../?beatNumber=3&complaintStatus=Open
+            params = event.get('multiValueQueryStringParameters') or {}
+            if params:
+                subscribe(connection_id, params)
+            return {'statusCode': 200}
+        if route_key == '$disconnect':
+            removed = remove_connection(dynamodb.Table(SUBSCRIPTION_TABLE), connection_id)
+            logger.info("Left the change feed", connectionId=connection_id, topics=removed)
+            return {'statusCode': 200}
+        if route_key == 'subscribe':
+            return {'statusCode': 200, 'body': encode(subscribe(connection_id, json.loads(event.get('body') or '{}')))}
+        # Keep-alive pings and unknown actions
+        return {'statusCode': 200, 'body': encode({"type": "pong"})}
+    except (SubscriptionError, ValueError) as e:
+        return {'statusCode': 400, 'body': encode({"type": "error", "message": str(e)})}
+    except Exception as e:
+        logger.error("Change feed request failed", routeKey=route_key, error=str(e))
+        return {'statusCode': 500, 'body': encode({"type": "error", "message": "Internal error"})}
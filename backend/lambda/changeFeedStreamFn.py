@@ -0,0 +1,79 @@
+#lambda function that pushes complaint changes from the table stream to the subscribed portal sessions
+import boto3
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
+from changeFeed import record_delta, route, change_messages, remove_connection
+from instrumentation import instrumented, instrument_client, add_metric
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+SUBSCRIPTION_TABLE = os.environ['SUBSCRIPTION_TABLE_NAME']
+# https://{api-id}.execute-api.{region}.amazonaws.com/{stage} of the WebSocket API
+CHANGE_FEED_ENDPOINT = os.environ['CHANGE_FEED_ENDPOINT']
+QUERY_WORKERS = 8
+SEND_WORKERS = 16
+
+management_client = instrument_client(boto3.client('apigatewaymanagementapi', endpoint_url=CHANGE_FEED_ENDPOINT))
+
+
+def topic_connections(topic, now):
+    """Live connections subscribed to a topic"""
+    kwargs = {
+        'TableName': SUBSCRIPTION_TABLE,
+        'KeyConditionExpression': Key('topic').eq(topic),
+        'ProjectionExpression': 'connectionId, expiresAt'
+    }
+    connections = []
+    while True:
+        response = dynamodb.meta.client.query(**kwargs)
+        # TTL deletion lags, so expired subscriptions are skipped here
+        connections += [item['connectionId'] for item in response.get('Items', []) if item.get('expiresAt', now) >= now]
+        if 'LastEvaluatedKey' not in response:
+            return connections
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def subscribers(topics):
+    """{topic: connection ids}, one Query per topic"""
+    now = int(time.time())
+    topics = sorted(topics)
+    if not topics:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(QUERY_WORKERS, len(topics))) as executor:
+        return dict(zip(topics, executor.map(lambda topic: topic_connections(topic, now), topics)))
+
+def send(connection_id, messages):
+    """Post the messages to one connection; returns sent, gone (it disconnected) or failed"""
+    try:
+        for message in messages:
+            management_client.post_to_connection(ConnectionId=connection_id, Data=message.encode('utf-8'))
+        return "sent"
+    except management_client.exceptions.GoneException:
+        return "gone"
+    except Exception as e:
+        # Retrying the batch would repeat the deltas to every other session; this one resyncs when it reconnects
+        logger.warning("Could not push to connection", connectionId=connection_id, error=str(e))
+        return "failed"
+
+@instrumented
+def lambda_handler(event, context):
+    records = event.get('Records', [])
+    deltas = [delta for delta in map(record_delta, records) if delta is not None]
+    routed = route(deltas, subscribers)
+
+    sent = 0
+    if routed:
+        with ThreadPoolExecutor(max_workers=min(SEND_WORKERS, len(routed))) as executor:
+            outcomes = dict(zip(routed, executor.map(lambda connection: send(connection, change_messages(routed[connection])), routed)))
+        gone = [connection for connection, outcome in outcomes.items() if outcome == "gone"]
+        for connection in gone:
+            remove_connection(dynamodb.Table(SUBSCRIPTION_TABLE), connection)
+        sent = sum(len(routed[connection]) for connection, outcome in outcomes.items() if outcome == "sent")
+        add_metric("ChangeFeedConnectionsGone", len(gone))
+    add_metric("ChangeFeedDeltasSent", sent)
+    logger.info("Pushed change feed deltas", records=len(records), deltas=len(deltas), connections=len(routed), sent=sent)
+    return {'statusCode': 200, 'body': {"deltas": len(deltas), "connections": len(routed), "sent": sent}}
@@ -1,21 +1,115 @@
-import json
 import boto3
 import os
+import re
+import time
+from botocore.config import Config
+from instrumentation import instrumented, instrument_client, add_metric
+from structuredlog import get_logger
 
+logger = get_logger(__name__)
 
 botId = os.environ["LEXBOT_ID"]
 botAliasId = os.environ["LEXBOT_ALIAS_ID"]
 localeId = "en_US"
 
+# Seconds a static FAQ answer is reused for the same question
+CACHE_TTL_SECONDS = int(os.environ.get("CHAT_CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = 256
 
+# Created once per container so warm invocations reuse the TLS connection to Lex. Reads wait
+# almost as long as API Gateway does since fulfillment runs the complaint search; retries are
+# limited to throttling / transient errors so a question is not answered twice
+lex_client = instrument_client(boto3.client('lexv2-runtime', config=Config(
+    connect_timeout=2,
+    read_timeout=25,
+    retries={'max_attempts': 2, 'mode': 'standard'},
+    tcp_keepalive=True
+)))
+
+# Intents whose answers never come from the cache, whatever the backend marks
+UNCACHED_INTENTS = {"FallbackIntent"}
+
+# normalized question -> (expiry timestamp, projected response)
+_answer_cache = {}
+
+
+def normalize_question(text):
+    """Lowercased question with whitespace collapsed and trailing punctuation dropped"""
+    return re.sub(r"\s+", " ", text or "").strip().rstrip("?.! ").lower()
+
+def project_response(response):
+    """Only what the chat window renders: the messages plus the intent Lex resolved"""
+    session_state = response.get("sessionState", {})
+    intent = session_state.get("intent", {})
+    return {
+        "sessionId": response.get("sessionId"),
+        "messages": [
+            {"contentType": message.get("contentType"), "content": message.get("content")}
+            for message in response.get("messages", [])
+        ],
+        "sessionState": {
+            "intent": {"name": intent.get("name"), "state": intent.get("state")},
+            "dialogAction": {"type": session_state.get("dialogAction", {}).get("type")}
+        }
+    }
+
+def is_cacheable(response, text):
+    """
+    The Lex backend marks FAQ answers that depend on neither live complaint data nor the session
+    with the transcript they answered, so a mark left over from an earlier turn never matches.
+    Only a marked answer that closed its intent as fulfilled is reused
+    """
+    session_state = response.get("sessionState", {})
+    intent = session_state.get("intent", {})
+    return (
+        session_state.get("sessionAttributes", {}).get("cacheableTranscript") == text
+        and session_state.get("dialogAction", {}).get("type") == "Close"
+        and intent.get("state") == "Fulfilled"
+        and intent.get("name") not in UNCACHED_INTENTS
+    )
+
+def dialog_at_rest(session_id):
+    """
+    True when the session has no intent in progress, so the next text starts a new dialog
+    instead of answering a slot prompt or confirmation. Lex keeps the state, not this container
+    """
+    try:
+        session_state = lex_client.get_session(
+            botId=botId, botAliasId=botAliasId, localeId=localeId, sessionId=session_id
+        ).get("sessionState", {})
+    except lex_client.exceptions.ResourceNotFoundException:
+        return True
+    except Exception as e:
+        logger.warning("Could not read the Lex session, skipping the answer cache", error=str(e))
+        return False
+    dialog_action = session_state.get("dialogAction", {}).get("type")
+    intent_state = session_state.get("intent", {}).get("state")
+    return dialog_action in (None, "Close") and intent_state not in ("InProgress", "Waiting")
+
+def cached_answer(key):
+    entry = _answer_cache.get(key)
+    if entry and entry[0] > time.time():
+        return entry[1]
+    _answer_cache.pop(key, None)
+    return None
+
+def cache_answer(key, body):
+    if len(_answer_cache) >= CACHE_MAX_ENTRIES:
+        # Dicts keep insertion order, so this drops the oldest entry
+        _answer_cache.pop(next(iter(_answer_cache)))
+    _answer_cache[key] = (time.time() + CACHE_TTL_SECONDS, body)
+
+@instrumented
 def lambda_handler(event, context):
-    
-    print("EVENT:")
-    print(event)
+    logger.debug("Received event", event=event)
+    key = normalize_question(event["text"])
 
-    client = boto3.client('lexv2-runtime')
+    # Only checked when there is a candidate, so a miss costs no extra Lex call
+    cached = cached_answer(key)
+    if cached and dialog_at_rest(event["sessionId"]):
+        add_metric("ChatCacheHits", 1)
+        return {'statusCode': 200, 'body': dict(cached, sessionId=event["sessionId"])}
 
-    # Define the arguments and call the lex bot
     args = {
         "botId": botId,
         "botAliasId": botAliasId,
@@ -23,11 +117,10 @@ def lambda_handler(event, context):
         "sessionId": event["sessionId"],
         "text": event["text"]
     }
-    response = client.recognize_text(**args)
+    response = lex_client.recognize_text(**args)
+    logger.debug("Lex response", response=response)
 
-    print(response)
-
-    return {
-        'statusCode': 200,
-        'body': response
-    }
+    body = project_response(response)
+    if CACHE_TTL_SECONDS > 0 and is_cacheable(response, event["text"]):
+        cache_answer(key, body)
+    return {'statusCode': 200, 'body': body}
@@ -0,0 +1,245 @@
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+from boto3.dynamodb.conditions import Attr
+import geohash
+import timeSlots
+from priorityQueue import priority_attributes
+from duplicateDetection import duplicate_cell
+from repeatLocations import location_attributes
+
+# Valid values accepted for complaint records
+VALID_STATUSES = ["Open", "Follow-Up", "Closed", "Red-Star", "Duplicate"]
+VALID_CATEGORIES = ["Stop sign", "School traffic complaint", "Racing", "Speed", "Red light", "Reckless Driving"]
+VALID_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Version 2 items leave out empty attributes and values derived from other attributes (see compact_item).
+# Items without the version attribute are legacy items carrying every attribute
+SCHEMA_VERSION = 2
+VERSION_ATTRIBUTE = "schemaVersion"
+
+# What the API returns for an attribute a compact item leaves out
+ATTRIBUTE_DEFAULTS = {
+    "isUrgentChecked": False,
+    "firstName": "",
+    "lastName": "",
+    "daysOfWeek": [],
+    "startTime": "",
+    "endTime": "",
+    "location": "",
+    "addressDirection": "",
+    "addressStreet": "",
+    "addressZipcode": "",
+    "intersection1Direction": "",
+    "intersection1Street": "",
+    "intersection2Direction": "",
+    "intersection2Street": "",
+    "intersectionZipcode": "",
+    "problemCategory": "",
+    "description": "",
+    "subscribeToAlerts": "",
+    "email": "",
+    "phone": "",
+    "officersNotes": "",
+    "beatNumber": "",
+    "dateOfComplaint": ""
+}
+# Rebuilt on read: coordinates from lat/lon, startDate from dateOfComplaint, endDate from startDate
+DERIVED_ATTRIBUTES = {
+    "coordinates": ["lat", "lon"],
+    "startDate": ["startDate", "dateOfComplaint"],
+    "endDate": ["endDate", "startDate", "dateOfComplaint"]
+}
+
+
+def convert_to_utc7(time_str):
+    """Convert time string to UTC-7 timezone"""
+    if time_str == "" or time_str is None:
+        return "", ""
+    else:
+        # Convert to UTC-7
+        phoenix_offset = timedelta(hours=-7)
+        phoenix_timezone = timezone(phoenix_offset)
+
+        final_date_time = datetime.fromisoformat(time_str).astimezone(phoenix_timezone)
+        date_var = final_date_time.date()
+        time_var = final_date_time.time()
+
+        # Format the datetime object back to a string
+        return str(date_var), str(time_var)
+
+
+def build_location_data(event):
+    """Build the single line address sent to the geocoder"""
+    location_data = ""
+    if event.get('location', "").lower() == 'address':
+        for i in ['addressDirection', 'addressStreet', 'addressZipcode']:
+            location_data += event.get(i, '') + ' '
+    elif event.get('location', "").lower() == 'intersection':
+        for i in ['intersection1Direction', 'intersection1Street']:
+            location_data += event.get(i, '') + ' '
+        location_data += '& '
+        for i in ['intersection2Direction', 'intersection2Street']:
+            location_data += event.get(i, '') + ' '
+    return location_data
+
+
+def select_beat_candidate(candidates):
+    """
+    Pick the beat number and coordinates from geocoder candidates
+
+    Returns:
+    tuple: (beat_no, (x, y)) with empty strings when no candidate qualifies
+    """
+    beat_no = ""
+    coordinates = ("", "")
+    if len(candidates) > 0 and int(candidates[0]['score']) > 0.8:
+        chosen = candidates[0]
+        if len(candidates) > 1:
+            if candidates[0]['attributes']['PoliceBeat'] == "" and candidates[1]['attributes']['PoliceBeat'] != "" and int(candidates[1]['score']) > 0.8:
+                chosen = candidates[1]
+        beat_no = chosen['attributes']['PoliceBeat']
+        coordinates = (str(chosen['location']['x']), str(chosen['location']['y']))
+    return beat_no, coordinates
+
+
+def spatial_attributes(coordinates):
+    """
+    Numeric lat/lon and geohash attributes for the geohash index
+
+    Returns an empty dict when the complaint has no usable coordinates, which keeps
+    it out of the sparse index instead of writing empty key attributes.
+    """
+    try:
+        lon, lat = float(coordinates[0]), float(coordinates[1])
+    except (TypeError, ValueError, IndexError):
+        return {}
+    cell = geohash.encode(lat, lon)
+    return {
+        "lat": Decimal(str(lat)),
+        "lon": Decimal(str(lon)),
+        "geohash": cell,
+        "geohashPrefix": cell[:geohash.PREFIX_PRECISION]
+    }
+
+
+def build_complaint_item(event, complaint_id, beat_no, coordinates, status='Open', date_of_complaint=None):
+    """Build the DynamoDB item for a new complaint"""
+    initial_date, initial_time = convert_to_utc7(event.get('startTime', ''))
+    end_date, end_time = convert_to_utc7(event.get('endTime', ''))
+    submitted_at = datetime.now(timezone.utc)
+
+    item = {
+        "isUrgentChecked": event.get('isUrgentChecked', False),
+        "firstName": event.get('firstName', ''),
+        "lastName": event.get('lastName', ''),
+        "daysOfWeek": event.get('daysOfWeek', []),
+        "startTime": initial_time,
+        "endTime": end_time,
+        "location": event.get('location', ''),
+        "addressDirection": event.get('addressDirection', ''),
+        "addressStreet": event.get('addressStreet', ''),
+        "addressZipcode": event.get('addressZipcode', ''),
+        "intersection1Direction": event.get('intersection1Direction', ''),
+        "intersection1Street": event.get('intersection1Street', ''),
+        "intersection2Direction": event.get('intersection2Direction', ''),
+        "intersection2Street": event.get('intersection2Street', ''),
+        "intersectionZipcode": event.get('intersectionZipcode', ''),
+        "problemCategory": event.get('problemCategory', ''),
+        "description": event.get('description', ''),
+        "subscribeToAlerts": event.get('subscribeToAlerts', ''),
+        "email": event.get('email', ''),
+        "phone": event.get('phone', ''),
+        "officersNotes": event.get('officersNote', ''),
+        "complaintStatus": status,
+        "beatNumber": beat_no,
+        "complaintId": complaint_id,
+        "coordinates": coordinates,
+        # Never empty: it sorts the date indexes, and a complaint without it would be in none of them
+        "dateOfComplaint": str(date_of_complaint or initial_date or convert_to_utc7(submitted_at.isoformat())[0]),
+        "submittedAt": str(date_of_complaint) if date_of_complaint else submitted_at.isoformat(),
+        "startDate": str(initial_date),
+        "endDate": str(end_date)
+    }
+    item.update(spatial_attributes(coordinates))
+    item.update(duplicate_cell(item))
+    item.update(location_attributes(item))
+    item.update(priority_attributes(item))
+    active_slots = timeSlots.window_bitmap(initial_time, end_time)
+    if active_slots:
+        item["activeSlots"] = timeSlots.to_hex(active_slots)
+    return compact_item(item)
+
+
+def is_empty(value):
+    return value is None or value is False or (isinstance(value, (str, list, tuple, set)) and len(value) == 0)
+
+
+def compact_item(item):
+    """
+    Version 2 encoding of a complaint item
+
+    Empty strings, empty lists and unset flags are left out, coordinates are only kept as the numeric
+    lat/lon attributes, and startDate / endDate only when they differ from the date they default to.
+    Index keys cannot be empty strings anyway, so a complaint without a beat is in no beat partition
+    and filters on an empty value go through attribute_equals.
+    """
+    compact = {
+        name: value for name, value in item.items()
+        if name not in DERIVED_ATTRIBUTES and not is_empty(value)
+    }
+    if "lat" not in compact:
+        compact.update(spatial_attributes(item.get("coordinates")))
+    start_date = item.get("startDate", "")
+    if start_date != item.get("dateOfComplaint", ""):
+        compact["startDate"] = start_date
+    if item.get("endDate", "") != start_date:
+        compact["endDate"] = item.get("endDate", "")
+    compact[VERSION_ATTRIBUTE] = SCHEMA_VERSION
+    return compact
+
+
+def expand_item(item, fields=None):
+    """
+    API shape of a stored complaint, whichever schema version it was written with
+
+    Attributes a compact item leaves out are filled back in, only the requested ones when `fields`
+    is given. Legacy items already carry them and come back unchanged apart from the version attribute.
+    """
+    wanted = set(fields) if fields else None
+    expanded = {name: value for name, value in item.items() if name != VERSION_ATTRIBUTE}
+    for name, default in ATTRIBUTE_DEFAULTS.items():
+        if name not in expanded and (wanted is None or name in wanted):
+            expanded[name] = list(default) if isinstance(default, list) else default
+    if wanted is None or wanted & DERIVED_ATTRIBUTES.keys():
+        start_date = item.get("startDate", item.get("dateOfComplaint", ""))
+        derived = {
+            "coordinates": [str(item["lon"]), str(item["lat"])] if "lat" in item and "lon" in item else ["", ""],
+            "startDate": start_date,
+            "endDate": item.get("endDate", start_date)
+        }
+        for name, value in derived.items():
+            if name not in expanded and (wanted is None or name in wanted):
+                expanded[name] = value
+    return expanded
+
+
+def stored_attributes(fields):
+    """Attributes to read from the table so expand_item can produce the requested fields"""
+    names = []
+    for field in fields:
+        names += DERIVED_ATTRIBUTES.get(field, [field])
+    return list(dict.fromkeys(names))
+
+
+def attribute_equals(name, value):
+    """Condition on one attribute value, where an empty value also matches a compact item leaving it out"""
+    if is_empty(value):
+        return Attr(name).eq(value) | Attr(name).not_exists()
+    return Attr(name).eq(value)
+
+
+def start_date_between(start_date, end_date):
+    """Condition matching complaints whose effective startDate falls in the inclusive range"""
+    return Attr("startDate").between(start_date, end_date) | (
+        Attr("startDate").not_exists() & Attr("dateOfComplaint").between(start_date, end_date)
+    )
@@ -0,0 +1,201 @@
+#lambda function serving complaint points as z/x/y tiles: clusters from the tile buckets at low zoom, complaints above
+import boto3
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Attr, Key
+import geohash
+from complaintTiles import (
+    VERSION_PARTITION, CLUSTER_MAX_ZOOM, EXTENT, CLUSTER_GRID,
+    bucket_ranges, parse_bucket, tile_bounds, tile_position, cell_overlaps, in_tile
+)
+from complaintItems import VALID_STATUSES, VALID_CATEGORIES
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+TILE_TABLE = os.environ['TILE_TABLE_NAME']
+GEOHASH_INDEX = 'geohashIndex'
+MAX_ZOOM = 22
+QUERY_WORKERS = 8
+# Tiles are revalidated this often; an unchanged tile costs one Query and a 304
+CACHE_CONTROL = "public, max-age=60"
+
+
+class TileError(ValueError):
+    """Raised for a tile address or filter the endpoint cannot serve"""
+
+
+def read_all(kwargs):
+    """Every item of a Query, following pagination"""
+    items = []
+    while True:
+        response = dynamodb.meta.client.query(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def parse_request(event):
+    """(z, x, y) and filters of a proxy integration event"""
+    path = event.get('pathParameters') or {}
+    params = event.get('queryStringParameters') or {}
+    try:
+        z, x, y = int(path['z']), int(path['x']), int(str(path['y']).split('.')[0])
+    except (KeyError, TypeError, ValueError):
+        raise TileError("tile address must be /z/x/y with integers")
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise TileError(f"no tile {z}/{x}/{y}")
+
+    filters = {}
+    for name, options in [('status', VALID_STATUSES), ('category', VALID_CATEGORIES)]:
+        values = [value.strip() for value in str(params.get(name) or "").split(',') if value.strip()]
+        unknown = [value for value in values if value not in options]
+        if unknown:
+            raise TileError(f"unknown {name}: {', '.join(unknown)}")
+        if values:
+            filters[name] = sorted(values)
+    for name in ['from', 'to']:
+        if params.get(name):
+            try:
+                bucket_ranges(params[name], None)
+            except ValueError:
+                raise TileError(f"{name} must be a YYYY-MM-DD date")
+            filters[name] = params[name]
+    return (z, x, y), filters
+
+def tile_cells(box):
+    """Non-empty cells overlapping a tile with their versions, one Query of the version partition"""
+    items = read_all({
+        'TableName': TILE_TABLE,
+        'KeyConditionExpression': Key('cell').eq(VERSION_PARTITION)
+    })
+    return {item['bucket']: int(item['version']) for item in items if cell_overlaps(item['bucket'], box)}
+
+def tile_etag(tile, filters, cells):
+    """Strong ETag of a tile: changes exactly when a cell under it or the request changes"""
+    state = json.dumps([tile, filters, sorted(cells.items())], separators=(',', ':'))
+    return '"' + hashlib.sha256(state.encode('utf-8')).hexdigest()[:32] + '"'
+
+def cell_buckets(cell, filters):
+    """Buckets of one cell that match the filters"""
+    buckets = []
+    for low, high in bucket_ranges(filters.get('from'), filters.get('to')):
+        buckets += read_all({
+            'TableName': TILE_TABLE,
+            'KeyConditionExpression': Key('cell').eq(cell) & Key('bucket').between(low, high),
+            'ProjectionExpression': '#bucket, #count, latSum, lonSum',
+            'ExpressionAttributeNames': {'#bucket': 'bucket', '#count': 'count'}
+        })
+    matching = []
+    for bucket in buckets:
+        status, category = parse_bucket(bucket['bucket'])
+        if int(bucket['count']) > 0 and status in filters.get('status', [status]) and category in filters.get('category', [category]):
+            matching.append(bucket)
+    return matching
+
+def cluster_tile(tile, cells, filters):
+    """Clusters on a CLUSTER_GRID grid, each at the mean position of its complaints"""
+    with ThreadPoolExecutor(max_workers=min(QUERY_WORKERS, len(cells))) as executor:
+        per_cell = list(executor.map(lambda cell: cell_buckets(cell, filters), cells))
+    grid = {}
+    for bucket in (bucket for buckets in per_cell for bucket in buckets):
+        count = int(bucket['count'])
+        position = tile_position(*tile, float(bucket['latSum']) / count, float(bucket['lonSum']) / count)
+        if not in_tile(position):
+            continue
+        cluster = grid.setdefault((position[0] // CLUSTER_GRID, position[1] // CLUSTER_GRID), [0, 0, 0])
+        cluster[0] += position[0] * count
+        cluster[1] += position[1] * count
+        cluster[2] += count
+    return [[x // count, y // count, count] for x, y, count in grid.values()]
+
+def point_filter(filters):
+    conditions = []
+    if filters.get('status'):
+        conditions.append(Attr('complaintStatus').is_in(filters['status']))
+    if filters.get('category'):
+        conditions.append(Attr('problemCategory').is_in(filters['category']))
+    if filters.get('from'):
+        conditions.append(Attr('dateOfComplaint').gte(filters['from']))
+    if filters.get('to'):
+        conditions.append(Attr('dateOfComplaint').lte(filters['to']))
+    combined = None
+    for condition in conditions:
+        combined = condition if combined is None else combined & condition
+    return combined
+
+def point_tile(tile, box, cells, filters):
+    """Complaints in the tile as [x, y, complaintId, status index, category index, date]"""
+    # Finer geohash prefixes within the non-empty cells keep the read to about the tile's own area
+    prefixes = [prefix for prefix in geohash.covering_for_box(*box) if prefix[:geohash.PREFIX_PRECISION] in cells]
+    condition = point_filter(filters)
+
+    def query(prefix):
+        kwargs = {
+            'TableName': COMPLAINTS_TABLE,
+            'IndexName': GEOHASH_INDEX,
+            'KeyConditionExpression': Key('geohashPrefix').eq(prefix[:geohash.PREFIX_PRECISION]) & Key('geohash').begins_with(prefix),
+            'ProjectionExpression': 'complaintId, lat, lon, complaintStatus, problemCategory, dateOfComplaint'
+        }
+        if condition is not None:
+            kwargs['FilterExpression'] = condition
+        return read_all(kwargs)
+
+    if not prefixes:
+        return []
+    with ThreadPoolExecutor(max_workers=min(QUERY_WORKERS, len(prefixes))) as executor:
+        items = [item for found in executor.map(query, prefixes) for item in found]
+    points = []
+    for item in items:
+        position = tile_position(*tile, float(item['lat']), float(item['lon']))
+        if not in_tile(position):
+            continue
+        status, category = item.get('complaintStatus'), item.get('problemCategory')
+        points.append([
+            position[0], position[1], item['complaintId'],
+            VALID_STATUSES.index(status) if status in VALID_STATUSES else -1,
+            VALID_CATEGORIES.index(category) if category in VALID_CATEGORIES else -1,
+            item.get('dateOfComplaint', '')
+        ])
+    return points
+
+def header(headers, name):
+    """Case-insensitive request header lookup"""
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    headers = {'Access-Control-Allow-Origin': '*', 'Access-Control-Expose-Headers': 'ETag'}
+    try:
+        tile, filters = parse_request(event)
+    except TileError as e:
+        return {'statusCode': 400, 'headers': headers, 'body': str(e)}
+
+    try:
+        box = tile_bounds(*tile)
+        cells = tile_cells(box)
+        etag = tile_etag(tile, filters, cells)
+        headers.update({'ETag': etag, 'Cache-Control': CACHE_CONTROL, 'Content-Type': 'application/json'})
+        if_none_match = header(event.get('headers'), 'if-none-match')
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return {'statusCode': 304, 'headers': headers, 'body': ''}
+
+        body = {"z": tile[0], "x": tile[1], "y": tile[2], "extent": EXTENT}
+        if tile[0] <= CLUSTER_MAX_ZOOM:
+            body["clusters"] = cluster_tile(tile, cells, filters) if cells else []
+        else:
+            body.update(points=point_tile(tile, box, cells, filters), statuses=VALID_STATUSES, categories=VALID_CATEGORIES)
+        return {'statusCode': 200, 'headers': headers, 'body': json.dumps(body, separators=(',', ':'))}
+    except Exception as e:
+        logger.error("Error rendering tile", tile=event.get('pathParameters'), error=str(e))
+        return {'statusCode': 500, 'headers': headers, 'body': str(e)}
@@ -0,0 +1,95 @@
+# Spatial buckets behind the complaint point tiles, one table partition per ~5 km geohash cell:
+#   cell   = geohash prefix (geohash.PREFIX_PRECISION)
+#   bucket = "m#YYYY-MM#<cell6>#<status>#<category>" and "d#YYYY-MM-DD#<cell6>#<status>#<category>"
+# Each bucket holds the count and coordinate sums of its complaints, so a cluster tile reads
+# aggregates instead of complaints. Whole months of a date filter come from the month buckets,
+# partial months from the day buckets. A version per cell, bumped on every change to its buckets,
+# feeds the tile ETags.
+import calendar
+import math
+from datetime import date, timedelta
+import geohash
+
+SEPARATOR = "#"
+# Bucket precision within a cell (~1.2 x 0.6 km); centroids come from the coordinate sums
+BUCKET_PRECISION = 6
+VERSION_PARTITION = "#versions"
+# Highest zoom served as clusters; tiles above it list individual complaints
+CLUSTER_MAX_ZOOM = 14
+# Tile coordinate space, as in Mapbox vector tiles, and the cluster grid step within it
+EXTENT = 4096
+CLUSTER_GRID = 256
+
+
+def bucket_entries(item):
+    """
+    {(cell, bucket): (lat, lon)} a complaint is counted in, empty without coordinates or a date
+    """
+    day = str(item.get('dateOfComplaint') or "")
+    cell = item.get('geohash')
+    if not day or not cell or item.get('lat') is None or item.get('lon') is None:
+        return {}
+    suffix = SEPARATOR.join([cell[:BUCKET_PRECISION], str(item.get('complaintStatus') or ""), str(item.get('problemCategory') or "")])
+    point = (item['lat'], item['lon'])
+    partition = cell[:geohash.PREFIX_PRECISION]
+    return {
+        (partition, f"m#{day[:7]}#{suffix}"): point,
+        (partition, f"d#{day}#{suffix}"): point
+    }
+
+def parse_bucket(bucket):
+    """(status, category) of a bucket sort key"""
+    parts = bucket.split(SEPARATOR, 4)
+    return parts[3], parts[4]
+
+def month_end(day):
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+def bucket_ranges(date_from=None, date_to=None):
+    """
+    Sort key ranges (low, high) whose buckets add up to exactly the complaints filed in the inclusive
+    date range: month buckets for whole months, day buckets for the partial months at either end
+    """
+    start = date.fromisoformat(date_from) if date_from else None
+    end = date.fromisoformat(date_to) if date_to else None
+    if start and end and start > end:
+        return []
+    # A range within one month that is not the whole month only needs day buckets
+    if start and end and (start.year, start.month) == (end.year, end.month) and not (start.day == 1 and end == month_end(end)):
+        return [(f"d#{start}", f"d#{end}~")]
+
+    ranges = []
+    first_whole = start if start is None or start.day == 1 else month_end(start) + timedelta(days=1)
+    last_whole = end if end is None or end == month_end(end) else end.replace(day=1) - timedelta(days=1)
+    if first_whole is None or last_whole is None or first_whole <= last_whole:
+        ranges.append((
+            f"m#{first_whole:%Y-%m}" if first_whole else "m#",
+            f"m#{last_whole:%Y-%m}~" if last_whole else "m#~"
+        ))
+    if start and start.day != 1:
+        ranges.append((f"d#{start}", f"d#{month_end(start)}~"))
+    if end and end != month_end(end):
+        ranges.append((f"d#{end.replace(day=1)}", f"d#{end}~"))
+    return ranges
+
+def tile_bounds(z, x, y):
+    """(min_lat, min_lon, max_lat, max_lon) of a Web Mercator tile"""
+    n = 2 ** z
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+    return lat(y + 1), x / n * 360 - 180, lat(y), (x + 1) / n * 360 - 180
+
+def tile_position(z, x, y, lat, lon):
+    """Position of a point in a tile's EXTENT coordinate space"""
+    n = 2 ** z
+    lat_radians = math.radians(lat)
+    px = ((lon + 180) / 360 * n - x) * EXTENT
+    py = ((1 - math.asinh(math.tan(lat_radians)) / math.pi) / 2 * n - y) * EXTENT
+    return int(px), int(py)
+
+def cell_overlaps(cell, box):
+    min_lat, min_lon, max_lat, max_lon = geohash.bounds(cell)
+    return min_lat <= box[2] and max_lat >= box[0] and min_lon <= box[3] and max_lon >= box[1]
+
+def in_tile(position):
+    return 0 <= position[0] < EXTENT and 0 <= position[1] < EXTENT
@@ -3,17 +3,39 @@ import boto3
 import json
 import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from botocore.exceptions import ClientError
 from datetime import datetime, timezone, timedelta
+from decimal import Decimal
 from boto3.dynamodb.conditions import Attr
+from complaintItems import build_location_data, select_beat_candidate, build_complaint_item, VALID_STATUSES
+from archiveTier import restore_complaint, now_iso
+from priorityQueue import PRIORITY_INPUTS, PRIORITY_ATTRIBUTES, priority_update
+from duplicateDetection import PARENT_ATTRIBUTE, SCORE_ATTRIBUTE, COUNT_ATTRIBUTE, DUPLICATE_STATUS, find_parent
+from repeatLocations import LOCATION_INPUTS, location_update
+from instrumentation import instrumented, instrument_client, add_metric, span
+from structuredlog import get_logger
 
+logger = get_logger(__name__)
 dynamodb = boto3.resource('dynamodb')
-lambda_client = boto3.client('lambda')
+instrument_client(dynamodb.meta.client)
+lambda_client = instrument_client(boto3.client('lambda'))
 
 COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
 LAMBDA_API_FN = os.environ['LAMBDA_FN_NAME']
 
+# Attributes a bulk update may change, with the check their values must pass
+BULK_ATTRIBUTES = {
+    'complaintStatus': lambda value: value in VALID_STATUSES,
+    'officersNotes': lambda value: isinstance(value, str) and len(value) <= 4000,
+    'isUrgentChecked': lambda value: isinstance(value, bool)
+}
+MAX_BULK_ITEMS = 500
+BULK_WORKERS = 16
+# New complaint IDs are 8 random hex digits, so a collision is rare and a second one rarer still
+MAX_ID_ATTEMPTS = 5
+
 def invoke_lambda(function_name, payload):
     """Invoke another Lambda function with the given payload"""
     
@@ -25,25 +47,9 @@ def invoke_lambda(function_name, payload):
         )
         return response['Payload'].read()
     except Exception as e:
-        print(f"Error invoking Lambda function: {str(e)}")
+        logger.error("Error invoking Lambda function", function=function_name, error=str(e))
         raise e   
 
-def convert_to_utc7(time_str):
-    """Convert time string to UTC-7 timezone"""
-    if time_str == "":
-        return "", ""
-    else:
-        # Convert to UTC-7
-        phoenix_offset = timedelta(hours=-7)
-        phoenix_timezone = timezone(phoenix_offset)
-
-        final_date_time = datetime.fromisoformat(time_str).astimezone(phoenix_timezone)
-        date_var = final_date_time.date()
-        time_var = final_date_time.time()
-
-        # Format the datetime object back to a string
-        return str(date_var), str(time_var)
-
 def create_table_if_not_exists(table_name):
     """Create DynamoDB table if it doesn't exist"""
     try:
@@ -59,112 +65,195 @@ def create_table_if_not_exists(table_name):
 
 def update_record(record_id, attribute, value):
     """Update a record in DynamoDB table"""
+    return update_attributes(record_id, {attribute: value})
+
+def update_attributes(record_id, changes):
+    """Set several attributes of one complaint in a single write, keeping derived attributes in step"""
     table = dynamodb.Table(COMPLAINTS_TABLE)
-    response = table.update_item(
-        Key={'complaintId': record_id},
-        UpdateExpression=f'SET {attribute} = :value',
-        ExpressionAttributeValues={':value': value},
-        ReturnValues='ALL_NEW'
-    )
-    print(response)
-    return response.get('Attributes', {})
+    names = {f'#a{index}': attribute for index, attribute in enumerate(changes)}
+    values = {f':v{index}': value for index, value in enumerate(changes.values())}
+    assignments = [f'#a{index} = :v{index}' for index in range(len(changes))]
+    # The archive job retires complaints by how long ago they were closed
+    if 'complaintStatus' in changes:
+        assignments.append('statusUpdatedAt = :now')
+        values[':now'] = now_iso()
+    update_args = {
+        'Key': {'complaintId': record_id},
+        'UpdateExpression': 'SET ' + ', '.join(assignments),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values,
+        'ConditionExpression': Attr('complaintId').exists(),
+        'ReturnValues': 'ALL_NEW'
+    }
+    try:
+        response = table.update_item(**update_args)
+    except ClientError as e:
+        # Editing an archived complaint brings it back to the complaints table first
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException' or not restore_complaint(record_id):
+            raise
+        logger.info("Restored archived complaint", complaintId=record_id)
+        response = table.update_item(**update_args)
+    item = response.get('Attributes', {})
 
+    # Keep the sparse priority index in step when urgency, status or beat changed
+    if PRIORITY_INPUTS.intersection(changes):
+        index_update = priority_update(item)
+        if index_update:
+            item = table.update_item(Key={'complaintId': record_id}, ReturnValues='ALL_NEW', **index_update)['Attributes']
+    # Same for the location index when an address or intersection field was corrected
+    if LOCATION_INPUTS.intersection(changes):
+        location_change = location_update(item)
+        if location_change:
+            item = table.update_item(Key={'complaintId': record_id}, ReturnValues='ALL_NEW', **location_change)['Attributes']
+    logger.debug("Updated complaint", attributes=item)
+    return item
 
-def add_item_to_table(event):
-    """Add item to DynamoDB table"""
-    initial_date, initial_time = convert_to_utc7(event.get('startTime', ''))
-    end_date, end_time = convert_to_utc7(event.get('endTime', ''))
-    
+def validate_changes(changes):
+    """Error message for changes outside the bulk allow-list, None when they are acceptable"""
+    if not isinstance(changes, dict) or not changes:
+        return "changes must be a non-empty object"
+    for attribute, value in changes.items():
+        if attribute not in BULK_ATTRIBUTES:
+            return f"{attribute} cannot be bulk updated, allowed: {', '.join(BULK_ATTRIBUTES)}"
+        if not BULK_ATTRIBUTES[attribute](value):
+            return f"invalid value for {attribute}"
+    return None
+
+def apply_bulk_update(update):
+    """Per-item result of one bulk update entry"""
+    complaint_id, changes = update['complaintId'], update['changes']
     try:
-        # Generate a random id
-        while True:
-            # Generate random UUID
-            complaint_id = str(uuid.uuid4())[:8]
+        item = update_attributes(complaint_id, changes)
+        return {'complaintId': complaint_id, 'result': 'updated', 'complaintStatus': item.get('complaintStatus')}
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return {'complaintId': complaint_id, 'result': 'notFound'}
+        logger.error("Bulk update failed", complaintId=complaint_id, error=str(e))
+        return {'complaintId': complaint_id, 'result': 'error', 'error': e.response['Error']['Code']}
+
+def bulk_update(event):
+    """
+    Apply attribute changes to many complaints
+
+    Accepts `complaintIds` with one `changes` object for all of them, or `updates` as a list of
+    {complaintId, changes}. Everything is validated before anything is written; the writes then run
+    concurrently, each one the same single-complaint update the portal makes, so the trend buckets
+    (fed by the table stream) and the priority index stay consistent.
+    """
+    updates = event.get('updates') or [
+        {'complaintId': complaint_id, 'changes': event.get('changes')} for complaint_id in event.get('complaintIds', [])
+    ]
+    if not updates or len(updates) > MAX_BULK_ITEMS:
+        return {'statusCode': 400, 'message': f'Provide 1 to {MAX_BULK_ITEMS} complaints to update'}
+    ids = [update.get('complaintId') for update in updates]
+    if not all(isinstance(complaint_id, str) and complaint_id for complaint_id in ids) or len(set(ids)) != len(ids):
+        return {'statusCode': 400, 'message': 'Every update needs a distinct complaintId'}
+    for update in updates:
+        error = validate_changes(update.get('changes'))
+        if error:
+            return {'statusCode': 400, 'message': f"{update['complaintId']}: {error}"}
+
+    with ThreadPoolExecutor(max_workers=BULK_WORKERS) as executor:
+        results = list(executor.map(apply_bulk_update, updates))
+    counts = {outcome: sum(1 for result in results if result['result'] == outcome) for outcome in ['updated', 'notFound', 'error']}
+    logger.info("Bulk update applied", requested=len(updates), **counts)
+    return {
+        'statusCode': 200,
+        'message': 'Bulk update applied',
+        'body': dict(counts, results=results)
+    }
+
 
-            table = dynamodb.Table(COMPLAINTS_TABLE)
-            
-            # Check if ID already exists
-            response = table.scan(
-                FilterExpression=Attr('complaintId').eq(complaint_id)
-            )
-            
-            # If no matching records found, ID is unique
-            if len(response['Items']) == 0:
-                break
+class ComplaintIdTaken(Exception):
+    """The randomly generated complaint ID is already in use"""
 
+def put_complaint(item):
+    """Store a new complaint, failing instead of overwriting when its ID is taken"""
+    try:
+        return dynamodb.Table(COMPLAINTS_TABLE).put_item(Item=item, ConditionExpression=Attr('complaintId').not_exists())
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            raise ComplaintIdTaken(item['complaintId'])
+        raise
+
+def put_duplicate(item, parent_id, score):
+    """
+    Store a complaint linked to an earlier one and count it on that parent, in one transaction
+
+    Returns False, writing nothing, when the parent was closed or removed since it was found.
+    """
+    linked = dict(item, **{
+        PARENT_ATTRIBUTE: parent_id, SCORE_ATTRIBUTE: Decimal(str(round(score, 3))), 'complaintStatus': DUPLICATE_STATUS
+    })
+    # The parent stays the one case officers triage, and the only one counted as open
+    for name in PRIORITY_ATTRIBUTES:
+        linked.pop(name, None)
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {'Put': {
+                'TableName': COMPLAINTS_TABLE,
+                'Item': linked,
+                'ConditionExpression': 'attribute_not_exists(complaintId)'
+            }},
+            {'Update': {
+                'TableName': COMPLAINTS_TABLE,
+                'Key': {'complaintId': parent_id},
+                'UpdateExpression': 'ADD #count :one SET lastDuplicateAt = :now',
+                'ConditionExpression': 'attribute_exists(complaintId) AND complaintStatus <> :closed',
+                'ExpressionAttributeNames': {'#count': COUNT_ATTRIBUTE},
+                'ExpressionAttributeValues': {':one': 1, ':now': now_iso(), ':closed': 'Closed'}
+            }}
+        ])
+        return True
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        reasons = e.response.get('CancellationReasons') or [{}]
+        if reasons[0].get('Code') == 'ConditionalCheckFailed':
+            raise ComplaintIdTaken(item['complaintId'])
+        return False
+
+def add_item_to_table(event):
+    """Add item to DynamoDB table"""
+    try:
         # Creating Location data payload
-        location_data = ""
-        if event.get('location',"").lower() == 'address':
-            for i in ['addressDirection', 'addressStreet', 'addressZipcode']:
-                location_data += event.get(i, '') + ' '
-        elif event.get('location', "").lower() == 'intersection':
-            for i in ['intersection1Direction', 'intersection1Street']:
-                location_data += event.get(i, '') + ' '
-            location_data += '& '
-            for i in ['intersection2Direction', 'intersection2Street']:
-                location_data += event.get(i, '') + ' '
+        location_data = build_location_data(event)
 
         # Call location based beat mapping function
         beat_data = invoke_lambda(LAMBDA_API_FN, json.dumps({"location_data": location_data}))
         parsed = json.loads(beat_data)
-        print(parsed)
+        logger.debug("Beat retrieval response", response=parsed)
         
         # Processing data obtained from BeatRetrieval Lambda API to get beat no. and coordinates
-        if len(parsed['body']['candidates']) > 0:
-            if int(parsed['body']['candidates'][0]['score']) > 0.8:
-                if len(parsed['body']['candidates']) == 1:
-                    beat_no = parsed['body']['candidates'][0]['attributes']['PoliceBeat']
-                    x, y = str(parsed['body']['candidates'][0]['location']['x']), str(parsed['body']['candidates'][0]['location']['y'])
-                elif len(parsed['body']['candidates']) > 1:
-                    if parsed['body']['candidates'][0]['attributes']['PoliceBeat'] == "" and parsed['body']['candidates'][1]['attributes']['PoliceBeat']!="" and int(parsed['body']['candidates'][1]['score']) > 0.8:
-                            beat_no = parsed['body']['candidates'][1]['attributes']['PoliceBeat']
-                            x, y = str(parsed['body']['candidates'][1]['location']['x']), str(parsed['body']['candidates'][1]['location']['y'])
-                    else:
-                        beat_no = parsed['body']['candidates'][0]['attributes']['PoliceBeat']
-                        x, y = str(parsed['body']['candidates'][0]['location']['x']), str(parsed['body']['candidates'][0]['location']['y'])
-
-            coordinates = (x,y)
-        else:
-            beat_no = ""
-            coordinates = ("", "")
-
-        # Adding record to DynamoDB Table
-        item = {
-            "isUrgentChecked": event.get('isUrgentChecked', False),
-            "firstName": event.get('firstName', ''),
-            "lastName": event.get('lastName', ''), 
-            "daysOfWeek": event.get('daysOfWeek', []),
-            "startTime": initial_time,
-            "endTime": end_time,
-            "location": event.get('location', ''),
-            "addressDirection": event.get('addressDirection', ''),
-            "addressStreet": event.get('addressStreet', ''),
-            "addressZipcode": event.get('addressZipcode', ''),
-            "intersection1Direction": event.get('intersection1Direction', ''),
-            "intersection1Street": event.get('intersection1Street', ''),
-            "intersection2Direction": event.get('intersection2Direction', ''),
-            "intersection2Street": event.get('intersection2Street', ''),
-            "intersectionZipcode": event.get('intersectionZipcode', ''),
-            "problemCategory": event.get('problemCategory', ''),
-            "description": event.get('description', ''),
-            "subscribeToAlerts": event.get('subscribeToAlerts', ''),
-            "email": event.get('email', ''),
-            "phone": event.get('phone', ''),        
-            "officersNotes": event.get('officersNote', ''),
-            "complaintStatus": 'Open',
-            "beatNumber": beat_no,
-            "complaintId": complaint_id,
-            "coordinates": coordinates,
-            "dateOfComplaint": str(initial_date),
-            "startDate": str(initial_date),
-            "endDate": str(end_date)
-        }
-    
-        table = dynamodb.Table(COMPLAINTS_TABLE)
-        response = table.put_item(Item=item)
+        beat_no, coordinates = select_beat_candidate(parsed['body']['candidates'])
+
+        # Random IDs are made unique by the conditional writes rather than by scanning the table first
+        for _ in range(MAX_ID_ATTEMPTS):
+            complaint_id = str(uuid.uuid4())[:8]
+            item = build_complaint_item(event, complaint_id, beat_no, coordinates)
+            try:
+                # Repeat filings of a recent complaint are linked to it instead of opening a separate case
+                with span("DuplicateCheck"):
+                    parent_id, score = find_parent(dynamodb.meta.client, COMPLAINTS_TABLE, item)
+                if parent_id and put_duplicate(item, parent_id, score):
+                    add_metric("DuplicatesLinked", 1)
+                    logger.info("Linked duplicate complaint", complaintId=complaint_id, duplicateOf=parent_id, score=round(score, 3))
+                    return {
+                        'statusCode': 200,
+                        'duplicateOf': parent_id,
+                        'body': json.dumps({'complaintId': complaint_id, 'duplicateOf': parent_id})
+                    }
+
+                response = put_complaint(item)
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps(response)
+                }
+            except ComplaintIdTaken:
+                logger.info("Complaint ID collision, retrying", complaintId=complaint_id)
         return {
-            'statusCode': 200,
-            'body': json.dumps(response)
+            'statusCode': 500,
+            'body': "Error: could not allocate a complaint ID"
         }
     except ClientError as e:
         if "ResourceNotFoundException" in str(e):
@@ -174,20 +263,31 @@ def add_item_to_table(event):
             'body': f"Error: {str(e)}"
         }
 
+@instrumented
 def lambda_handler(event, context):
     dynamodb = boto3.resource('dynamodb')
-    print(event)
-    print(context)
+    logger.debug("Received event", event=event)
+    if event.get('isBulkUpdate', False):
+        return bulk_update(event)
     if not event.get('isUpdate', False):
-        print(event.get('isUpdate', False))
         return add_item_to_table(event)
     elif event.get('isUpdate', False):
-        print(event.get('isUpdate', False))
         record_id = event.get('complaintId', '')
         attribute = event.get('attribute', '')
         value = event.get('value', '')
-        item = update_record(record_id, attribute, value)
-        print(item)
+        try:
+            item = update_record(record_id, attribute, value)
+        except ClientError as e:
+            # Neither in the complaints table nor in the archive, as apply_bulk_update reports notFound
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            logger.info("Complaint to update not found", complaintId=record_id)
+            return {
+                'statusCode': 404,
+                'message': f'Complaint {record_id} not found',
+                'body': {'complaintId': record_id, 'result': 'notFound'}
+            }
+        logger.info("Complaint updated", complaintId=record_id, attribute=attribute)
         return {
             'statusCode': 200,
             'message': 'Record updated successfully',
@@ -1,13 +1,35 @@
 import boto3
-from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.conditions import Attr, Key
 import math as m
 import datetime
 from datetime import datetime, timedelta, timezone
 import os
+from collections import Counter
+from tableScan import scan_segment, batch_get, batch_get_keys
+from timeSlots import window_bitmap, overlaps
+from archiveTier import ARCHIVE_TABLE, wants_archive
+from sortedQuery import SORTS, sorted_page, decode_cursor
+from complaintItems import expand_item, stored_attributes, start_date_between, attribute_equals
+from textIndex import STATS_TERM, STATS_KEY, DF_KEY, tokenize, bm25
+from instrumentation import instrumented, instrument_client, set_dimension
+from structuredlog import get_logger
 
+logger = get_logger(__name__)
 dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
 
 COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+TEXT_INDEX_TABLE = os.environ.get('TEXT_INDEX_TABLE_NAME')
+STATUSES = ["Open", "Closed", "Follow-Up", "Red-Star", "Duplicate"]
+# Filter specifications accepted by one batch request
+MAX_BATCH_QUERIES = 25
+# Complaints fetched by one by-ID request
+MAX_QUERY_IDS = 100
+# Words of a text query looked up in the index
+MAX_TEXT_TERMS = 8
+# A posting fetched by key costs about as many read units as this many postings read by a Query
+LOOKUP_COST_IN_POSTINGS = 12
+FILTER_NAMES = ['complaintId', 'date', 'startDate', 'time', 'startTime', 'activeFrom', 'beatNumber', 'problemCategory', 'complaintStatus']
 
 def convert_to_utc7(time_str):
     """Convert time string to UTC-7 timezone"""
@@ -22,36 +44,80 @@ def convert_to_utc7(time_str):
     # Format the datetime object back to a string
     return str(time_var)
 
-def lambda_handler(event, context):
-    print(event)
-    table_name = COMPLAINTS_TABLE
-    date = event.get('date', None)
-    time = event.get('time', None)
-    beat_no = event.get('beatNumber', None)
-    complaint_id = event.get('complaintId', None)
-    problem_category = event.get('problemCategory', None)
-    complaint_status = event.get('complaintStatus', None)
-    start_date = event.get('startDate', None)
-    end_date = event.get('endDate', None)
-    start_time = event.get('startTime', None)
-    end_time = event.get('endTime', None)
-    
-    """Query records from DynamoDB table based on date, time, beat no, complaint id, problem category, complaint status"""
-    table = dynamodb.Table(table_name)
-     
+def to_local_time(time_str):
+    """Accept an ISO timestamp from the portal or an Arizona HH:MM(:SS) time"""
+    return convert_to_utc7(time_str) if 'T' in time_str else time_str
+
+def projection_args(fields, time_bitmap):
+    """ProjectionExpression for the requested attributes, plus the ones the time window filter reads"""
+    if not fields:
+        return {}
+    # Compact items store some fields as the attributes they are derived from
+    names = stored_attributes(fields)
+    if time_bitmap:
+        names += [name for name in ('activeSlots', 'startTime', 'endTime') if name not in names]
+    placeholders = {f"#p{index}": name for index, name in enumerate(names)}
+    return {'ProjectionExpression': ", ".join(placeholders), 'ExpressionAttributeNames': placeholders}
+
+def scan_table(table_name, scan_args):
+    """
+    Every page of a scan of one table
+
+    A single ordered segment keeps the one-query and batch paths returning complaints in the same order.
+    """
+    return scan_segment(table_name, 0, 1, scan_args)
+
+def scan_items(table_name, filter_expression, time_bitmap, projection=None):
+    """Scan with an optional filter, keeping only complaints active during the queried time window"""
+    scan_args = dict(projection or {})
+    if filter_expression is not None:
+        scan_args['FilterExpression'] = filter_expression
+    items = scan_table(table_name, scan_args)
+    if time_bitmap:
+        items = [item for item in items if overlaps(item, time_bitmap)]
+    return items
+
+def any_of(attribute, value):
+    """Equality condition on one value, or OR of equalities on a list of values"""
+    if isinstance(value, list):
+        conditions = [attribute_equals(attribute, v) for v in value]
+        combined = conditions[0]
+        for condition in conditions[1:]:
+            combined = combined | condition
+        return combined
+    return attribute_equals(attribute, value)
+
+def matches_any(item, attribute, value):
+    """Python counterpart of any_of"""
+    stored = item.get(attribute, '')
+    return stored in value if isinstance(value, list) else stored == value
+
+def build_filter(spec):
+    """
+    Filter expression and time window bitmap of one filter specification
+
+    Returns (combined_filter or None, time_bitmap or 0)
+    """
+    date = spec.get('date', None)
+    time = spec.get('time', None)
+    start_date = spec.get('startDate', None)
+    end_date = spec.get('endDate', None)
+    start_time = spec.get('startTime', None) or spec.get('activeFrom', None)
+    end_time = spec.get('endTime', None) or spec.get('activeTo', None)
+
     filter_expressions = []
     
     # Handling Date Based Query
     if start_date and end_date:
-        filter_expressions.append(Attr('startDate').between(start_date, end_date))
+        filter_expressions.append(start_date_between(start_date, end_date))
     elif date:
         filter_expressions.append(Attr('dateOfComplaint').eq(date))
 
+    # Handling Time Window Query: complaints active at any moment of the window,
+    # matched on their slot bitmaps so windows straddling the range or midnight are found
+    time_bitmap = 0
     if start_time and end_time:
-        # Convert string times to datetime.time objects for comparison
-        start_time_obj = convert_to_utc7(start_time)
-        end_time_obj = convert_to_utc7(end_time)
-        filter_expressions.append(Attr('startTime').between(start_time_obj, end_time_obj))
+        time_bitmap = window_bitmap(to_local_time(start_time), to_local_time(end_time))
 
     # Handling Time Based Query
     elif time:
@@ -59,101 +125,294 @@ def lambda_handler(event, context):
         time_obj = datetime.strptime(time, '%H:%M:%S').time() 
         filter_expressions.append(Attr('time').eq(time_obj.strftime('%H:%M:%S')))        
 
-    # Handling Beat Based Query
-    if beat_no:
-        if isinstance(beat_no, list):
-            # Handle multiple beat numbers
-            beat_conditions = [Attr('beatNumber').eq(b) for b in beat_no]
-            combined_beat = beat_conditions[0]
-            for condition in beat_conditions[1:]:
-                combined_beat = combined_beat | condition
-            filter_expressions.append(combined_beat)
-        else:
-            filter_expressions.append(Attr('beatNumber').eq(beat_no))
-    
-    # Handling Complaint ID Based Query
-    if complaint_id:
-        if isinstance(complaint_id, list):
-            # Handle multiple complaint IDs
-            complaint_conditions = [Attr('complaintId').eq(c) for c in complaint_id]
-            combined_complaints = complaint_conditions[0]
-            for condition in complaint_conditions[1:]:
-                combined_complaints = combined_complaints | condition
-            filter_expressions.append(combined_complaints)
-        else:
-            filter_expressions.append(Attr('complaintId').eq(complaint_id))
-    
-    # Handling Problem Category Based Query
-    if problem_category:
-        if isinstance(problem_category, list):
-            # Handle multiple problem categories
-            category_conditions = [Attr('problemCategory').eq(p) for p in problem_category]
-            combined_categories = category_conditions[0]
-            for condition in category_conditions[1:]:
-                combined_categories = combined_categories | condition
-            filter_expressions.append(combined_categories)
-        else:
-            filter_expressions.append(Attr('problemCategory').eq(problem_category))     
+    # Handling Beat, Complaint ID and Problem Category Based Queries, each a value or a list of values
+    for attribute in ['beatNumber', 'complaintId', 'problemCategory']:
+        if spec.get(attribute):
+            filter_expressions.append(any_of(attribute, spec[attribute]))
 
     # Handling Complaint Status Based Query
-    if complaint_status:
-        filter_expressions.append(Attr('complaintStatus').eq(complaint_status))
+    if spec.get('complaintStatus'):
+        filter_expressions.append(Attr('complaintStatus').eq(spec['complaintStatus']))
 
     # Creating a combined filter expression
+    combined_filter = None
     if filter_expressions:
         combined_filter = filter_expressions[0]
         for filter_exp in filter_expressions[1:]:
             combined_filter = combined_filter & filter_exp
-        response = table.scan(FilterExpression=combined_filter)
-    else:
-        response = table.scan()
+    return combined_filter, time_bitmap
 
-    totalStatusDict = {}
+def item_matches(item, spec, time_bitmap):
+    """Whether an item passes a specification's filters, evaluated in Python like build_filter's expression"""
+    start_date, end_date = spec.get('startDate'), spec.get('endDate')
+    if start_date and end_date:
+        if not start_date <= item.get('startDate', item.get('dateOfComplaint', '')) <= end_date:
+            return False
+    elif spec.get('date') and item.get('dateOfComplaint') != spec['date']:
+        return False
+    if time_bitmap:
+        if not overlaps(item, time_bitmap):
+            return False
+    elif spec.get('time') and item.get('time') != datetime.strptime(spec['time'], '%H:%M:%S').time().strftime('%H:%M:%S'):
+        return False
+    for attribute in ['beatNumber', 'complaintId', 'problemCategory']:
+        if spec.get(attribute) and not matches_any(item, attribute, spec[attribute]):
+            return False
+    return not spec.get('complaintStatus') or item.get('complaintStatus') == spec['complaintStatus']
 
-    print(filter_expressions)
-    
-    # Organizing the queried items based on complaint status
-    if not filter_expressions:
-        totalStatusDict['TotalOpen'] = len(table.scan(FilterExpression=Attr('complaintStatus').eq("Open"))['Items'])
-        totalStatusDict['TotalClosed'] = len(table.scan(FilterExpression=Attr('complaintStatus').eq("Closed"))['Items'])
-        totalStatusDict['TotalFollow-Up'] = len(table.scan(FilterExpression=Attr('complaintStatus').eq("Follow-Up"))['Items'])
-        totalStatusDict['TotalRed-Star'] = len(table.scan(FilterExpression=Attr('complaintStatus').eq("Red-Star"))['Items'])
-    else:
-        if not complaint_status:
-            for each_status in ["Open", "Closed", "Follow-Up", "Red-Star"]:
-                new_combined_filter = combined_filter
-                total_count_filter = Attr('complaintStatus').eq(each_status)
-                new_combined_filter = new_combined_filter & total_count_filter
-                totalStatusDict[f"Total{each_status}"] = len(table.scan(FilterExpression=new_combined_filter)['Items'])
-        else:
-            for each_status in ["Open", "Closed", "Follow-Up", "Red-Star"]:
-                if each_status.lower() == complaint_status.lower():
-                    totalStatusDict[f"Total{each_status}"] = len(response['Items'])
-                else:
-                    totalStatusDict[f"Total{each_status}"] = 0
-    
-    # Building the response payload
-    total_pages = m.ceil(len(response['Items'])/10)
-    current_page = int(event.get('page', -1))
-    totalComplaint = len(response['Items'])
+def status_totals(items, complaint_status):
+    """TotalOpen, TotalClosed, ... counted over the matched items"""
+    if complaint_status:
+        return {f"Total{each_status}": len(items) if each_status.lower() == complaint_status.lower() else 0 for each_status in STATUSES}
+    counts = Counter(item.get('complaintStatus') for item in items)
+    return {f"Total{each_status}": counts[each_status] for each_status in STATUSES}
+
+def page_response(items, total_status, page, page_size, fields=None, load=None):
+    """
+    Response payload for one page of the matched items, in the API shape whatever their schema version
+
+    `load` turns the page's items into complaints when the matched items are index entries.
+    """
+    total_pages = m.ceil(len(items)/page_size)
+    current_page = int(page)
     if  current_page > 0 and current_page <= total_pages:
-        start_index = (current_page - 1) * 10
+        start_index = (current_page - 1) * page_size
         if current_page == total_pages:
-            complaint_data = response['Items'][start_index:]
+            complaint_data = items[start_index:]
         else:
-            complaint_data = response['Items'][start_index : start_index + 10]
+            complaint_data = items[start_index : start_index + page_size]
         message = "Complaints fetched successfully"
     else:
         complaint_data = []  
         current_page = -1  
         message = "Page out of limit"
+    if load is not None:
+        complaint_data = load(complaint_data)
 
     return {
-        "complaintsData": complaint_data,
+        "complaintsData": [expand_item(item, fields) for item in complaint_data],
         "page": current_page,
         "status": 200,
-        "totalComplaint": len(response['Items']),
-        "totalStatusCounts": totalStatusDict,
+        "totalComplaint": len(items),
+        "totalStatusCounts": total_status,
         "totalPages": total_pages,
         "message": message
-        }
\ No newline at end of file
+        }
+
+def batch_query(specs, fields):
+    """
+    Evaluate several filter specifications over one traversal of the table
+
+    The scan reads the union of the specifications' filters, then every item is tested against each
+    specification in memory, so comparing N beats costs one scan instead of N scans plus their status counts.
+    """
+    compiled = [(spec, *build_filter(spec)) for spec in specs]
+    scan_args = {}
+    if all(combined is not None for _, combined, _ in compiled):
+        union = compiled[0][1]
+        for _, combined, _ in compiled[1:]:
+            union = union | combined
+        scan_args['FilterExpression'] = union
+    if fields:
+        # Every attribute a specification filters on is needed to evaluate it in memory
+        filtered_on = ['startDate', 'dateOfComplaint', 'time', 'beatNumber', 'complaintId', 'problemCategory', 'complaintStatus']
+        scan_args.update(projection_args(list(fields) + filtered_on, any(bitmap for _, _, bitmap in compiled)))
+    items = scan_table(COMPLAINTS_TABLE, scan_args)
+    # Archived complaints follow the active ones, for the specifications that reach into the archive
+    archived = scan_table(ARCHIVE_TABLE, scan_args) if any(wants_archive(spec) for spec in specs) else []
+
+    matched = [[] for _ in compiled]
+    for tier, tier_items in [(False, items), (True, archived)]:
+        for item in tier_items:
+            for index, (spec, _, time_bitmap) in enumerate(compiled):
+                if (not tier or wants_archive(spec)) and item_matches(item, spec, time_bitmap):
+                    matched[index].append(item)
+
+    return [
+        page_response(
+            spec_items,
+            status_totals(spec_items, spec.get('complaintStatus')),
+            spec.get('page', 1),
+            int(spec.get('pageSize', 10)),
+            fields
+        )
+        for (spec, _, _), spec_items in zip(compiled, matched)
+    ], len(items) + len(archived)
+
+def term_postings(term):
+    """Every posting of one term in the text index, without its document frequency item"""
+    query = {
+        "TableName": TEXT_INDEX_TABLE,
+        "KeyConditionExpression": Key('term').eq(term) & Key('complaintId').gt(DF_KEY)
+    }
+    postings = []
+    while True:
+        response = dynamodb.meta.client.query(**query)
+        postings.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return postings
+        query['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def load_by_id(ids, fields):
+    """Stored complaints of the given IDs that still exist, in that order, from the archive for archived ones"""
+    projection = projection_args(fields and list(fields) + ['complaintId'], 0)
+    found = {item['complaintId']: item for item in batch_get(COMPLAINTS_TABLE, 'complaintId', ids, **projection)}
+    missing = [complaint_id for complaint_id in ids if complaint_id not in found]
+    if missing and ARCHIVE_TABLE:
+        found.update({item['complaintId']: item for item in batch_get(ARCHIVE_TABLE, 'complaintId', missing, **projection)})
+    return [found[complaint_id] for complaint_id in ids if complaint_id in found]
+
+def load_complaints(postings, fields, scores):
+    """Complaints of a page of postings in rank order, with their score"""
+    items = load_by_id([posting['complaintId'] for posting in postings], fields)
+    return [dict(item, score=round(scores[item['complaintId']], 4)) for item in items]
+
+def text_query(event, fields):
+    """
+    Complaints whose description or officer notes contain every word of `text`, best BM25 match first
+
+    The rarest term's posting list is read first. Postings carry the beat, status, category, dates and
+    time slots, so the other filters narrow it before the remaining terms are checked for the surviving
+    candidates, and only the requested page of complaints is read. Archived complaints stay in the
+    index and are matched as well.
+    """
+    terms = list(dict.fromkeys(tokenize(event['text'])))[:MAX_TEXT_TERMS]
+    if not terms:
+        return {"status": 400, "message": "text has no searchable words"}
+
+    counters = batch_get_keys(
+        TEXT_INDEX_TABLE,
+        [{'term': term, 'complaintId': DF_KEY} for term in terms] + [{'term': STATS_TERM, 'complaintId': STATS_KEY}]
+    )
+    stats = next((item for item in counters if item['term'] == STATS_TERM), {})
+    df = {term: 0 for term in terms}
+    df.update({item['term']: int(item['df']) for item in counters if item['term'] != STATS_TERM})
+
+    rarest = min(terms, key=df.get)
+    _, time_bitmap = build_filter(event)
+    candidates = [posting for posting in term_postings(rarest) if item_matches(posting, event, time_bitmap)] if df[rarest] else []
+    postings = {rarest: candidates}
+
+    # A complaint has to contain every term. Each other term's postings of the candidates are looked
+    # up by key, or read as a whole list when that list is short enough to be cheaper
+    for term in sorted(terms, key=df.get):
+        if term == rarest or not candidates:
+            continue
+        if len(candidates) * LOOKUP_COST_IN_POSTINGS < df[term]:
+            keys = [{'term': term, 'complaintId': posting['complaintId']} for posting in candidates]
+            postings[term] = batch_get_keys(
+                TEXT_INDEX_TABLE, keys,
+                ProjectionExpression="#term, complaintId, tf, docLength",
+                ExpressionAttributeNames={"#term": "term"}
+            )
+        else:
+            wanted = {posting['complaintId'] for posting in candidates}
+            postings[term] = [posting for posting in term_postings(term) if posting['complaintId'] in wanted]
+        present = {posting['complaintId'] for posting in postings[term]}
+        candidates = [posting for posting in candidates if posting['complaintId'] in present]
+    kept = {posting['complaintId'] for posting in candidates}
+    postings = {term: [posting for posting in term_list if posting['complaintId'] in kept] for term, term_list in postings.items()}
+
+    doc_count = int(stats.get('docCount', 0))
+    scores = bm25(postings, df, doc_count, int(stats.get('totalLength', 0)) / doc_count if doc_count else 0)
+    candidates.sort(key=lambda posting: (-scores[posting['complaintId']], posting['complaintId']))
+    logger.info("Answered text query", terms=terms, documentFrequencies=df, matched=len(candidates))
+
+    return page_response(
+        candidates,
+        status_totals(candidates, event.get('complaintStatus')),
+        event.get('page', 1),
+        int(event.get('pageSize', 10)),
+        fields,
+        lambda page_postings: load_complaints(page_postings, fields, scores)
+    )
+
+def sorted_query(event):
+    """
+    One page in dateDesc, urgency or status order, continuing from `cursor` when given
+
+    Reads about one page per index partition involved rather than the table, so no totals are returned.
+    """
+    sort = event['sort']
+    cursor = event.get('cursor') or None
+    if sort not in SORTS:
+        return {"status": 400, "message": f"sort must be one of {', '.join(SORTS)}"}
+    if cursor and decode_cursor(cursor).get('sort') != sort:
+        return {"status": 400, "message": "cursor belongs to a different sort"}
+    set_dimension("FilterCombination", f"sorted:{sort}")
+
+    combined_filter, time_bitmap = build_filter(event)
+    complaints, next_cursor = sorted_page(
+        dynamodb.meta.client,
+        COMPLAINTS_TABLE,
+        event,
+        sort,
+        combined_filter,
+        time_bitmap,
+        int(event.get('pageSize', 10)),
+        cursor,
+        # Archived complaints are merged in for the same filters that make the unsorted path read the archive
+        archive_table=ARCHIVE_TABLE if wants_archive(event) else None
+    )
+    return {
+        "complaintsData": [expand_item(item, event.get('fields')) for item in complaints],
+        "sort": sort,
+        "nextCursor": next_cursor,
+        "status": 200,
+        "message": "Complaints fetched successfully"
+    }
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    # Callers that only need a few attributes (the chatbot lists IDs) can ask for just those
+    fields = event.get('fields', None)
+
+    # Several filter specifications, e.g. beats compared side by side, answered from one scan
+    if 'queries' in event:
+        specs = event['queries']
+        if not isinstance(specs, list) or not specs or len(specs) > MAX_BATCH_QUERIES:
+            return {"status": 400, "message": f"queries must be a list of 1 to {MAX_BATCH_QUERIES} filter specifications"}
+        set_dimension("FilterCombination", "batch")
+        results, scanned = batch_query(specs, fields)
+        logger.info("Answered batch query", queries=len(specs), itemsRead=scanned)
+        return {"status": 200, "results": results, "message": "Complaints fetched successfully"}
+
+    # Complaints by ID in the given order, e.g. the chatbot paging through an answer it listed earlier
+    if 'complaintIds' in event:
+        ids = event['complaintIds']
+        if not isinstance(ids, list) or len(ids) > MAX_QUERY_IDS:
+            return {"status": 400, "message": f"complaintIds must be a list of at most {MAX_QUERY_IDS} IDs"}
+        set_dimension("FilterCombination", "ids")
+        complaints = [expand_item(item, fields) for item in load_by_id([str(complaint_id) for complaint_id in ids], fields)]
+        return {"status": 200, "complaintsData": complaints, "message": "Complaints fetched successfully"}
+
+    # Text search reads the posting lists of its words instead of scanning
+    if event.get('text'):
+        set_dimension("FilterCombination", "text")
+        return text_query(event, fields)
+
+    # Sorted views page through sorted index queries with a cursor instead of scanning
+    if event.get('sort'):
+        return sorted_query(event)
+
+    complaint_status = event.get('complaintStatus', None)
+    page_size = int(event.get('pageSize', 10))
+    
+    """Query records from DynamoDB table based on date, time, beat no, complaint id, problem category, complaint status"""
+    # The filter combination is a metric dimension so read capacity can be compared per combination
+    used_filters = [name for name in FILTER_NAMES if event.get(name)]
+    set_dimension("FilterCombination", "+".join(used_filters) or "none")
+
+    combined_filter, time_bitmap = build_filter(event)
+    projection = projection_args(fields and list(fields) + ['complaintStatus'], time_bitmap)
+    items = scan_items(COMPLAINTS_TABLE, combined_filter, time_bitmap, projection)
+    # Closed, historical or by-ID queries also read the archive, listed after the active complaints
+    if wants_archive(event):
+        items += scan_items(ARCHIVE_TABLE, combined_filter, time_bitmap, projection)
+
+    # Status totals are counted over the matched items rather than by one more scan per status
+    totalStatusDict = status_totals(items, complaint_status)
+
+    # Building the response payload
+    return page_response(items, totalStatusDict, event.get('page', -1), page_size, fields)
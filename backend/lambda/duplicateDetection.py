@@ -0,0 +1,116 @@
+# Near-duplicate detection at intake: recent complaints of the same category filed around the same spot,
+# found through a sparse index partitioned by geohash cell and category and sorted by submission time
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from boto3.dynamodb.conditions import Attr, Key
+import geohash
+from timeSlots import item_bitmap
+
+DUPLICATE_INDEX = "duplicateIndex"
+CELL_ATTRIBUTE = "duplicateCell"
+SORT_ATTRIBUTE = "submittedAt"
+# Set on a complaint linked to an earlier one, and counted on that parent
+PARENT_ATTRIBUTE = "duplicateOf"
+SCORE_ATTRIBUTE = "duplicateScore"
+COUNT_ATTRIBUTE = "duplicateCount"
+# Status of a linked complaint, so it is not counted as an open case of its own
+DUPLICATE_STATUS = "Duplicate"
+
+# ~1.2 x 0.6 km cells, so a search radius of a few hundred meters touches at most four of them
+CELL_PRECISION = 6
+DUPLICATE_RADIUS_M = int(os.environ.get('DUPLICATE_RADIUS_M', '250'))
+DUPLICATE_WINDOW_DAYS = int(os.environ.get('DUPLICATE_WINDOW_DAYS', '14'))
+DUPLICATE_THRESHOLD = 0.6
+# Candidates read per cell at most; a busier cell keeps its most recent complaints
+MAX_CANDIDATES = 100
+
+# Description text decides most of the score, the reported time window and weekdays the rest
+TEXT_WEIGHT = 0.6
+WINDOW_WEIGHT = 0.25
+DAYS_WEIGHT = 0.15
+SHINGLE_SIZE = 4
+
+# Attributes the index carries for scoring, besides its keys and the table key
+SCORED_ATTRIBUTES = ["description", "activeSlots", "startTime", "endTime", "daysOfWeek", "lat", "lon", "beatNumber", "complaintStatus", PARENT_ATTRIBUTE]
+
+
+def duplicate_cell(item):
+    """Index partition of a complaint, empty when it has no location or category"""
+    if not item.get("geohash") or not item.get("problemCategory"):
+        return {}
+    return {CELL_ATTRIBUTE: f"{item['geohash'][:CELL_PRECISION]}#{item['problemCategory']}"}
+
+def shingles(text):
+    """Character shingles of a description with case, punctuation and spacing normalized"""
+    normalized = " ".join(re.findall(r"[a-z0-9]+", str(text or "").lower()))
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {normalized[index:index + SHINGLE_SIZE] for index in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def window_similarity(item, candidate):
+    """Overlap of the two reported time-of-day windows, as a Jaccard index of their slots"""
+    a, b = item_bitmap(item), item_bitmap(candidate)
+    if not a or not b:
+        return 0.0
+    return bin(a & b).count("1") / bin(a | b).count("1")
+
+def duplicate_score(item, candidate):
+    """Weighted similarity in [0, 1] of a new complaint and a recent one"""
+    return (
+        TEXT_WEIGHT * jaccard(shingles(item.get("description")), shingles(candidate.get("description")))
+        + WINDOW_WEIGHT * window_similarity(item, candidate)
+        + DAYS_WEIGHT * jaccard(set(item.get("daysOfWeek") or []), set(candidate.get("daysOfWeek") or []))
+    )
+
+def recent_in_cell(client, table_name, cell, cutoff):
+    """Open complaints of one index partition submitted since the cutoff, newest first"""
+    response = client.query(
+        TableName=table_name,
+        IndexName=DUPLICATE_INDEX,
+        KeyConditionExpression=Key(CELL_ATTRIBUTE).eq(cell) & Key(SORT_ATTRIBUTE).gte(cutoff),
+        FilterExpression=Attr("complaintStatus").ne("Closed"),
+        ScanIndexForward=False,
+        Limit=MAX_CANDIDATES
+    )
+    return response.get("Items", [])
+
+def find_parent(client, table_name, item, now=None):
+    """
+    Earlier complaint a new one most likely repeats, as (parent id, score), or (None, best score)
+
+    Reads only the index partitions of the complaint's category within DUPLICATE_RADIUS_M, limited to
+    the last DUPLICATE_WINDOW_DAYS. Candidates must be in the same beat and within the radius. A match
+    that is itself a duplicate hands over its parent, so every copy links to the first complaint.
+    """
+    if not duplicate_cell(item):
+        return None, 0.0
+    lat, lon = float(item["lat"]), float(item["lon"])
+    cells = [
+        f"{cell}#{item['problemCategory']}"
+        for cell in geohash.covering_cells(*geohash.radius_box(lat, lon, DUPLICATE_RADIUS_M), CELL_PRECISION)
+    ]
+    cutoff = ((now or datetime.now(timezone.utc)) - timedelta(days=DUPLICATE_WINDOW_DAYS)).date().isoformat()
+
+    if len(cells) == 1:
+        candidates = recent_in_cell(client, table_name, cells[0], cutoff)
+    else:
+        with ThreadPoolExecutor(max_workers=len(cells)) as executor:
+            candidates = [candidate for found in executor.map(lambda cell: recent_in_cell(client, table_name, cell, cutoff), cells) for candidate in found]
+
+    best_id, best_score = None, 0.0
+    for candidate in candidates:
+        if candidate["complaintId"] == item["complaintId"] or candidate.get("beatNumber") != item.get("beatNumber"):
+            continue
+        if geohash.haversine(lat, lon, float(candidate["lat"]), float(candidate["lon"])) > DUPLICATE_RADIUS_M:
+            continue
+        score = duplicate_score(item, candidate)
+        if score > best_score:
+            best_id, best_score = candidate.get(PARENT_ATTRIBUTE) or candidate["complaintId"], score
+    if best_score >= DUPLICATE_THRESHOLD:
+        return best_id, best_score
+    return None, best_score
@@ -2,8 +2,11 @@ import boto3
 import re
 import os
 from botocore.exceptions import ClientError
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
 
-client = boto3.client('ses', region_name='us-west-2')
+logger = get_logger(__name__)
+client = instrument_client(boto3.client('ses', region_name='us-west-2'))
 
 SOURCE_EMAIL = os.environ['SOURCE_EMAIL']
 
@@ -22,9 +25,9 @@ def validation_fn(email):
 def verify_email_identity(email_address):
     try:
         client.verify_email_identity(EmailAddress=email_address)
-        print(f"Verification email sent to {email_address}")
+        logger.info("Verification email sent", sendTo=email_address)
     except ClientError as e:
-        print(f"Error: {e.response['Error']['Message']}")
+        logger.error("Error sending verification email", error=e.response['Error']['Message'])
 
 # Formats complaint data into a readable format for email body
 def format_complaint(complaint):
@@ -60,6 +63,7 @@ def format_complaint(complaint):
     """
 
 # Driver Function containing the final email service format
+@instrumented
 def lambda_handler(event, context):
 
     try:
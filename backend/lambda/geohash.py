@@ -0,0 +1,114 @@
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+DECODE_MAP = {char: index for index, char in enumerate(BASE32)}
+
+# Mean earth radius in meters
+EARTH_RADIUS_M = 6371008.8
+
+# Full precision stored on items (~5 m cells) and the prefix used as the index partition key (~5 km cells)
+ITEM_PRECISION = 9
+PREFIX_PRECISION = 5
+
+
+def encode(lat, lon, precision=ITEM_PRECISION):
+    """Encode a latitude/longitude pair to a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit, char_index, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if lon >= mid:
+                char_index = (char_index << 1) | 1
+                lon_range[0] = mid
+            else:
+                char_index <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                char_index = (char_index << 1) | 1
+                lat_range[0] = mid
+            else:
+                char_index <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(BASE32[char_index])
+            bit, char_index = 0, 0
+    return "".join(chars)
+
+
+def bounds(geohash):
+    """Return the (min_lat, min_lon, max_lat, max_lon) box of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = DECODE_MAP[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lon_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def cell_size(precision):
+    """Return the (lat, lon) size in degrees of cells at a precision"""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def covering_cells(min_lat, min_lon, max_lat, max_lon, precision):
+    """Return the set of geohash cells at a precision that intersect a bounding box"""
+    lat_step, lon_step = cell_size(precision)
+    cells = set()
+    # Walk the box on the cell grid, sampling cell centers so float edges never skip a cell
+    lat = math.floor(min_lat / lat_step) * lat_step + lat_step / 2
+    while lat - lat_step / 2 <= max_lat:
+        lon = math.floor(min_lon / lon_step) * lon_step + lon_step / 2
+        while lon - lon_step / 2 <= max_lon:
+            cells.add(encode(lat, lon, precision))
+            lon += lon_step
+        lat += lat_step
+    return cells
+
+
+def covering_for_box(min_lat, min_lon, max_lat, max_lon, max_cells=16):
+    """
+    Pick the finest precision whose covering of the box needs at most max_cells cells
+
+    Precision never goes below PREFIX_PRECISION since that is the index partition key.
+    """
+    best = covering_cells(min_lat, min_lon, max_lat, max_lon, PREFIX_PRECISION)
+    for precision in range(PREFIX_PRECISION + 1, ITEM_PRECISION + 1):
+        cells = covering_cells(min_lat, min_lon, max_lat, max_lon, precision)
+        if len(cells) > max_cells:
+            break
+        best = cells
+    return best
+
+
+def radius_box(lat, lon, radius_m):
+    """Bounding box (min_lat, min_lon, max_lat, max_lon) of a circle"""
+    d_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+    d_lon = math.degrees(radius_m / (EARTH_RADIUS_M * max(math.cos(math.radians(lat)), 1e-12)))
+    return lat - d_lat, lon - d_lon, lat + d_lat, lon + d_lon
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great circle distance in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
@@ -0,0 +1,67 @@
+#lambda function that backfills numeric lat/lon and geohash attributes on existing complaints
+import boto3
+import os
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Attr
+from complaintItems import spatial_attributes
+from tableScan import parallel_scan
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+UPDATE_WORKERS = 16
+
+
+def backfill_item(item):
+    """Write the spatial attributes of a single complaint, returns True when updated"""
+    attributes = spatial_attributes(item.get('coordinates'))
+    if not attributes:
+        return False
+    dynamodb.meta.client.update_item(
+        TableName=COMPLAINTS_TABLE,
+        Key={'complaintId': item['complaintId']},
+        UpdateExpression='SET lat = :lat, lon = :lon, geohash = :geohash, geohashPrefix = :geohashPrefix',
+        # Skip complaints that were deleted or already migrated since the scan
+        ConditionExpression='attribute_exists(complaintId) AND attribute_not_exists(geohash)',
+        ExpressionAttributeValues={f":{name}": value for name, value in attributes.items()}
+    )
+    return True
+
+def safe_backfill(item):
+    try:
+        return backfill_item(item)
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    dry_run = event.get('dryRun', False)
+
+    # Only complaints that have coordinates but no geohash yet, so re-running is safe
+    items = parallel_scan(
+        COMPLAINTS_TABLE,
+        FilterExpression=Attr('coordinates').exists() & Attr('geohash').not_exists(),
+        ProjectionExpression='complaintId, coordinates'
+    )
+    candidates = [item for item in items if spatial_attributes(item.get('coordinates'))]
+
+    updated = 0
+    if not dry_run:
+        with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as executor:
+            updated = sum(executor.map(safe_backfill, candidates))
+
+    return {
+        'statusCode': 200,
+        'body': {
+            "scanned": len(items),
+            "migratable": len(candidates),
+            "updated": updated,
+            "withoutCoordinates": len(items) - len(candidates),
+            "dryRun": dry_run
+        }
+    }
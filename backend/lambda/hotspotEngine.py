@@ -0,0 +1,289 @@
+import math
+import numpy as np
+from beatGeometry import beats_bbox
+
+# Mean earth radius in meters
+EARTH_RADIUS_M = 6371008.8
+
+DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_BITS = {day: 1 << index for index, day in enumerate(DAYS_OF_WEEK)}
+
+# Upper bound on grid size so tiny cells over a large extent stay within Lambda memory
+MAX_GRID_CELLS = 1000 * 1000
+# Points further than this outside the beats (about 1 km) are geocoding errors; left in, one of them
+# would stretch the grid until its cells are kilometres wide
+BOUNDS_MARGIN_DEG = 0.01
+
+
+def parse_minutes(value):
+    """Convert "HH:MM" or "HH:MM:SS" to minutes after midnight, -1 when missing"""
+    if not value:
+        return -1
+    try:
+        parts = str(value).split(':')
+        return int(parts[0]) * 60 + int(parts[1])
+    except (ValueError, IndexError):
+        return -1
+
+
+def build_point_arrays(items):
+    """
+    Turn complaint items into column arrays
+
+    Items without usable coordinates are dropped. Categorical attributes are returned
+    as numpy string arrays, weekdays as a 7 bit mask and time windows as minutes.
+    """
+    lon, lat, category, status, days, start, end, date = [], [], [], [], [], [], [], []
+    for item in items:
+        # Compact items only keep the numeric lat/lon
+        coordinates = item.get('coordinates') or (item.get('lon', ""), item.get('lat', ""))
+        try:
+            x, y = float(coordinates[0]), float(coordinates[1])
+        except (TypeError, ValueError, IndexError):
+            continue
+        lon.append(x)
+        lat.append(y)
+        category.append(item.get('problemCategory', ''))
+        status.append(item.get('complaintStatus', ''))
+        mask = 0
+        for day in item.get('daysOfWeek') or []:
+            mask |= DAY_BITS.get(day, 0)
+        days.append(mask)
+        start.append(parse_minutes(item.get('startTime')))
+        end.append(parse_minutes(item.get('endTime')))
+        date.append(item.get('dateOfComplaint', ''))
+
+    return {
+        "lon": np.asarray(lon, dtype=np.float64),
+        "lat": np.asarray(lat, dtype=np.float64),
+        "category": np.asarray(category, dtype=object),
+        "status": np.asarray(status, dtype=object),
+        "days": np.asarray(days, dtype=np.uint8),
+        "start": np.asarray(start, dtype=np.int16),
+        "end": np.asarray(end, dtype=np.int16),
+        "date": np.asarray(date, dtype=object)
+    }
+
+
+def time_spans(start, end):
+    """Split windows that wrap past midnight into two closed minute spans"""
+    wraps = end < start
+    return (start, np.where(wraps, 1439, end)), (np.where(wraps, 0, start), end)
+
+
+def window_overlap_mask(start, end, time_from, time_to):
+    """
+    Vectorized check of which complaint windows overlap the requested window
+
+    Both windows may wrap past midnight. Complaints without a time window never match.
+    """
+    mask = np.zeros(start.shape, dtype=bool)
+    for a1, b1 in time_spans(start, end):
+        for a2, b2 in time_spans(np.int16(time_from), np.int16(time_to)):
+            mask |= (a1 <= b2) & (a2 <= b1)
+    return mask & (start >= 0) & (end >= 0)
+
+
+def filter_mask(points, categories=None, statuses=None, days=None, time_from=None, time_to=None, start_date=None, end_date=None):
+    """Build a boolean mask selecting points that match every provided filter"""
+    mask = np.ones(points['lon'].shape, dtype=bool)
+    if categories:
+        mask &= np.isin(points['category'], categories)
+    if statuses:
+        mask &= np.isin(points['status'], statuses)
+    if days:
+        day_mask = 0
+        for day in days:
+            day_mask |= DAY_BITS.get(day, 0)
+        mask &= (points['days'] & day_mask) != 0
+    if time_from is not None and time_to is not None:
+        mask &= window_overlap_mask(points['start'], points['end'], parse_minutes(time_from), parse_minutes(time_to))
+    if start_date and end_date:
+        mask &= (points['date'] >= start_date) & (points['date'] <= end_date)
+    return mask
+
+
+def to_local_meters(lon, lat, origin_lon, origin_lat):
+    """Equirectangular projection to meters around an origin, accurate at city scale"""
+    x = np.radians(lon - origin_lon) * EARTH_RADIUS_M * math.cos(math.radians(origin_lat))
+    y = np.radians(lat - origin_lat) * EARTH_RADIUS_M
+    return x, y
+
+
+def to_lon_lat(x, y, origin_lon, origin_lat):
+    """Inverse of to_local_meters"""
+    lon = origin_lon + np.degrees(x / (EARTH_RADIUS_M * math.cos(math.radians(origin_lat))))
+    lat = origin_lat + np.degrees(y / EARTH_RADIUS_M)
+    return lon, lat
+
+
+def gaussian_smooth(grid, sigma_cells):
+    """Separable Gaussian kernel density over a count grid"""
+    if sigma_cells <= 0:
+        return grid.astype(np.float64)
+    radius = max(1, int(math.ceil(3 * sigma_cells)))
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * (offsets / sigma_cells) ** 2)
+    kernel /= kernel.sum()
+
+    padded = np.pad(grid.astype(np.float64), radius)
+    # Convolve rows then columns using strided windows instead of Python loops
+    rows = np.lib.stride_tricks.sliding_window_view(padded, len(kernel), axis=1) @ kernel
+    return np.lib.stride_tricks.sliding_window_view(rows, len(kernel), axis=0) @ kernel
+
+
+def label_clusters(core):
+    """
+    Label 8-connected components of core cells (DBSCAN on the grid)
+
+    Returns an int32 grid with -1 for non-core cells and 0..n-1 for cluster ids.
+    """
+    labels = np.full(core.shape, -1, dtype=np.int32)
+    # Flood fill over a set of plain tuples, numpy scalar indexing is too slow per cell
+    remaining = set(map(tuple, np.argwhere(core).tolist()))
+    next_label = 0
+    while remaining:
+        stack = [remaining.pop()]
+        members = []
+        while stack:
+            r, c = stack.pop()
+            members.append((r, c))
+            for neighbour in ((r - 1, c - 1), (r - 1, c), (r - 1, c + 1), (r, c - 1),
+                              (r, c + 1), (r + 1, c - 1), (r + 1, c), (r + 1, c + 1)):
+                if neighbour in remaining:
+                    remaining.remove(neighbour)
+                    stack.append(neighbour)
+        rows, cols = zip(*members)
+        labels[list(rows), list(cols)] = next_label
+        next_label += 1
+    return labels
+
+
+def city_bounds(margin=BOUNDS_MARGIN_DEG):
+    """(min_lon, min_lat, max_lon, max_lat) of the beats, widened by a margin"""
+    min_lon, min_lat, max_lon, max_lat = beats_bbox()
+    return min_lon - margin, min_lat - margin, max_lon + margin, max_lat + margin
+
+
+def detect_hotspots(lon, lat, cell_size=150.0, bandwidth=1.0, min_points=5, max_clusters=50, bounds=None):
+    """
+    Grid kernel density and DBSCAN-style clustering of complaint points
+
+    Parameters:
+    lon, lat (np.ndarray): point coordinates in degrees
+    cell_size (float): grid cell edge in meters
+    bandwidth (float): Gaussian kernel sigma in cells
+    min_points (float): density (points per cell after smoothing) a cell needs to be a core cell
+    max_clusters (int): number of clusters returned, largest first
+    bounds (tuple): (min_lon, min_lat, max_lon, max_lat) outside which points are dropped, city_bounds() by default
+
+    Returns:
+    dict: effective cell size, point total, points dropped as outside the bounds, cluster summaries and
+    the cells of returned clusters
+    """
+    result = {"cellSize": cell_size, "totalPoints": int(lon.size), "outsidePoints": 0, "clusters": [], "cells": []}
+    min_lon, min_lat, max_lon, max_lat = bounds if bounds is not None else city_bounds()
+    inside = (lon >= min_lon) & (lon <= max_lon) & (lat >= min_lat) & (lat <= max_lat)
+    result["outsidePoints"] = int(lon.size - np.count_nonzero(inside))
+    lon, lat = lon[inside], lat[inside]
+    if lon.size == 0:
+        return result
+
+    origin_lon, origin_lat = float(lon.min()), float(lat.min())
+    x, y = to_local_meters(lon, lat, origin_lon, origin_lat)
+
+    cols = int(x.max() // cell_size) + 1
+    rows = int(y.max() // cell_size) + 1
+    while rows * cols > MAX_GRID_CELLS:
+        cell_size *= 2
+        cols = int(x.max() // cell_size) + 1
+        rows = int(y.max() // cell_size) + 1
+    result["cellSize"] = cell_size
+
+    col_idx = (x // cell_size).astype(np.int64)
+    row_idx = (y // cell_size).astype(np.int64)
+    counts = np.bincount(row_idx * cols + col_idx, minlength=rows * cols).reshape(rows, cols)
+    density = gaussian_smooth(counts, bandwidth)
+
+    labels = label_clusters(density >= min_points)
+    n_clusters = int(labels.max()) + 1
+    if n_clusters == 0:
+        return result
+
+    # Aggregate per point so centroids and extents use exact coordinates
+    point_labels = labels[row_idx, col_idx]
+    clustered = point_labels >= 0
+    pl = point_labels[clustered]
+    sizes = np.bincount(pl, minlength=n_clusters)
+    sum_lon = np.bincount(pl, weights=lon[clustered], minlength=n_clusters)
+    sum_lat = np.bincount(pl, weights=lat[clustered], minlength=n_clusters)
+    min_lon = np.full(n_clusters, np.inf)
+    min_lat = np.full(n_clusters, np.inf)
+    max_lon = np.full(n_clusters, -np.inf)
+    max_lat = np.full(n_clusters, -np.inf)
+    np.minimum.at(min_lon, pl, lon[clustered])
+    np.minimum.at(min_lat, pl, lat[clustered])
+    np.maximum.at(max_lon, pl, lon[clustered])
+    np.maximum.at(max_lat, pl, lat[clustered])
+
+    flat_labels = labels.ravel()
+    in_cluster = flat_labels >= 0
+    peak = np.zeros(n_clusters)
+    np.maximum.at(peak, flat_labels[in_cluster], density.ravel()[in_cluster])
+    cell_counts = np.bincount(flat_labels[in_cluster], minlength=n_clusters)
+
+    order = np.argsort(-sizes, kind='stable')[:max_clusters]
+    for rank, cluster in enumerate(order):
+        if sizes[cluster] == 0:
+            continue
+        result["clusters"].append({
+            "clusterId": rank + 1,
+            "count": int(sizes[cluster]),
+            "cells": int(cell_counts[cluster]),
+            "peakDensity": round(float(peak[cluster]), 3),
+            "centroid": [float(sum_lon[cluster] / sizes[cluster]), float(sum_lat[cluster] / sizes[cluster])],
+            "bbox": [float(min_lon[cluster]), float(min_lat[cluster]), float(max_lon[cluster]), float(max_lat[cluster])]
+        })
+
+    # Only the cells that belong to a returned cluster are reported
+    rank_of = np.full(n_clusters, -1, dtype=np.int32)
+    rank_of[order] = np.arange(1, order.size + 1)
+    for r, c in np.argwhere(labels >= 0):
+        rank = int(rank_of[labels[r, c]])
+        if rank == -1:
+            continue
+        x0, y0 = c * cell_size, r * cell_size
+        lon0, lat0 = to_lon_lat(np.array([x0, x0 + cell_size]), np.array([y0, y0 + cell_size]), origin_lon, origin_lat)
+        result["cells"].append({
+            "clusterId": rank,
+            "count": int(counts[r, c]),
+            "density": round(float(density[r, c]), 3),
+            "bounds": [float(lon0[0]), float(lat0[0]), float(lon0[1]), float(lat0[1])]
+        })
+    return result
+
+
+def to_geojson(hotspots, include_cells=False):
+    """Render detect_hotspots output as a GeoJSON FeatureCollection"""
+    features = []
+    for cluster in hotspots["clusters"]:
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": cluster["centroid"]},
+            "bbox": cluster["bbox"],
+            "properties": {k: v for k, v in cluster.items() if k not in ("centroid", "bbox")}
+        })
+    if include_cells:
+        for cell in hotspots["cells"]:
+            w, s, e, n = cell["bounds"]
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Polygon", "coordinates": [[[w, s], [e, s], [e, n], [w, n], [w, s]]]},
+                "properties": {"clusterId": cell["clusterId"], "count": cell["count"], "density": cell["density"], "kind": "cell"}
+            })
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+        "properties": {"cellSize": hotspots["cellSize"], "totalPoints": hotspots["totalPoints"],
+                       "outsidePoints": hotspots["outsidePoints"], "clusters": len(hotspots["clusters"])}
+    }
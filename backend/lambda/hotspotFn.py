@@ -0,0 +1,95 @@
+#lambda function that detects sub-beat complaint hotspots and returns them as GeoJSON
+import os
+from boto3.dynamodb.conditions import Attr
+from complaintItems import convert_to_utc7
+from hotspotEngine import build_point_arrays, filter_mask, detect_hotspots, to_geojson
+from tableScan import parallel_scan
+from instrumentation import instrumented
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+
+# Only the attributes the engine needs are read back from the table
+PROJECTION = {
+    "#coordinates": "coordinates",
+    "#lat": "lat",
+    "#lon": "lon",
+    "#problemCategory": "problemCategory",
+    "#complaintStatus": "complaintStatus",
+    "#daysOfWeek": "daysOfWeek",
+    "#startTime": "startTime",
+    "#endTime": "endTime",
+    "#dateOfComplaint": "dateOfComplaint"
+}
+
+
+def as_list(value):
+    """Accept a single value or a list for multi-value filters"""
+    if not value:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def as_local_time(value):
+    """Accept either HH:MM(:SS) Arizona time or an ISO timestamp from the portal"""
+    if not value:
+        return None
+    if 'T' in value:
+        return convert_to_utc7(value)[1]
+    return value
+
+def load_points(categories, statuses, start_date, end_date):
+    """Read the coordinates and filter attributes of matching complaints into numpy arrays"""
+    filters = [Attr('coordinates').exists() | Attr('lat').exists()]
+    if categories:
+        filters.append(Attr('problemCategory').is_in(categories))
+    if statuses:
+        filters.append(Attr('complaintStatus').is_in(statuses))
+    if start_date and end_date:
+        filters.append(Attr('dateOfComplaint').between(start_date, end_date))
+
+    combined_filter = filters[0]
+    for filter_exp in filters[1:]:
+        combined_filter = combined_filter & filter_exp
+
+    items = parallel_scan(
+        COMPLAINTS_TABLE,
+        FilterExpression=combined_filter,
+        ProjectionExpression=", ".join(PROJECTION.keys()),
+        ExpressionAttributeNames=PROJECTION
+    )
+    return build_point_arrays(items)
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    try:
+        categories = as_list(event.get('problemCategory'))
+        statuses = as_list(event.get('complaintStatus'))
+        days = as_list(event.get('daysOfWeek'))
+        start_date = event.get('startDate') or None
+        end_date = event.get('endDate') or None
+        time_from = as_local_time(event.get('startTime'))
+        time_to = as_local_time(event.get('endTime'))
+
+        points = load_points(categories, statuses, start_date, end_date)
+        mask = filter_mask(points, categories, statuses, days, time_from, time_to, start_date, end_date)
+
+        hotspots = detect_hotspots(
+            points['lon'][mask],
+            points['lat'][mask],
+            cell_size=float(event.get('cellSize', 150)),
+            bandwidth=float(event.get('bandwidth', 1.0)),
+            min_points=float(event.get('minPoints', 5)),
+            max_clusters=int(event.get('maxClusters', 50))
+        )
+        return {
+            'statusCode': 200,
+            'body': to_geojson(hotspots, include_cells=bool(event.get('includeCells', False)))
+        }
+    except Exception as e:
+        logger.error("Error detecting hotspots", error=str(e))
+        return {
+            'statusCode': 500,
+            'body': str(e)
+        }
@@ -2,23 +2,38 @@ import json
 import boto3
 from boto3.dynamodb.conditions import Attr
 import os
+from complaintItems import attribute_equals
+from instrumentation import instrumented, instrument_client
 
 dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
 
 table = dynamodb.Table(os.environ['COMPLAINT_TABLE_NAME'])
 
+def scan_all(**kwargs):
+    """Every item of a scan, following pagination"""
+    items = []
+    while True:
+        response = table.scan(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
 # Driver function that queries and retrieves all open cases per beat
+@instrumented
 def lambda_handler(event, context):
     try:
         beat_opencases_dict = {}
-        opencases_for_each_beat = table.scan()
+        opencases_for_each_beat = scan_all(ProjectionExpression='beatNumber')
 
         attribute = 'beatNumber'
-        unique_values = set(item[attribute] for item in opencases_for_each_beat['Items'])
+        unique_values = set(item.get(attribute, '') for item in opencases_for_each_beat)
         
         for beat in unique_values:
-            response = table.scan(FilterExpression= Attr(attribute).eq(beat) & Attr('complaintStatus').eq('Open'))
-            beat_opencases_dict[beat] = len(response['Items'])
+            # Complaints without a beat leave the attribute out, so '' also matches its absence
+            response = scan_all(FilterExpression= attribute_equals(attribute, beat) & Attr('complaintStatus').eq('Open'), ProjectionExpression='complaintId')
+            beat_opencases_dict[beat] = len(response)
 
         return {
             'statusCode': 200,
@@ -0,0 +1,107 @@
+#lambda function that rewrites legacy complaint items in the compact version 2 encoding
+import boto3
+import os
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from boto3.dynamodb.conditions import Attr
+from complaintItems import VERSION_ATTRIBUTE, compact_item
+from tableScan import parallel_scan
+from instrumentation import instrumented, instrument_client, add_metric
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+ARCHIVE_TABLE = os.environ.get('ARCHIVE_TABLE_NAME')
+UPDATE_WORKERS = 16
+
+
+def value_size(value):
+    """Approximate stored size of an attribute value in bytes, following DynamoDB's item size rules"""
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, (int, float, Decimal)):
+        return len(str(value)) // 2 + 2
+    if isinstance(value, (list, tuple)):
+        return 3 + sum(1 + value_size(element) for element in value)
+    if isinstance(value, dict):
+        return 3 + sum(1 + len(name) + value_size(element) for name, element in value.items())
+    return len(str(value).encode())
+
+def item_size(item):
+    return sum(len(name) + value_size(value) for name, value in item.items())
+
+def compaction_update(item):
+    """
+    UpdateItem arguments turning a legacy item into its compact form
+
+    Only the dropped and added attributes are touched, and the update is conditional on the dropped
+    ones still holding the values read by the scan, so an edit made since is never lost.
+    """
+    compact = compact_item(item)
+    removed = [name for name in item if name not in compact]
+    added = {name: value for name, value in compact.items() if item.get(name) != value}
+
+    names, values, conditions = {}, {}, [f"attribute_exists(complaintId) AND attribute_not_exists({VERSION_ATTRIBUTE})"]
+    for index, name in enumerate(removed):
+        names[f"#r{index}"] = name
+        values[f":r{index}"] = item[name]
+        conditions.append(f"#r{index} = :r{index}")
+    for index, (name, value) in enumerate(added.items()):
+        names[f"#s{index}"] = name
+        values[f":s{index}"] = value
+
+    expression = "SET " + ", ".join(f"#s{index} = :s{index}" for index in range(len(added)))
+    if removed:
+        expression += " REMOVE " + ", ".join(f"#r{index}" for index in range(len(removed)))
+    return compact, {
+        'UpdateExpression': expression,
+        'ConditionExpression': " AND ".join(conditions),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values
+    }
+
+def apply_update(update):
+    table_name, complaint_id, arguments = update
+    try:
+        dynamodb.meta.client.update_item(TableName=table_name, Key={'complaintId': complaint_id}, **arguments)
+        return True
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        # Deleted, edited or already compacted since the scan; the next run picks up edited ones
+        return False
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    dry_run = event.get('dryRun', False)
+    tables = [COMPLAINTS_TABLE] + ([ARCHIVE_TABLE] if ARCHIVE_TABLE else [])
+
+    # Only items without the version attribute are rewritten, so re-running is safe
+    updates = []
+    bytes_before = bytes_after = 0
+    for table_name in tables:
+        for item in parallel_scan(table_name, FilterExpression=Attr(VERSION_ATTRIBUTE).not_exists()):
+            compact, arguments = compaction_update(item)
+            bytes_before += item_size(item)
+            bytes_after += item_size(compact)
+            updates.append((table_name, item['complaintId'], arguments))
+
+    updated = 0
+    if not dry_run:
+        with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as executor:
+            updated = sum(executor.map(apply_update, updates))
+    add_metric("ComplaintsCompacted", updated)
+    logger.info("Compacted legacy complaint items", legacy=len(updates), updated=updated, bytesBefore=bytes_before, bytesAfter=bytes_after, dryRun=dry_run)
+
+    return {
+        'statusCode': 200,
+        'body': {
+            "legacyItems": len(updates),
+            "updated": updated,
+            "bytesBefore": bytes_before,
+            "bytesAfter": bytes_after,
+            "dryRun": dry_run
+        }
+    }
@@ -0,0 +1,202 @@
+"""
+Hot path instrumentation shared by every Lambda
+
+Each invocation collects timed spans, AWS call latencies, DynamoDB consumed capacity and
+items scanned versus returned, then prints one CloudWatch Embedded Metric Format (EMF) line.
+Handlers are wrapped with @instrumented, boto3 clients with instrument_client, and tests
+capture the records with collecting() instead of printing them.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+import structuredlog
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ChandlerPD')
+
+# EMF accepts at most 100 values per metric in one record
+MAX_VALUES = 100
+
+# Operations that accept ReturnConsumedCapacity
+CAPACITY_OPERATIONS = [
+    'GetItem', 'PutItem', 'UpdateItem', 'DeleteItem', 'Query', 'Scan',
+    'BatchGetItem', 'BatchWriteItem', 'TransactGetItems', 'TransactWriteItems'
+]
+
+_cold_start = True
+_lock = threading.Lock()
+_current = None
+_emitter = None
+
+
+class Metrics:
+    """Metric values, units, dimensions and properties of one invocation"""
+
+    def __init__(self, function_name):
+        self.values = {}
+        self.units = {}
+        self.dimensions = {"FunctionName": function_name}
+        self.properties = {}
+
+    def add(self, name, value, unit="Count"):
+        with _lock:
+            self.values.setdefault(name, []).append(value)
+            self.units[name] = unit
+
+    def to_emf(self):
+        dimension_names = list(self.dimensions)
+        dimension_sets = [["FunctionName"]]
+        if len(dimension_names) > 1:
+            dimension_sets.append(dimension_names)
+        record = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": NAMESPACE,
+                    "Dimensions": dimension_sets,
+                    "Metrics": [{"Name": name, "Unit": self.units[name]} for name in self.values]
+                }]
+            }
+        }
+        record.update(self.properties)
+        record.update(self.dimensions)
+        for name, values in self.values.items():
+            values = values[:MAX_VALUES]
+            record[name] = values[0] if len(values) == 1 else values
+        return record
+
+
+def _emit(record):
+    if _emitter is not None:
+        _emitter(record)
+    else:
+        print(json.dumps(record, default=str))
+
+def add_metric(name, value, unit="Count"):
+    """Record a value on the running invocation, ignored outside of one"""
+    if _current is not None:
+        _current.add(name, value, unit)
+
+def set_dimension(name, value):
+    """Add a low cardinality dimension, e.g. the filter combination a query used"""
+    if _current is not None:
+        _current.dimensions[name] = str(value)
+
+def set_property(name, value):
+    """Attach a searchable, non metric value to the invocation record"""
+    if _current is not None:
+        _current.properties[name] = value
+
+@contextmanager
+def span(name):
+    """Time a block of code as the <name>Latency metric"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_metric(f"{name}Latency", (time.perf_counter() - start) * 1000, "Milliseconds")
+
+def timed(name):
+    """Decorator form of span"""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def instrumented(handler):
+    """Wrap a Lambda handler so each invocation emits its metrics, including failed ones"""
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        global _cold_start, _current
+        function_name = getattr(context, 'function_name', None) or os.environ.get('AWS_LAMBDA_FUNCTION_NAME', handler.__module__)
+        # Handlers invoked in-process by another one (local runs) get their own record
+        previous = _current
+        _current = Metrics(function_name)
+        structuredlog.start_request()
+        _current.add("ColdStart", 1 if _cold_start else 0)
+        _cold_start = False
+        start = time.perf_counter()
+        try:
+            return handler(event, context)
+        except Exception:
+            _current.add("Errors", 1)
+            raise
+        finally:
+            _current.add("HandlerLatency", (time.perf_counter() - start) * 1000, "Milliseconds")
+            _emit(_current.to_emf())
+            _current = previous
+    return wrapper
+
+
+def _add_capacity(params, model, **kwargs):
+    if model.name in CAPACITY_OPERATIONS and 'ReturnConsumedCapacity' not in params:
+        params['ReturnConsumedCapacity'] = 'TOTAL'
+
+def _start_call(context, **kwargs):
+    context['instrumentation_start'] = time.perf_counter()
+
+def _end_call(parsed, model, context, **kwargs):
+    start = context.get('instrumentation_start')
+    operation = str(model.service_model.service_id).replace(' ', '') + model.name
+    if start is not None:
+        add_metric(f"{operation}Latency", (time.perf_counter() - start) * 1000, "Milliseconds")
+    if not isinstance(parsed, dict):
+        return
+
+    capacity = parsed.get('ConsumedCapacity')
+    for entry in capacity if isinstance(capacity, list) else [capacity] if capacity else []:
+        if 'ReadCapacityUnits' in entry or 'WriteCapacityUnits' in entry:
+            add_metric("DynamoDBReadCapacity", entry.get('ReadCapacityUnits', 0))
+            add_metric("DynamoDBWriteCapacity", entry.get('WriteCapacityUnits', 0))
+        else:
+            # TOTAL capacity only reports CapacityUnits; reads and writes are told apart by operation
+            metric = "DynamoDBWriteCapacity" if model.name in ['PutItem', 'UpdateItem', 'DeleteItem', 'BatchWriteItem', 'TransactWriteItems'] else "DynamoDBReadCapacity"
+            add_metric(metric, entry.get('CapacityUnits', 0))
+    if 'ScannedCount' in parsed:
+        add_metric("ItemsScanned", parsed['ScannedCount'])
+        add_metric("ItemsReturned", parsed.get('Count', 0))
+
+def instrument_client(client):
+    """Time every call of a boto3 client; DynamoDB clients also report capacity and scanned items"""
+    events = client.meta.events
+    service = client.meta.service_model.service_name
+    if service == 'dynamodb':
+        events.register('provide-client-params.dynamodb.*', _add_capacity)
+    events.register(f'before-call.{service}.*', _start_call)
+    events.register(f'after-call.{service}.*', _end_call)
+    return client
+
+
+class LocalCollector:
+    """Keeps emitted records in memory instead of printing them"""
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def metric(self, name):
+        """Every value recorded for a metric across the collected invocations"""
+        values = []
+        for record in self.records:
+            value = record.get(name)
+            if value is not None:
+                values.extend(value if isinstance(value, list) else [value])
+        return values
+
+@contextmanager
+def collecting():
+    """Route emitted records to a LocalCollector for the duration of the block"""
+    global _emitter
+    previous, collector = _emitter, LocalCollector()
+    _emitter = collector
+    try:
+        yield collector
+    finally:
+        _emitter = previous
@@ -0,0 +1,86 @@
+"""
+Structured JSON logging shared by every Lambda
+
+Records are only built when their level is enabled, so formatting, redaction and JSON
+encoding cost nothing for suppressed lines. Debug detail (whole events, responses) is
+written for a sampled share of invocations instead of all of them, and PII fields are
+redacted on the way out.
+
+Environment:
+LOG_LEVEL (default INFO) and LOG_DEBUG_SAMPLE_RATE (share of invocations logging debug detail, default 0.01)
+"""
+import json
+import logging
+import os
+import random
+import re
+import sys
+
+LEVEL = logging.getLevelName(os.environ.get('LOG_LEVEL', 'INFO').upper())
+DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', '0.01'))
+
+PII_FIELDS = {'firstName', 'lastName', 'email', 'phone', 'sendTo'}
+REDACTED = '[redacted]'
+EMAIL_PATTERN = re.compile(r'[^\s@"\']+@[^\s@"\']+\.[A-Za-z]{2,}')
+PHONE_PATTERN = re.compile(r'\(?\b\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}\b')
+
+# Whether the running invocation was sampled for debug detail
+_sampled = False
+_loggers = {}
+
+
+def start_request(sample_rate=None):
+    """Decide once per invocation whether debug records are written"""
+    global _sampled
+    _sampled = random.random() < (DEBUG_SAMPLE_RATE if sample_rate is None else sample_rate)
+
+def redact_field(name, value):
+    """A named value with PII fields masked whatever they hold, other values redacted by content"""
+    return REDACTED if name in PII_FIELDS and value else redact(value)
+
+def redact(value):
+    """Copy of a value with PII fields masked and emails/phone numbers scrubbed from strings"""
+    if isinstance(value, dict):
+        return {key: redact_field(key, item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return PHONE_PATTERN.sub(REDACTED, EMAIL_PATTERN.sub(REDACTED, value))
+    return value
+
+
+class StructuredLogger:
+
+    def __init__(self, name):
+        self.name = name
+
+    def is_enabled(self, level):
+        return level >= LEVEL or (level == logging.DEBUG and _sampled)
+
+    def log(self, level, message, fields):
+        if not self.is_enabled(level):
+            return
+        record = {"level": logging.getLevelName(level), "logger": self.name, "message": message}
+        # Callables defer expensive values until the record is actually written
+        record.update({name: redact_field(name, value() if callable(value) else value) for name, value in fields.items()})
+        if level < LEVEL:
+            record["sampled"] = True
+        sys.stdout.write(json.dumps(record, default=str) + "\n")
+
+    def debug(self, message, **fields):
+        self.log(logging.DEBUG, message, fields)
+
+    def info(self, message, **fields):
+        self.log(logging.INFO, message, fields)
+
+    def warning(self, message, **fields):
+        self.log(logging.WARNING, message, fields)
+
+    def error(self, message, **fields):
+        self.log(logging.ERROR, message, fields)
+
+
+def get_logger(name):
+    if name not in _loggers:
+        _loggers[name] = StructuredLogger(name)
+    return _loggers[name]
@@ -0,0 +1,102 @@
+#lambda function that writes canonical location keys on existing complaints and rebuilds the repeat-location counters
+import boto3
+import os
+from concurrent.futures import ThreadPoolExecutor
+from tableScan import parallel_scan
+from repeatLocations import LOCATION_ATTRIBUTE, LOCATION_INPUTS, COUNT_ATTRIBUTE, OPEN_COUNT_ATTRIBUTE, location_update, location_counts
+from archiveTier import ARCHIVE_TABLE
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+LOCATION_TABLE = os.environ['LOCATION_TABLE_NAME']
+UPDATE_WORKERS = 16
+
+
+def apply_update(update):
+    table_name, complaint_id, key_update = update
+    try:
+        dynamodb.meta.client.update_item(
+            TableName=table_name,
+            Key={'complaintId': complaint_id},
+            # Skip complaints deleted or archived since the scan
+            ConditionExpression='attribute_exists(complaintId)',
+            **key_update
+        )
+        return True
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+
+def scan_locations(table_name):
+    names = ["complaintId", "complaintStatus", "beatNumber", LOCATION_ATTRIBUTE] + sorted(LOCATION_INPUTS)
+    placeholders = {f"#p{index}": name for index, name in enumerate(names)}
+    return parallel_scan(table_name, ProjectionExpression=", ".join(placeholders), ExpressionAttributeNames=placeholders)
+
+def expected_counters(items):
+    """Counter item per location key over the given complaints"""
+    counters = {}
+    for item in items:
+        counts = location_counts(item)
+        if not counts:
+            continue
+        key, complaints, open_complaints = counts
+        counter = counters.setdefault(key, {'locationKey': key, COUNT_ATTRIBUTE: 0, OPEN_COUNT_ATTRIBUTE: 0})
+        counter[COUNT_ATTRIBUTE] += complaints
+        counter[OPEN_COUNT_ATTRIBUTE] += open_complaints
+        if item.get('beatNumber'):
+            counter['beatNumber'] = item['beatNumber']
+    return counters
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    dry_run = event.get('dryRun', False)
+
+    # Archived complaints get the key too, so a restored complaint comes back indexed
+    tables = [COMPLAINTS_TABLE] + ([ARCHIVE_TABLE] if ARCHIVE_TABLE else [])
+    items_by_table = {table_name: scan_locations(table_name) for table_name in tables}
+    # Only complaints whose stored key disagrees with their address fields are written, so re-running is safe
+    updates = [
+        (table_name, item['complaintId'], update)
+        for table_name, items in items_by_table.items() for item in items for update in [location_update(item)] if update
+    ]
+
+    # Counters cover the whole history, archived complaints included
+    counters = expected_counters([item for items in items_by_table.values() for item in items])
+    existing = {item['locationKey']: item for item in parallel_scan(LOCATION_TABLE)}
+    stale = [key for key in existing if key not in counters]
+    # Stored numbers come back as Decimal, which compares equal to the computed ints
+    changed = [counter for key, counter in counters.items() if existing.get(key) != counter]
+
+    updated = 0
+    if not dry_run:
+        with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as executor:
+            updated = sum(executor.map(apply_update, updates))
+        # Stream updates landing meanwhile are reconciled by the next run
+        with dynamodb.Table(LOCATION_TABLE).batch_writer() as batch:
+            for key in stale:
+                batch.delete_item(Key={'locationKey': key})
+            for counter in changed:
+                batch.put_item(Item=counter)
+    scanned = sum(len(items) for items in items_by_table.values())
+    logger.info(
+        "Backfilled location keys", scanned=scanned, outOfDate=len(updates), updated=updated,
+        locations=len(counters), rewritten=len(changed), deleted=len(stale), dryRun=dry_run
+    )
+
+    return {
+        'statusCode': 200,
+        'body': {
+            "scanned": scanned,
+            "outOfDate": len(updates),
+            "updated": updated,
+            "locations": len(counters),
+            "countersRewritten": len(changed),
+            "countersDeleted": len(stale),
+            "dryRun": dry_run
+        }
+    }
@@ -0,0 +1,69 @@
+#lambda function that keeps the repeat-location counters in step with the complaints table stream
+import boto3
+import os
+from collections import defaultdict
+from boto3.dynamodb.types import TypeDeserializer
+from repeatLocations import COUNT_ATTRIBUTE, OPEN_COUNT_ATTRIBUTE, location_counts
+from archiveTier import is_tier_move
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+deserializer = TypeDeserializer()
+
+LOCATION_TABLE = os.environ['LOCATION_TABLE_NAME']
+
+
+def deserialize(image):
+    return {name: deserializer.deserialize(value) for name, value in (image or {}).items()}
+
+def counter_deltas(records):
+    """
+    Net (complaints, open complaints) change per location key for a batch of stream records, and the
+    new beat of locations whose complaints arrived or changed beat
+
+    Keys are computed from the images rather than read from the stored attribute, so the backfill
+    writing locationKey onto existing complaints leaves the counters alone.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    beats = {}
+    for record in records:
+        # Archived complaints keep counting towards their location, so moving between tiers changes nothing
+        if is_tier_move(record):
+            continue
+        old_image = deserialize(record['dynamodb'].get('OldImage'))
+        new_image = deserialize(record['dynamodb'].get('NewImage'))
+        old = location_counts(old_image) if old_image else None
+        new = location_counts(new_image) if new_image else None
+        if old:
+            deltas[old[0]][0] -= old[1]
+            deltas[old[0]][1] -= old[2]
+        if new:
+            deltas[new[0]][0] += new[1]
+            deltas[new[0]][1] += new[2]
+            # A re-beated location moves to its new partition of the top-locations index
+            if new_image.get('beatNumber') and (not old or old_image.get('beatNumber') != new_image['beatNumber']):
+                beats[new[0]] = new_image['beatNumber']
+    # Edits that leave the location, open/closed state and beat unchanged cancel out here
+    return {key: delta for key, delta in deltas.items() if any(delta) or key in beats}, beats
+
+@instrumented
+def lambda_handler(event, context):
+    records = event.get('Records', [])
+    deltas, beats = counter_deltas(records)
+    table = dynamodb.Table(LOCATION_TABLE)
+    for key, (count_delta, open_delta) in deltas.items():
+        update = {
+            'Key': {'locationKey': key},
+            'UpdateExpression': 'ADD #count :count, #open :open',
+            'ExpressionAttributeNames': {'#count': COUNT_ATTRIBUTE, '#open': OPEN_COUNT_ATTRIBUTE},
+            'ExpressionAttributeValues': {':count': count_delta, ':open': open_delta}
+        }
+        if key in beats:
+            update['UpdateExpression'] += ' SET beatNumber = :beat'
+            update['ExpressionAttributeValues'][':beat'] = beats[key]
+        table.update_item(**update)
+    logger.info("Applied location counter updates", locations=len(deltas), records=len(records))
+    return {'statusCode': 200, 'body': {"updatedLocations": len(deltas)}}
@@ -0,0 +1,60 @@
+#lambda function that writes the priority index attributes on existing complaints
+import boto3
+import os
+from concurrent.futures import ThreadPoolExecutor
+from priorityQueue import PRIORITY_ATTRIBUTES, priority_update
+from duplicateDetection import PARENT_ATTRIBUTE
+from tableScan import parallel_scan
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+UPDATE_WORKERS = 16
+
+
+def apply_update(update):
+    complaint_id, index_update = update
+    try:
+        dynamodb.meta.client.update_item(
+            TableName=COMPLAINTS_TABLE,
+            Key={'complaintId': complaint_id},
+            # Skip complaints deleted since the scan
+            ConditionExpression='attribute_exists(complaintId)',
+            **index_update
+        )
+        return True
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    dry_run = event.get('dryRun', False)
+
+    # Only complaints whose index attributes disagree with their status and urgency are written,
+    # so re-running is safe and also repairs entries that drifted
+    items = parallel_scan(
+        COMPLAINTS_TABLE,
+        ProjectionExpression=", ".join(["complaintId", "complaintStatus", "isUrgentChecked", "beatNumber", "submittedAt", "dateOfComplaint", PARENT_ATTRIBUTE] + PRIORITY_ATTRIBUTES)
+    )
+    updates = [(item['complaintId'], update) for item in items for update in [priority_update(item)] if update]
+
+    updated = 0
+    if not dry_run:
+        with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as executor:
+            updated = sum(executor.map(apply_update, updates))
+    logger.info("Backfilled priority index", scanned=len(items), outOfDate=len(updates), updated=updated, dryRun=dry_run)
+
+    return {
+        'statusCode': 200,
+        'body': {
+            "scanned": len(items),
+            "outOfDate": len(updates),
+            "updated": updated,
+            "dryRun": dry_run
+        }
+    }
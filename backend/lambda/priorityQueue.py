@@ -0,0 +1,67 @@
+# Keys of the sparse priority index: only urgent or Red-Star complaints that are not closed carry them
+from duplicateDetection import PARENT_ATTRIBUTE
+
+PRIORITY_INDEX = "priorityIndex"
+PARTITION_ATTRIBUTE = "priorityBeat"
+SORT_ATTRIBUTE = "priorityKey"
+PRIORITY_ATTRIBUTES = [PARTITION_ATTRIBUTE, SORT_ATTRIBUTE]
+
+# Attributes an update can change the priority through
+PRIORITY_INPUTS = {"complaintStatus", "isUrgentChecked", "beatNumber"}
+
+# Lower ranks are handled first
+RANK_RED_STAR_URGENT = 1
+RANK_RED_STAR = 2
+RANK_URGENT = 3
+
+
+def is_urgent(item):
+    return item.get('isUrgentChecked') in (True, 'true', 'True')
+
+def priority_rank(item):
+    """Queue rank of a complaint, None when it does not belong in the queue"""
+    status = item.get('complaintStatus')
+    # Duplicates are handled through the complaint they were linked to
+    if status == 'Closed' or item.get(PARENT_ATTRIBUTE):
+        return None
+    if status == 'Red-Star':
+        return RANK_RED_STAR_URGENT if is_urgent(item) else RANK_RED_STAR
+    return RANK_URGENT if is_urgent(item) else None
+
+def submitted_at(item):
+    """Submission time, falling back to the filing date for complaints stored before it was recorded"""
+    return str(item.get('submittedAt') or item.get('dateOfComplaint') or '')
+
+def priority_attributes(item):
+    """
+    Index attributes of a complaint: beat partition and "rank#submission time" sort key, so a Query
+    returns a beat's complaints most urgent first and oldest first within a rank.
+    Empty when the complaint is not in the queue, which keeps it out of the sparse index.
+    """
+    rank = priority_rank(item)
+    if rank is None or not item.get('beatNumber'):
+        return {}
+    return {
+        PARTITION_ATTRIBUTE: str(item['beatNumber']),
+        SORT_ATTRIBUTE: f"{rank}#{submitted_at(item)}"
+    }
+
+def priority_update(item):
+    """
+    UpdateItem arguments bringing a complaint's index attributes in line with its current state,
+    None when they already are
+    """
+    wanted = priority_attributes(item)
+    if all(item.get(name) == wanted.get(name) for name in PRIORITY_ATTRIBUTES):
+        return None
+    names = {f"#{name}": name for name in PRIORITY_ATTRIBUTES}
+    if wanted:
+        return {
+            'UpdateExpression': f"SET #{PARTITION_ATTRIBUTE} = :beat, #{SORT_ATTRIBUTE} = :key",
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': {':beat': wanted[PARTITION_ATTRIBUTE], ':key': wanted[SORT_ATTRIBUTE]}
+        }
+    return {
+        'UpdateExpression': f"REMOVE #{PARTITION_ATTRIBUTE}, #{SORT_ATTRIBUTE}",
+        'ExpressionAttributeNames': names
+    }
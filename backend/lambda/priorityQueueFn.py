@@ -0,0 +1,64 @@
+#lambda function returning the most urgent open complaints of each beat from the sparse priority index
+import boto3
+import os
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
+from priorityQueue import PRIORITY_INDEX, PARTITION_ATTRIBUTE, SORT_ATTRIBUTE, RANK_RED_STAR_URGENT, RANK_RED_STAR, RANK_URGENT
+from complaintItems import expand_item
+from beatGeometry import beat_numbers
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+QUERY_WORKERS = 8
+
+RANK_LABELS = {RANK_RED_STAR_URGENT: "Red-Star, urgent", RANK_RED_STAR: "Red-Star", RANK_URGENT: "Urgent"}
+
+
+def as_list(value):
+    """Accept a single value or a list for multi-value filters"""
+    if not value:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def top_of_beat(beat, limit):
+    """One Query: the first `limit` queue entries of a beat, most urgent and then oldest first"""
+    response = dynamodb.meta.client.query(
+        TableName=COMPLAINTS_TABLE,
+        IndexName=PRIORITY_INDEX,
+        KeyConditionExpression=Key(PARTITION_ATTRIBUTE).eq(beat),
+        Limit=limit
+    )
+    complaints = [expand_item(item) for item in response.get('Items', [])]
+    for complaint in complaints:
+        rank = int(complaint[SORT_ATTRIBUTE].split('#', 1)[0])
+        complaint['priority'] = RANK_LABELS.get(rank, str(rank))
+    return complaints
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    try:
+        beats = [str(beat) for beat in as_list(event.get('beatNumber'))] or beat_numbers()
+        limit = max(1, min(int(event.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+
+        with ThreadPoolExecutor(max_workers=min(QUERY_WORKERS, len(beats))) as executor:
+            queues = dict(zip(beats, executor.map(lambda beat: top_of_beat(beat, limit), beats)))
+
+        return {
+            'statusCode': 200,
+            'body': {
+                "limit": limit,
+                # Beats with an empty queue are left out
+                "beats": {beat: complaints for beat, complaints in queues.items() if complaints}
+            }
+        }
+    except Exception as e:
+        logger.error("Error reading the priority queue", error=str(e))
+        return {'statusCode': 500, 'body': str(e)}
@@ -0,0 +1,282 @@
+#lambda function that reassigns stored beat numbers after police beat boundaries change
+import boto3
+import json
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from boto3.dynamodb.conditions import Attr
+from beatGeometry import BEATS_PATH, load_beats
+from beatAssignment import assign_beats
+from priorityQueue import PARTITION_ATTRIBUTE
+from archiveTier import ARCHIVE_TABLE
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+s3_client = instrument_client(boto3.client('s3'))
+lambda_client = instrument_client(boto3.client('lambda'))
+
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+JOB_BUCKET = os.environ['IMPORT_BUCKET_NAME']
+# Jobs rebuilding the trend buckets, text index and location counters, which are kept per beat. The table
+# stream updates them for the complaints table, but the archive table has no stream
+REBUILD_FUNCTIONS = [
+    name for name in (os.environ.get('TREND_REBUILD_FN_NAME'), os.environ.get('TEXT_INDEX_REBUILD_FN_NAME'), os.environ.get('LOCATION_BACKFILL_FN_NAME'))
+    if name
+]
+
+# Scan segments per table, read one page each per round
+SCAN_SEGMENTS = 8
+UPDATE_WORKERS = 16
+# Stop and hand over to a fresh invocation when less than this much time is left
+TIME_MARGIN_MS = 90 * 1000
+# Changed complaints listed individually in the report
+MAX_REPORTED_CHANGES = 200
+PROJECTION = ["complaintId", "beatNumber", "lat", "lon", "coordinates", PARTITION_ATTRIBUTE]
+
+
+def invoke_lambda(function_name, payload, invocation_type='RequestResponse'):
+    """Invoke another Lambda function with the given payload"""
+
+    try:
+        response = lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType=invocation_type,
+            Payload=payload
+        )
+        return response['Payload'].read()
+    except Exception as e:
+        logger.error("Error invoking Lambda function", function=function_name, error=str(e))
+        raise e
+
+def checkpoint_key(boundaries_key, dry_run):
+    """S3 key of the progress checkpoint and report of a re-beat run"""
+    name = boundaries_key or "bundled"
+    return f"rebeat/{name}{'.dryrun' if dry_run else ''}.json"
+
+def load_checkpoint(key):
+    """Load the checkpoint of a run, or None when it has not started yet"""
+    try:
+        response = s3_client.get_object(Bucket=JOB_BUCKET, Key=key)
+        return json.loads(response['Body'].read())
+    except s3_client.exceptions.NoSuchKey:
+        return None
+
+def save_checkpoint(key, checkpoint):
+    """Persist the checkpoint so an interrupted run can resume"""
+    checkpoint['updatedAt'] = datetime.now(timezone.utc).isoformat()
+    s3_client.put_object(
+        Bucket=JOB_BUCKET,
+        Key=key,
+        Body=json.dumps(checkpoint).encode('utf-8'),
+        ContentType='application/json'
+    )
+
+def load_boundaries(boundaries_key):
+    """New beat polygons from an Esri FeatureSet in the job bucket, or the ones bundled with the function"""
+    if not boundaries_key:
+        return load_beats(BEATS_PATH)
+    path = os.path.join('/tmp', os.path.basename(boundaries_key))
+    s3_client.download_file(JOB_BUCKET, boundaries_key, path)
+    return load_beats(path)
+
+def new_checkpoint(boundaries_key, dry_run, effective_from):
+    tables = [COMPLAINTS_TABLE] + ([ARCHIVE_TABLE] if ARCHIVE_TABLE else [])
+    return {
+        "boundariesKey": boundaries_key, "dryRun": dry_run, "effectiveFrom": effective_from,
+        "units": [{"table": table, "segment": segment, "startKey": None, "done": False} for table in tables for segment in range(SCAN_SEGMENTS)],
+        "scanned": 0, "changed": 0, "written": 0, "archiveWritten": 0, "conflicts": 0, "outside": 0, "noCoordinates": 0,
+        "moves": {}, "changes": [], "rebuildsStarted": [], "done": False
+    }
+
+def read_page(unit, effective_from):
+    """One scan page of a segment: its items and the key to continue from, None at the end"""
+    placeholders = {f"#p{index}": name for index, name in enumerate(PROJECTION)}
+    kwargs = {
+        'TableName': unit['table'],
+        'Segment': unit['segment'],
+        'TotalSegments': SCAN_SEGMENTS,
+        'ProjectionExpression': ", ".join(placeholders),
+        'ExpressionAttributeNames': placeholders
+    }
+    # Complaints filed under the old boundaries can be left in the beat they were handled by
+    if effective_from:
+        kwargs['FilterExpression'] = Attr('dateOfComplaint').gte(effective_from)
+    if unit['startKey']:
+        kwargs['ExclusiveStartKey'] = unit['startKey']
+    response = dynamodb.meta.client.scan(**kwargs)
+    return response.get('Items', []), response.get('LastEvaluatedKey')
+
+def point_of(item):
+    """(lon, lat) of a complaint, None without stored coordinates"""
+    # Legacy items only carry coordinates, compact ones only lat/lon
+    coordinates = (item['lon'], item['lat']) if 'lat' in item else item.get('coordinates') or ("", "")
+    try:
+        return float(coordinates[0]), float(coordinates[1])
+    except (TypeError, ValueError, IndexError):
+        return None
+
+def apply_change(change):
+    """
+    Conditional write of one new beat; False when the complaint was edited, moved or deleted since it
+    was read, in which case the next run picks it up again
+    """
+    table_name, item, beat = change
+    names = {'#beat': 'beatNumber'}
+    values = {':beat': beat}
+    assignments = ['#beat = :beat']
+    if item.get('beatNumber'):
+        condition = '#beat = :old'
+        values[':old'] = item['beatNumber']
+    else:
+        condition = 'attribute_exists(complaintId) AND attribute_not_exists(#beat)'
+    # The priority index is partitioned by beat
+    if item.get(PARTITION_ATTRIBUTE):
+        assignments.append('#priority = :beat')
+        names['#priority'] = PARTITION_ATTRIBUTE
+    try:
+        dynamodb.meta.client.update_item(
+            TableName=table_name,
+            Key={'complaintId': item['complaintId']},
+            UpdateExpression='SET ' + ', '.join(assignments),
+            ConditionExpression=condition,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values
+        )
+        return True
+    except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+
+def process_round(units, checkpoint, beats, write_executor):
+    """Read one page of every unfinished segment, reassign their beats together and write the changes"""
+    with ThreadPoolExecutor(max_workers=len(units)) as executor:
+        pages = list(executor.map(lambda unit: read_page(unit, checkpoint['effectiveFrom']), units))
+
+    located = []
+    for unit, (items, _) in zip(units, pages):
+        checkpoint['scanned'] += len(items)
+        for item in items:
+            point = point_of(item)
+            if point is None:
+                checkpoint['noCoordinates'] += 1
+            else:
+                located.append((unit['table'], item, point))
+
+    changes = []
+    if located:
+        assigned = assign_beats([point[0] for _, _, point in located], [point[1] for _, _, point in located], beats)
+        for (table_name, item, _), beat in zip(located, assigned):
+            # Points outside every new beat keep the beat they have
+            if not beat:
+                checkpoint['outside'] += 1
+            elif beat != item.get('beatNumber'):
+                changes.append((table_name, item, beat))
+
+    moves = Counter(checkpoint['moves'])
+    moves.update(f"{item.get('beatNumber') or '-'}->{beat}" for _, item, beat in changes)
+    checkpoint['moves'] = dict(moves)
+    checkpoint['changed'] += len(changes)
+    room = MAX_REPORTED_CHANGES - len(checkpoint['changes'])
+    checkpoint['changes'] += [
+        {"table": table_name, "complaintId": item['complaintId'], "from": item.get('beatNumber', ''), "to": beat}
+        for table_name, item, beat in changes[:max(room, 0)]
+    ]
+    if not checkpoint['dryRun']:
+        results = list(write_executor.map(apply_change, changes))
+        written = sum(results)
+        checkpoint['written'] += written
+        checkpoint['archiveWritten'] = checkpoint.get('archiveWritten', 0) + sum(
+            1 for result, (table_name, _, _) in zip(results, changes) if result and table_name == ARCHIVE_TABLE
+        )
+        checkpoint['conflicts'] += len(changes) - written
+
+    # Positions only advance once the page's writes are done, so a resumed run repeats at most one page
+    for unit, (_, last_key) in zip(units, pages):
+        unit['startKey'] = last_key
+        unit['done'] = last_key is None
+
+def run_rebeat(event, context):
+    """
+    Run (or resume) a re-beat until every segment is done or the invocation runs out of time
+
+    Only complaints whose beat changes are written, each conditioned on the beat it was read with, so
+    re-running after a finished or interrupted run is safe. With dryRun nothing is written and the
+    checkpoint is the diff report. Trend buckets, text index and location counters follow the complaints
+    table's new beats through the table stream; archived complaints have none, so when any of them
+    changed beat the rebuild jobs are started once the run is done.
+    """
+    boundaries_key = event.get('boundariesKey')
+    dry_run = event.get('dryRun', False)
+    key = checkpoint_key(boundaries_key, dry_run)
+
+    checkpoint = None if event.get('restart', False) else load_checkpoint(key)
+    if checkpoint is None:
+        checkpoint = new_checkpoint(boundaries_key, dry_run, event.get('effectiveFrom'))
+    if checkpoint['done']:
+        return {'statusCode': 200, 'body': checkpoint}
+
+    beats = load_boundaries(boundaries_key)
+    with ThreadPoolExecutor(max_workers=UPDATE_WORKERS) as write_executor:
+        while True:
+            units = [unit for unit in checkpoint['units'] if not unit['done']]
+            if not units:
+                break
+            process_round(units, checkpoint, beats, write_executor)
+            save_checkpoint(key, checkpoint)
+            logger.info("Re-beat progress", scanned=checkpoint['scanned'], changed=checkpoint['changed'], written=checkpoint['written'], dryRun=dry_run)
+
+            if context is not None and context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+                # Hand over to a fresh invocation which resumes from the checkpoint
+                invoke_lambda(context.function_name, json.dumps({"action": "run", "boundariesKey": boundaries_key, "dryRun": dry_run}), 'Event')
+                return {'statusCode': 200, 'body': checkpoint}
+
+    if checkpoint.get('archiveWritten'):
+        for function_name in REBUILD_FUNCTIONS:
+            invoke_lambda(function_name, json.dumps({"dryRun": False}), 'Event')
+        checkpoint['rebuildsStarted'] = REBUILD_FUNCTIONS
+    checkpoint['done'] = True
+    save_checkpoint(key, checkpoint)
+    logger.info("Re-beat finished", scanned=checkpoint['scanned'], changed=checkpoint['changed'], written=checkpoint['written'], conflicts=checkpoint['conflicts'], dryRun=dry_run)
+    return {'statusCode': 200, 'body': checkpoint}
+
+def start_rebeat(event, context):
+    """Start a run asynchronously"""
+    boundaries_key = event.get('boundariesKey')
+    dry_run = event.get('dryRun', False)
+    invoke_lambda(context.function_name, json.dumps({
+        "action": "run",
+        "boundariesKey": boundaries_key,
+        "dryRun": dry_run,
+        "effectiveFrom": event.get('effectiveFrom'),
+        "restart": event.get('restart', False)
+    }), 'Event')
+    return {
+        'statusCode': 200,
+        'message': 'Re-beat started',
+        'body': {"checkpoint": checkpoint_key(boundaries_key, dry_run), "dryRun": dry_run}
+    }
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    action = event.get('action', 'start')
+
+    # Worker failures propagate so the asynchronous invocation is retried from the checkpoint
+    if action == 'run':
+        return run_rebeat(event, context)
+
+    try:
+        if action == 'status':
+            checkpoint = load_checkpoint(checkpoint_key(event.get('boundariesKey'), event.get('dryRun', False)))
+            return {'statusCode': 200 if checkpoint else 404, 'body': checkpoint or "Re-beat not found"}
+        else:
+            return start_rebeat(event, context)
+    except Exception as e:
+        logger.error("Re-beat failed", error=str(e))
+        return {
+            'statusCode': 500,
+            'body': f"Error: {str(e)}"
+        }
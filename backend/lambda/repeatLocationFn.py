@@ -0,0 +1,94 @@
+#lambda function returning the complaints at one location, or the locations with the most repeat complaints
+import boto3
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
+from repeatLocations import LOCATION_INDEX, LOCATION_ATTRIBUTE, REPEAT_INDEX, COUNT_ATTRIBUTE, OPEN_COUNT_ATTRIBUTE, canonical_location, location_label, is_location_key
+from complaintItems import expand_item
+from beatGeometry import beat_numbers
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+LOCATION_TABLE = os.environ['LOCATION_TABLE_NAME']
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# A location needs this many complaints to count as a repeat location
+DEFAULT_MIN_COUNT = 2
+QUERY_WORKERS = 8
+
+
+def as_list(value):
+    """Accept a single value or a list for multi-value filters"""
+    if not value:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def location_summary(counter):
+    return {
+        "locationKey": counter['locationKey'],
+        "label": location_label(counter['locationKey']),
+        "beatNumber": counter.get('beatNumber', ''),
+        "complaintCount": int(counter.get(COUNT_ATTRIBUTE, 0)),
+        "openCount": int(counter.get(OPEN_COUNT_ATTRIBUTE, 0))
+    }
+
+def complaints_at(key, limit):
+    """The location's counter and its newest complaints, one GetItem and one Query"""
+    counter = dynamodb.Table(LOCATION_TABLE).get_item(Key={'locationKey': key}).get('Item') or {'locationKey': key}
+    response = dynamodb.meta.client.query(
+        TableName=COMPLAINTS_TABLE,
+        IndexName=LOCATION_INDEX,
+        KeyConditionExpression=Key(LOCATION_ATTRIBUTE).eq(key),
+        ScanIndexForward=False,
+        Limit=limit
+    )
+    # Counts include archived complaints; the list holds those still in the complaints table
+    return dict(location_summary(counter), complaints=[expand_item(item) for item in response.get('Items', [])])
+
+def top_of_beat(beat, limit, min_count):
+    """One Query: the beat's locations with the most complaints, at least min_count each"""
+    response = dynamodb.meta.client.query(
+        TableName=LOCATION_TABLE,
+        IndexName=REPEAT_INDEX,
+        KeyConditionExpression=Key('beatNumber').eq(beat) & Key(COUNT_ATTRIBUTE).gte(min_count),
+        ScanIndexForward=False,
+        Limit=limit
+    )
+    return response.get('Items', [])
+
+def top_locations(beats, limit, min_count):
+    with ThreadPoolExecutor(max_workers=min(QUERY_WORKERS, len(beats))) as executor:
+        per_beat = list(executor.map(lambda beat: top_of_beat(beat, limit, min_count), beats))
+    # Each beat's list is already its own top `limit`, so the overall top is among them
+    counters = heapq.nlargest(limit, (counter for counters in per_beat for counter in counters), key=lambda counter: counter[COUNT_ATTRIBUTE])
+    return [location_summary(counter) for counter in counters]
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    try:
+        limit = max(1, min(int(event.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+        # A location is given by its key, or by the address / intersection fields of the complaint form
+        key = event.get('locationKey') or canonical_location(event)
+        if event.get('locationKey') and not is_location_key(key):
+            return {'statusCode': 400, 'body': "locationKey is not a location key, e.g. A#85225#123 n arizona ave"}
+        if key:
+            return {'statusCode': 200, 'body': complaints_at(key, limit)}
+        if event.get('location'):
+            return {'statusCode': 400, 'body': "location needs a street address or two intersecting streets"}
+
+        beats = [str(beat) for beat in as_list(event.get('beatNumber'))] or beat_numbers()
+        min_count = max(1, int(event.get('minCount', DEFAULT_MIN_COUNT)))
+        return {
+            'statusCode': 200,
+            'body': {"limit": limit, "minCount": min_count, "locations": top_locations(beats, limit, min_count)}
+        }
+    except Exception as e:
+        logger.error("Error reading repeat locations", error=str(e))
+        return {'statusCode': 500, 'body': str(e)}
@@ -0,0 +1,122 @@
+# Canonical location keys: one key per address or intersection however it was typed, so repeat
+# complaints at a spot share a partition of the location index and a counter in the location table
+import re
+from duplicateDetection import DUPLICATE_STATUS
+
+LOCATION_INDEX = "locationIndex"
+LOCATION_ATTRIBUTE = "locationKey"
+# Complaints of a location newest first
+SORT_ATTRIBUTE = "dateOfComplaint"
+# Location table index of counters per beat, most complaints first
+REPEAT_INDEX = "repeatIndex"
+COUNT_ATTRIBUTE = "complaintCount"
+OPEN_COUNT_ATTRIBUTE = "openCount"
+
+ADDRESS_ATTRIBUTES = ["addressDirection", "addressStreet", "addressZipcode"]
+INTERSECTION_ATTRIBUTES = [
+    "intersection1Direction", "intersection1Street", "intersection2Direction", "intersection2Street", "intersectionZipcode"
+]
+# Edits to any of these can move a complaint to another key
+LOCATION_INPUTS = {"location"}.union(ADDRESS_ATTRIBUTES, INTERSECTION_ATTRIBUTES)
+
+DIRECTIONS = {
+    "n": "n", "north": "n", "s": "s", "south": "s", "e": "e", "east": "e", "w": "w", "west": "w",
+    "ne": "ne", "northeast": "ne", "nw": "nw", "northwest": "nw", "se": "se", "southeast": "se", "sw": "sw", "southwest": "sw"
+}
+# USPS suffix abbreviations for the street types found in Chandler
+SUFFIXES = {
+    "street": "st", "str": "st", "st": "st", "avenue": "ave", "av": "ave", "ave": "ave", "road": "rd", "rd": "rd",
+    "boulevard": "blvd", "blvd": "blvd", "drive": "dr", "dr": "dr", "lane": "ln", "ln": "ln", "parkway": "pkwy",
+    "pkwy": "pkwy", "place": "pl", "pl": "pl", "court": "ct", "ct": "ct", "circle": "cir", "cir": "cir", "way": "way",
+    "highway": "hwy", "hwy": "hwy", "trail": "trl", "trl": "trl", "terrace": "ter", "ter": "ter", "loop": "loop"
+}
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# A#<zip>#<number direction street> or I#<zip>#<street> & <street>, the zip possibly empty
+KEY_PATTERN = re.compile(r"(?:A#\d{0,5}#[a-z0-9 ]+|I#\d{0,5}#[a-z0-9 ]+ & [a-z0-9 ]+)")
+
+
+def street_tokens(text):
+    """Lower-case street tokens with the suffix abbreviated; a leading direction is split off"""
+    tokens = TOKEN_PATTERN.findall(str(text or "").lower())
+    direction = ""
+    if len(tokens) > 1 and tokens[0] in DIRECTIONS:
+        direction = DIRECTIONS[tokens.pop(0)]
+    if len(tokens) > 1 and tokens[-1] in SUFFIXES:
+        tokens[-1] = SUFFIXES[tokens[-1]]
+    return direction, tokens
+
+def zip_code(value):
+    digits = re.sub(r"\D", "", str(value or ""))
+    return digits[:5]
+
+def address_key(item):
+    """Key of a street address: zip, house number, direction and street"""
+    text = str(item.get("addressStreet") or "")
+    number = ""
+    match = re.match(r"\s*(\d+)\s+(.*)", text)
+    if match:
+        number, text = match.groups()
+    direction, tokens = street_tokens(text)
+    if not tokens:
+        return ""
+    # The direction is typed into its own field or into the street, whichever the resident chose
+    direction = DIRECTIONS.get(str(item.get("addressDirection") or "").strip().lower(), direction)
+    return "A#{}#{}".format(zip_code(item.get("addressZipcode")), " ".join(part for part in [number, direction] + tokens if part))
+
+def intersection_key(item):
+    """
+    Key of an intersection: zip and the two streets in sorted order
+
+    Directions are left out: two streets cross once, and the prefix is what residents vary most
+    (N Arizona Ave vs Arizona Ave at the same corner).
+    """
+    streets = sorted(" ".join(street_tokens(item.get(f"intersection{side}Street"))[1]) for side in (1, 2))
+    if not all(streets):
+        return ""
+    return "I#{}#{}".format(zip_code(item.get("intersectionZipcode")), " & ".join(streets))
+
+def canonical_location(item):
+    """Location key of a complaint, empty when it has no usable address or intersection"""
+    kind = str(item.get("location") or "").lower()
+    if kind == "address":
+        return address_key(item)
+    if kind == "intersection":
+        return intersection_key(item)
+    return ""
+
+def is_location_key(key):
+    """Whether a value has the shape of a canonical location key"""
+    return isinstance(key, str) and bool(KEY_PATTERN.fullmatch(key))
+
+def location_label(key):
+    """Display form of a location key"""
+    _, zip_value, place = key.split("#", 2)
+    return f"{place.upper()}, {zip_value}" if zip_value else place.upper()
+
+def location_attributes(item):
+    """Location index attribute of a complaint, empty when it has no canonical location"""
+    key = canonical_location(item)
+    return {LOCATION_ATTRIBUTE: key} if key else {}
+
+def location_update(item):
+    """
+    UpdateItem arguments bringing a complaint's location key in line with its address fields,
+    None when it already is
+    """
+    key = canonical_location(item)
+    if item.get(LOCATION_ATTRIBUTE, "") == key:
+        return None
+    if key:
+        return {
+            'UpdateExpression': "SET #key = :key",
+            'ExpressionAttributeNames': {"#key": LOCATION_ATTRIBUTE},
+            'ExpressionAttributeValues': {":key": key}
+        }
+    return {'UpdateExpression': "REMOVE #key", 'ExpressionAttributeNames': {"#key": LOCATION_ATTRIBUTE}}
+
+def location_counts(item):
+    """(location key, complaints, open complaints) a complaint contributes to the location counters"""
+    key = canonical_location(item)
+    if not key:
+        return None
+    return key, 1, int(item.get("complaintStatus") not in ("Closed", DUPLICATE_STATUS))
@@ -0,0 +1,233 @@
+# Sorted paging for the filter API: one sorted index Query per beat or status, lazily k-way merged
+import base64
+import heapq
+import json
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Attr, Key
+from priorityQueue import PRIORITY_INDEX, PARTITION_ATTRIBUTE, SORT_ATTRIBUTE
+from timeSlots import overlaps
+from beatGeometry import beat_numbers
+
+BEAT_DATE_INDEX = "beatDateIndex"
+STATUS_DATE_INDEX = "statusDateIndex"
+
+SORTS = ["dateDesc", "urgency", "status"]
+STATUS_ORDER = {"Red-Star": 0, "Open": 1, "Follow-Up": 2, "Closed": 3, "Duplicate": 4}
+# Rank given to complaints outside the priority index when sorting by urgency
+UNRANKED = 9
+
+# Sources whose next page starts from their first item, and ones with nothing left
+START = None
+DONE = "done"
+# Largest Limit a source grows to while its filter matches nothing in the pages read so far
+MAX_QUERY_LIMIT = 1000
+# Source ids of the archive table's partitions start with this
+ARCHIVE_PREFIX = "archive:"
+# Attributes of the ExclusiveStartKey of each index: the table key plus the index key
+INDEX_KEYS = {
+    PRIORITY_INDEX: ["complaintId", PARTITION_ATTRIBUTE, SORT_ATTRIBUTE],
+    STATUS_DATE_INDEX: ["complaintId", "complaintStatus", "dateOfComplaint"],
+    BEAT_DATE_INDEX: ["complaintId", "beatNumber", "dateOfComplaint"]
+}
+
+
+class Descending:
+    """Sort key wrapper that orders values from largest to smallest"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class IndexSource:
+    """
+    Items of one index partition in index order, read a page at a time
+
+    Only as many pages are read as the merge consumes; `prefetch` reads the first one so the
+    sources of a request can start in parallel.
+    """
+
+    def __init__(self, client, table_name, source_id, index, key_condition, descending, filter_expression, time_bitmap, start_key, page_size):
+        self.client = client
+        self.source_id = source_id
+        self.index = index
+        self.query = {
+            "TableName": table_name,
+            "IndexName": index,
+            "KeyConditionExpression": key_condition,
+            "ScanIndexForward": not descending,
+            "Limit": page_size + 1
+        }
+        if filter_expression is not None:
+            self.query["FilterExpression"] = filter_expression
+        self.time_bitmap = time_bitmap
+        self.start_key = start_key
+        self.buffer = None
+
+    def read_page(self):
+        query = dict(self.query)
+        if self.start_key:
+            query["ExclusiveStartKey"] = self.start_key
+        response = self.client.query(**query)
+        self.start_key = response.get("LastEvaluatedKey")
+        items = response.get("Items", [])
+        if self.time_bitmap:
+            items = [item for item in items if overlaps(item, self.time_bitmap)]
+        if not items and self.start_key:
+            # A sparse match (complaints without a beat) would otherwise take a request per page_size items
+            self.query["Limit"] = min(self.query["Limit"] * 2, MAX_QUERY_LIMIT)
+        return items
+
+    def prefetch(self):
+        self.buffer = self.read_page()
+        return self
+
+    def __iter__(self):
+        items = self.buffer if self.buffer is not None else self.read_page()
+        while True:
+            for item in items:
+                yield self.source_id, item
+            if not self.start_key:
+                return
+            items = self.read_page()
+
+
+def encode_cursor(sort, positions):
+    return base64.urlsafe_b64encode(json.dumps({"sort": sort, "positions": positions}).encode()).decode()
+
+def decode_cursor(cursor):
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
+def as_list(value):
+    """Accept a single value or a list for multi-value filters"""
+    if not value:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def date_key(item):
+    return Descending(item.get("dateOfComplaint", ""))
+
+def merge_key(sort):
+    """Key the merged stream is ordered by; every source is already ordered by it"""
+    if sort == "status":
+        return lambda entry: (STATUS_ORDER.get(entry[1].get("complaintStatus"), len(STATUS_ORDER)), date_key(entry[1]))
+    if sort == "urgency":
+        def urgency_key(entry):
+            item = entry[1]
+            if item.get(SORT_ATTRIBUTE):
+                rank, submitted = item[SORT_ATTRIBUTE].split("#", 1)
+                return (int(rank), submitted)
+            return (UNRANKED, date_key(item))
+        return urgency_key
+    return lambda entry: (date_key(entry[1]),)
+
+def resume_key(index, item):
+    """ExclusiveStartKey continuing a source of the given index after the given item"""
+    return {name: item[name] for name in INDEX_KEYS[index]}
+
+def plan_sources(spec, sort):
+    """
+    (source id, index, key condition, descending, extra filter) per index partition the sort reads
+
+    Status sorts read a partition per status. Date sorts read a partition per selected beat, or per
+    status when no beat is selected, which covers the table with four partitions. Urgency sorts read
+    each beat's priority queue followed by its remaining complaints newest first; without a beat
+    selection, complaints with no beat (outside the beat index) come from the status partitions.
+    """
+    beats = [str(beat) for beat in as_list(spec.get("beatNumber"))]
+    statuses = as_list(spec.get("complaintStatus"))
+
+    if sort == "status" or (sort == "dateDesc" and not beats):
+        return [
+            (f"status:{status}", STATUS_DATE_INDEX, Key("complaintStatus").eq(status), True, None)
+            for status in (statuses or list(STATUS_ORDER))
+        ]
+    sources = []
+    for beat in beats or beat_numbers():
+        if sort == "urgency":
+            sources.append((f"priority:{beat}", PRIORITY_INDEX, Key(PARTITION_ATTRIBUTE).eq(beat), False, None))
+            sources.append((f"rest:{beat}", BEAT_DATE_INDEX, Key("beatNumber").eq(beat), True, Attr(PARTITION_ATTRIBUTE).not_exists()))
+        else:
+            sources.append((f"beat:{beat}", BEAT_DATE_INDEX, Key("beatNumber").eq(beat), True, None))
+    if sort == "urgency" and not beats:
+        sources += [
+            (f"nobeat:{status}", STATUS_DATE_INDEX, Key("complaintStatus").eq(status), True, Attr("beatNumber").not_exists())
+            for status in (statuses or list(STATUS_ORDER))
+        ]
+    return sources
+
+def plan_archive_sources(spec, sort):
+    """
+    Sources over the archive table, which holds closed complaints only
+
+    Archived complaints are out of the priority queue, so urgency sorts read them in date order.
+    """
+    sources = plan_sources(spec, "dateDesc" if sort == "urgency" else sort)
+    return [(ARCHIVE_PREFIX + source_id, index, key_condition, descending, None) for source_id, index, key_condition, descending, _ in sources]
+
+def sorted_page(client, table_name, spec, sort, filter_expression, time_bitmap, page_size, cursor=None, workers=8, archive_table=None):
+    """
+    One page of complaints in the requested order
+
+    Returns (complaints, next cursor or None). The cursor holds, per source, the index key of the last
+    complaint it contributed, so the next page resumes every partition where this one stopped.
+    With archive_table the archived complaints are merged into the same order.
+    """
+    positions = decode_cursor(cursor)["positions"] if cursor else {}
+    planned = [(table_name, *source) for source in plan_sources(spec, sort)]
+    if archive_table:
+        planned += [(archive_table, *source) for source in plan_archive_sources(spec, sort)]
+    sources = []
+    for source_table, source_id, index, key_condition, descending, extra_filter in planned:
+        position = positions.get(source_id, START)
+        if position == DONE:
+            continue
+        combined = filter_expression
+        if extra_filter is not None:
+            combined = extra_filter if combined is None else combined & extra_filter
+        sources.append(IndexSource(client, source_table, source_id, index, key_condition, descending, combined, time_bitmap, position, page_size))
+
+    if sources:
+        with ThreadPoolExecutor(max_workers=min(workers, len(sources))) as executor:
+            sources = list(executor.map(IndexSource.prefetch, sources))
+
+    page, heads = merge_page(sources, merge_key(sort), page_size)
+
+    next_positions = dict(positions)
+    indexes = {source.source_id: source.index for source in sources}
+    for source_id, item in page:
+        next_positions[source_id] = resume_key(indexes[source_id], item)
+    # Sources without a complaint waiting in the heap are exhausted
+    for source in sources:
+        if source.source_id not in heads:
+            next_positions[source.source_id] = DONE
+
+    has_more = bool(heads)
+    return [item for _, item in page], encode_cursor(sort, next_positions) if has_more else None
+
+def merge_page(sources, key, page_size):
+    """
+    Lazy k-way merge of sorted sources with a heap, stopping once the page is full
+
+    Returns the page of (source id, item) and the ids of sources that still have items.
+    """
+    heap = []
+    iterators = [iter(source) for source in sources]
+    for position, iterator in enumerate(iterators):
+        entry = next(iterator, None)
+        if entry is not None:
+            heapq.heappush(heap, (key(entry), position, entry))
+
+    page = []
+    while heap and len(page) < page_size:
+        _, position, entry = heapq.heappop(heap)
+        page.append(entry)
+        following = next(iterators[position], None)
+        if following is not None:
+            heapq.heappush(heap, (key(following), position, following))
+    return page, {entry[0] for _, _, entry in heap}
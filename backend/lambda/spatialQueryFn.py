@@ -0,0 +1,147 @@
+#lambda function answering radius and bounding box queries through the geohash index
+import boto3
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Attr, Key
+import geohash
+from complaintItems import expand_item
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+lambda_client = instrument_client(boto3.client('lambda'))
+
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+LAMBDA_API_FN = os.environ['LAMBDA_FN_NAME']
+GEOHASH_INDEX = 'geohashIndex'
+
+DEFAULT_RADIUS_M = 500
+MAX_RADIUS_M = 10000
+DEFAULT_LIMIT = 100
+QUERY_WORKERS = 8
+# Geocoder match score (0-100) a place needs to be used as a search center
+MIN_GEOCODE_SCORE = 80
+
+
+def invoke_lambda(function_name, payload):
+    """Invoke another Lambda function with the given payload"""
+
+    try:
+        response = lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType='RequestResponse',
+            Payload=payload
+        )
+        return response['Payload'].read()
+    except Exception as e:
+        logger.error("Error invoking Lambda function", function=function_name, error=str(e))
+        raise e
+
+def geocode_place(place):
+    """Resolve a place or address to (lat, lon) with the beat retrieval geocoder"""
+    parsed = json.loads(invoke_lambda(LAMBDA_API_FN, json.dumps({"location_data": place})))
+    candidates = parsed.get('body', {}).get('candidates', []) if isinstance(parsed.get('body'), dict) else []
+    # A low-scoring best match is a guess, e.g. a word that happens to be a street name somewhere
+    if not candidates or float(candidates[0].get('score', 0)) < MIN_GEOCODE_SCORE:
+        return None
+    location = candidates[0]['location']
+    return float(location['y']), float(location['x'])
+
+def query_cell(cell, filter_expression):
+    """Read every complaint whose geohash starts with the given cell"""
+    key_condition = Key('geohashPrefix').eq(cell[:geohash.PREFIX_PRECISION])
+    if len(cell) > geohash.PREFIX_PRECISION:
+        key_condition = key_condition & Key('geohash').begins_with(cell)
+
+    kwargs = {"TableName": COMPLAINTS_TABLE, "IndexName": GEOHASH_INDEX, "KeyConditionExpression": key_condition}
+    if filter_expression is not None:
+        kwargs["FilterExpression"] = filter_expression
+
+    items = []
+    while True:
+        response = dynamodb.meta.client.query(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def build_filter(event):
+    """Optional status and category filters applied while querying"""
+    filter_expressions = []
+    for attribute in ['complaintStatus', 'problemCategory']:
+        value = event.get(attribute)
+        if not value:
+            continue
+        values = value if isinstance(value, list) else [value]
+        filter_expressions.append(Attr(attribute).is_in(values))
+    if not filter_expressions:
+        return None
+    combined_filter = filter_expressions[0]
+    for filter_exp in filter_expressions[1:]:
+        combined_filter = combined_filter & filter_exp
+    return combined_filter
+
+def search_area(min_lat, min_lon, max_lat, max_lon, filter_expression):
+    """Query the cells covering a box in parallel, returning de-duplicated items and the cell count"""
+    cells = geohash.covering_for_box(min_lat, min_lon, max_lat, max_lon)
+    with ThreadPoolExecutor(max_workers=min(QUERY_WORKERS, len(cells))) as executor:
+        results = executor.map(lambda cell: query_cell(cell, filter_expression), cells)
+        items = {item['complaintId']: item for cell_items in results for item in cell_items}
+    return list(items.values()), len(cells)
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    try:
+        filter_expression = build_filter(event)
+        limit = int(event.get('limit', DEFAULT_LIMIT))
+
+        if event.get('bbox'):
+            min_lon, min_lat, max_lon, max_lat = [float(v) for v in event['bbox']]
+            center, radius = None, None
+        else:
+            if event.get('place'):
+                center = geocode_place(event['place'])
+                if center is None:
+                    return {'statusCode': 404, 'body': f"Could not locate {event['place']}"}
+            else:
+                center = (float(event['lat']), float(event['lon']))
+            radius = min(float(event.get('radius', DEFAULT_RADIUS_M)), MAX_RADIUS_M)
+            min_lat, min_lon, max_lat, max_lon = geohash.radius_box(center[0], center[1], radius)
+
+        items, cells_queried = search_area(min_lat, min_lon, max_lat, max_lon, filter_expression)
+
+        # Refine the cell candidates to the exact circle or box
+        matches = []
+        for item in items:
+            lat, lon = float(item['lat']), float(item['lon'])
+            if center is not None:
+                distance = geohash.haversine(center[0], center[1], lat, lon)
+                if distance > radius:
+                    continue
+                item['distanceMeters'] = round(distance)
+            elif not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+                continue
+            matches.append(item)
+        if center is not None:
+            matches.sort(key=lambda item: item['distanceMeters'])
+
+        return {
+            'statusCode': 200,
+            'body': {
+                "complaints": [expand_item(item) for item in matches[:limit]],
+                "total": len(matches),
+                "center": {"lat": center[0], "lon": center[1]} if center else None,
+                "radius": radius,
+                "cellsQueried": cells_queried
+            }
+        }
+    except Exception as e:
+        logger.error("Error running spatial query", error=str(e))
+        return {
+            'statusCode': 500,
+            'body': str(e)
+        }
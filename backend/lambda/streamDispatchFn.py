@@ -0,0 +1,58 @@
+#lambda function that reads the complaints table stream once and hands each batch to the stream handlers
+import boto3
+import json
+import os
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import instrumented, instrument_client, add_metric
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+# Throttled invokes are retried here rather than by redelivering the whole batch
+lambda_client = instrument_client(boto3.client('lambda', config=Config(retries={'max_attempts': 6, 'mode': 'standard'})))
+
+# A DynamoDB stream shard serves about two concurrent readers, so the trend, text index, location,
+# tile and change feed handlers are invoked from this one consumer instead of each polling the stream
+STREAM_HANDLERS = [
+    name for name in (
+        os.environ.get('TREND_STREAM_FN_NAME'), os.environ.get('TEXT_INDEX_STREAM_FN_NAME'),
+        os.environ.get('LOCATION_STREAM_FN_NAME'), os.environ.get('TILE_STREAM_FN_NAME'),
+        os.environ.get('CHANGE_FEED_STREAM_FN_NAME')
+    )
+    if name
+]
+# Asynchronous invocation payloads are capped at 256 KB
+MAX_PAYLOAD_BYTES = 240 * 1024
+
+
+def payloads(records):
+    """{'Records': [...]} event bodies of at most MAX_PAYLOAD_BYTES each, keeping the stream order"""
+    chunks, chunk, size = [], [], 0
+    for record in records:
+        record_size = len(json.dumps(record, separators=(',', ':')))
+        if chunk and size + record_size > MAX_PAYLOAD_BYTES:
+            chunks.append(chunk)
+            chunk, size = [], 0
+        chunk.append(record)
+        size += record_size + 1
+    if chunk:
+        chunks.append(chunk)
+    return [json.dumps({'Records': chunk}, separators=(',', ':')) for chunk in chunks]
+
+def dispatch(function_name, bodies):
+    # Asynchronous, so each handler retries on its own and one failing cannot make the stream
+    # redeliver the batch to the handlers that already applied it
+    for body in bodies:
+        lambda_client.invoke(FunctionName=function_name, InvocationType='Event', Payload=body)
+
+@instrumented
+def lambda_handler(event, context):
+    records = event.get('Records', [])
+    bodies = payloads(records)
+    if bodies and STREAM_HANDLERS:
+        # An invoke still failing after the client's retries raises, and the event source redelivers the batch
+        with ThreadPoolExecutor(max_workers=len(STREAM_HANDLERS)) as executor:
+            list(executor.map(lambda name: dispatch(name, bodies), STREAM_HANDLERS))
+    add_metric("StreamRecordsDispatched", len(records))
+    logger.info("Dispatched stream records", records=len(records), payloads=len(bodies), handlers=len(STREAM_HANDLERS))
+    return {'statusCode': 200, 'body': {"records": len(records), "payloads": len(bodies), "handlers": STREAM_HANDLERS}}
@@ -0,0 +1,61 @@
+import boto3
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import instrument_client
+
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+# Segments scanned concurrently by parallel_scan
+DEFAULT_SEGMENTS = 4
+
+
+def scan_segment(table_name, segment, total_segments, scan_kwargs):
+    """Read every page of one scan segment"""
+    # The resource's client is thread safe and still accepts Attr conditions and python types
+    client = dynamodb.meta.client
+    items = []
+    kwargs = dict(scan_kwargs, TableName=table_name, Segment=segment, TotalSegments=total_segments)
+    while True:
+        response = client.scan(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def parallel_scan(table_name, total_segments=DEFAULT_SEGMENTS, **scan_kwargs):
+    """
+    Scan a whole table with concurrent segments, following pagination
+
+    Extra keyword arguments (FilterExpression, ProjectionExpression, ...) are passed to every scan call.
+    """
+    with ThreadPoolExecutor(max_workers=total_segments) as executor:
+        segments = executor.map(lambda segment: scan_segment(table_name, segment, total_segments, scan_kwargs), range(total_segments))
+        return [item for items in segments for item in items]
+
+
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_LIMIT = 100
+
+
+def batch_get_keys(table_name, keys, **get_kwargs):
+    """
+    Fetch items by full primary key, in no particular order
+
+    Unprocessed keys are retried and keys without an item are skipped.
+    """
+    client = dynamodb.meta.client
+    items = []
+    for start in range(0, len(keys), BATCH_GET_LIMIT):
+        request = {table_name: dict(get_kwargs, Keys=keys[start:start + BATCH_GET_LIMIT])}
+        while request:
+            response = client.batch_get_item(RequestItems=request)
+            items.extend(response['Responses'].get(table_name, []))
+            request = response.get('UnprocessedKeys')
+    return items
+
+def batch_get(table_name, key_name, key_values, **get_kwargs):
+    """Fetch items by partition key, returned in the order of key_values"""
+    keys = [{key_name: value} for value in key_values]
+    found = {item[key_name]: item for item in batch_get_keys(table_name, keys, **get_kwargs)}
+    return [found[value] for value in key_values if value in found]
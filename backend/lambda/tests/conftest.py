@@ -0,0 +1,12 @@
+# Puts backend/lambda and the instrumentation layer on sys.path, as the Lambda runtime does for a function.
+# Run from the repository root with: python -m pytest backend/lambda/tests
+import os
+import sys
+
+LAMBDA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (LAMBDA_DIR, os.path.join(LAMBDA_DIR, "layers", "instrumentation_layer", "python")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Shared modules create boto3 clients at import time; none of these tests makes a request
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-west-2")
@@ -0,0 +1,16 @@
+import pytest
+from beatRetrievalFn import MIN_BATCH_SCORE, is_batch_match
+
+
+def test_batch_match():
+    assert is_batch_match({"location": {"x": -111.84, "y": 33.30}, "score": 100})
+
+@pytest.mark.parametrize("location", [
+    {"location": {"x": "NaN", "y": "NaN"}, "score": 0},
+    {"location": {"x": float("nan"), "y": 33.30}, "score": 100},
+    {"location": {"x": -111.84, "y": 33.30}, "score": MIN_BATCH_SCORE - 1},
+    {"location": {"x": None, "y": None}, "score": 100},
+    {"score": 100}
+])
+def test_unmatched_batch_results(location):
+    assert not is_batch_match(location)
@@ -0,0 +1,89 @@
+import json
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+import changeFeed
+from archiveTier import ARCHIVED_MARKER
+from changeFeed import ALL, SubscriptionError
+
+serializer = TypeSerializer()
+
+
+def image(item):
+    return {name: serializer.serialize(value) for name, value in item.items()}
+
+def stream_record(event_name, old=None, new=None):
+    dynamodb = {}
+    if old is not None:
+        dynamodb["OldImage"] = image(old)
+    if new is not None:
+        dynamodb["NewImage"] = image(new)
+    return {"eventName": event_name, "dynamodb": dynamodb}
+
+COMPLAINT = {
+    "complaintId": "C1", "complaintStatus": "Open", "beatNumber": "7", "problemCategory": "Speed",
+    "dateOfComplaint": "2026-10-01", "description": "Speeding", "schemaVersion": 2
+}
+KEYS = {"beatNumber": "7", "complaintStatus": "Open", "problemCategory": "Speed", "dateOfComplaint": "2026-10-01"}
+
+
+def test_insert_carries_the_complaint_in_api_shape():
+    delta = changeFeed.record_delta(stream_record("INSERT", new=COMPLAINT))
+    assert delta["type"] == "insert" and delta["complaintId"] == "C1" and delta["keys"] == KEYS
+    assert delta["complaint"]["description"] == "Speeding"
+    assert delta["complaint"]["firstName"] == "" and delta["complaint"]["endDate"] == "2026-10-01"
+    assert "schemaVersion" not in delta["complaint"]
+
+def test_update_carries_changes_and_previous_keys():
+    closed = dict(COMPLAINT, complaintStatus="Closed", officersNotes="Patrolled")
+    delta = changeFeed.record_delta(stream_record("MODIFY", old=COMPLAINT, new=closed))
+    assert delta["type"] == "update"
+    assert delta["changes"] == {"complaintStatus": "Closed", "officersNotes": "Patrolled"}
+    assert delta["previous"] == {"complaintStatus": "Open"}
+    assert delta["keys"]["complaintStatus"] == "Closed"
+
+def test_update_of_attributes_the_portal_does_not_show_is_dropped():
+    reindexed = dict(COMPLAINT, geohash="9tbq", activeSlots="ff")
+    assert changeFeed.record_delta(stream_record("MODIFY", old=COMPLAINT, new=reindexed)) is None
+
+def test_remove():
+    delta = changeFeed.record_delta(stream_record("REMOVE", old=COMPLAINT))
+    assert delta == {"type": "remove", "complaintId": "C1", "keys": KEYS}
+
+def test_archive_moves_are_not_changes():
+    archived = dict(COMPLAINT, **{ARCHIVED_MARKER: "2026-10-19T00:00:00+00:00"})
+    assert changeFeed.record_delta(stream_record("REMOVE", old=archived)) is None
+
+def test_subscription_topics():
+    assert changeFeed.subscription_topics(["7", 8], "Open") == ["7#Open", "8#Open"]
+    assert changeFeed.subscription_topics(None, None) == [f"{ALL}#{ALL}"]
+
+@pytest.mark.parametrize("beats, statuses", [
+    ("7", "Pending"), ("7#Open", None), (ALL, None), ([str(beat) for beat in range(101)], None)
+])
+def test_subscription_topics_rejects(beats, statuses):
+    with pytest.raises(SubscriptionError):
+        changeFeed.subscription_topics(beats, statuses)
+
+def test_route_reaches_subscribers_of_the_old_and_new_state():
+    moved = changeFeed.record_delta(stream_record("MODIFY", old=COMPLAINT, new=dict(COMPLAINT, beatNumber="8")))
+    inserted = changeFeed.record_delta(stream_record("INSERT", new=dict(COMPLAINT, complaintId="C2")))
+    calls = []
+
+    def subscribers(topics):
+        calls.append(topics)
+        return {"7#Open": ["old-beat"], "8#*": ["new-beat"], "*#*": ["everything"], "9#Open": ["unrelated"]}
+
+    routed = changeFeed.route([moved, inserted], subscribers)
+    assert len(calls) == 1
+    assert calls[0] == {"7#Open", "7#*", "8#Open", "8#*", "*#Open", "*#*"}
+    assert routed == {"old-beat": [moved, inserted], "new-beat": [moved], "everything": [moved, inserted]}
+
+def test_route_without_deltas_reads_nothing():
+    assert changeFeed.route([], lambda topics: pytest.fail("no read expected")) == {}
+
+def test_change_messages_stay_under_the_limit():
+    deltas = [{"type": "remove", "complaintId": f"C{i}", "keys": {"description": "x" * 1000}} for i in range(300)]
+    messages = changeFeed.change_messages(deltas)
+    assert len(messages) > 1
+    assert all(len(message) < changeFeed.MAX_MESSAGE_BYTES for message in messages)
+    assert [delta for message in messages for delta in json.loads(message)["deltas"]] == deltas
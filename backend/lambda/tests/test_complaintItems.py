@@ -0,0 +1,89 @@
+from decimal import Decimal
+from boto3.dynamodb.conditions import ConditionExpressionBuilder
+import complaintItems
+from complaintItems import SCHEMA_VERSION, VERSION_ATTRIBUTE, compact_item, expand_item
+
+
+def legacy_item(**overrides):
+    """A complaint as it was stored before compaction: every attribute, empty ones included"""
+    item = {name: (list(default) if isinstance(default, list) else default) for name, default in complaintItems.ATTRIBUTE_DEFAULTS.items()}
+    item.update({
+        "complaintId": "C1",
+        "complaintStatus": "Open",
+        "beatNumber": "7",
+        "problemCategory": "Speed",
+        "description": "Speeding on Arizona Ave",
+        "daysOfWeek": ["Monday"],
+        "dateOfComplaint": "2026-10-01",
+        "startDate": "2026-10-01",
+        "endDate": "2026-10-01",
+        "coordinates": ["-111.8413", "33.3062"],
+    })
+    item.update(overrides)
+    return item
+
+
+def test_compact_item_leaves_out_empty_and_derived_attributes():
+    compact = compact_item(legacy_item())
+    assert compact[VERSION_ATTRIBUTE] == SCHEMA_VERSION
+    for name in ["firstName", "email", "isUrgentChecked", "coordinates", "startDate", "endDate"]:
+        assert name not in compact
+    assert compact["lat"] == Decimal("33.3062") and compact["lon"] == Decimal("-111.8413")
+    assert compact["geohash"].startswith(compact["geohashPrefix"])
+
+def test_compact_item_keeps_dates_that_differ_from_their_default():
+    compact = compact_item(legacy_item(startDate="2026-09-30", endDate="2026-10-02"))
+    assert compact["startDate"] == "2026-09-30" and compact["endDate"] == "2026-10-02"
+
+def test_compact_item_leaves_out_an_empty_beat():
+    # Index keys cannot be empty strings, so unbeaten complaints carry no beatNumber at all
+    assert "beatNumber" not in compact_item(legacy_item(beatNumber=""))
+
+def test_expand_item_restores_the_legacy_shape():
+    legacy = legacy_item()
+    assert expand_item(compact_item(legacy)) == dict(
+        legacy,
+        lat=Decimal("33.3062"), lon=Decimal("-111.8413"),
+        geohash=compact_item(legacy)["geohash"], geohashPrefix=compact_item(legacy)["geohashPrefix"]
+    )
+
+def test_expand_item_without_coordinates():
+    expanded = expand_item(compact_item(legacy_item(coordinates=["", ""])))
+    assert expanded["coordinates"] == ["", ""]
+    assert "lat" not in expanded
+
+def test_expand_item_fills_only_requested_fields():
+    expanded = expand_item(compact_item(legacy_item()), ["complaintId", "firstName", "endDate"])
+    assert expanded["firstName"] == "" and expanded["endDate"] == "2026-10-01"
+    assert "email" not in expanded and "coordinates" not in expanded
+
+def test_expand_item_leaves_legacy_items_alone():
+    legacy = legacy_item()
+    assert expand_item(legacy) == legacy
+
+def test_expanded_defaults_are_not_shared():
+    first = expand_item({"complaintId": "A"})
+    first["daysOfWeek"].append("Monday")
+    assert expand_item({"complaintId": "B"})["daysOfWeek"] == []
+
+def test_stored_attributes_maps_derived_fields():
+    assert complaintItems.stored_attributes(["complaintId", "coordinates", "endDate"]) == [
+        "complaintId", "lat", "lon", "endDate", "startDate", "dateOfComplaint"
+    ]
+
+def test_new_complaints_always_have_a_date():
+    item = complaintItems.build_complaint_item({"problemCategory": "Speed"}, "C2", "", ("", ""))
+    assert item["dateOfComplaint"]
+    assert "beatNumber" not in item
+
+def expression(condition):
+    built = ConditionExpressionBuilder().build_expression(condition)
+    names = {placeholder: name for placeholder, name in built.attribute_name_placeholders.items()}
+    text = built.condition_expression
+    for placeholder, name in names.items():
+        text = text.replace(placeholder, name)
+    return text
+
+def test_attribute_equals_matches_a_missing_attribute_for_empty_values():
+    assert expression(complaintItems.attribute_equals("beatNumber", "")) == "(beatNumber = :v0 OR attribute_not_exists(beatNumber))"
+    assert expression(complaintItems.attribute_equals("beatNumber", "7")) == "beatNumber = :v0"
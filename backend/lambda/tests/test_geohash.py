@@ -0,0 +1,51 @@
+import pytest
+import geohash
+
+
+def test_encode_known_cell():
+    assert geohash.encode(42.6, -5.6, 5) == "ezs42"
+
+def test_encode_defaults_to_item_precision():
+    assert len(geohash.encode(33.3062, -111.8413)) == geohash.ITEM_PRECISION
+
+def test_prefix_of_finer_cell_is_coarser_cell():
+    cell = geohash.encode(33.3062, -111.8413)
+    assert geohash.encode(33.3062, -111.8413, geohash.PREFIX_PRECISION) == cell[:geohash.PREFIX_PRECISION]
+
+def test_bounds_contain_encoded_point():
+    min_lat, min_lon, max_lat, max_lon = geohash.bounds(geohash.encode(33.3062, -111.8413, 7))
+    assert min_lat <= 33.3062 < max_lat
+    assert min_lon <= -111.8413 < max_lon
+
+def test_bounds_match_cell_size():
+    min_lat, min_lon, max_lat, max_lon = geohash.bounds("9tbmq")
+    assert (max_lat - min_lat, max_lon - min_lon) == pytest.approx(geohash.cell_size(5))
+
+def test_covering_cells_cover_box_corners_and_center():
+    box = (33.29, -111.86, 33.32, -111.82)
+    cells = geohash.covering_cells(*box, 6)
+    for lat, lon in [(33.29, -111.86), (33.29, -111.82), (33.32, -111.86), (33.32, -111.82), (33.305, -111.84)]:
+        assert geohash.encode(lat, lon, 6) in cells
+
+def test_covering_for_box_stays_within_cell_budget():
+    cells = geohash.covering_for_box(33.29, -111.86, 33.32, -111.82, max_cells=16)
+    assert 0 < len(cells) <= 16
+    assert all(len(cell) >= geohash.PREFIX_PRECISION for cell in cells)
+
+def test_covering_for_box_never_coarser_than_partition_key():
+    cells = geohash.covering_for_box(32.0, -113.0, 34.0, -110.0, max_cells=1)
+    assert {len(cell) for cell in cells} == {geohash.PREFIX_PRECISION}
+
+def test_haversine_one_degree_of_latitude():
+    assert geohash.haversine(33.0, -111.0, 34.0, -111.0) == pytest.approx(111195, rel=1e-3)
+
+def test_haversine_is_symmetric_and_zero_at_a_point():
+    assert geohash.haversine(33.3, -111.8, 33.3, -111.8) == 0
+    assert geohash.haversine(33.3, -111.8, 33.2, -111.9) == pytest.approx(geohash.haversine(33.2, -111.9, 33.3, -111.8))
+
+def test_radius_box_contains_the_circle():
+    lat, lon, radius = 33.3062, -111.8413, 800
+    min_lat, min_lon, max_lat, max_lon = geohash.radius_box(lat, lon, radius)
+    assert geohash.haversine(lat, lon, max_lat, lon) == pytest.approx(radius, rel=1e-6)
+    assert geohash.haversine(lat, lon, lat, max_lon) == pytest.approx(radius, rel=1e-3)
+    assert min_lat < lat < max_lat and min_lon < lon < max_lon
@@ -0,0 +1,76 @@
+import sortedQuery
+from priorityQueue import PRIORITY_INDEX, SORT_ATTRIBUTE
+from sortedQuery import ARCHIVE_PREFIX, BEAT_DATE_INDEX, STATUS_DATE_INDEX, STATUS_ORDER
+
+
+def test_cursor_round_trip_is_url_safe():
+    positions = {"beat:7": {"complaintId": "C/1+", "beatNumber": "7", "dateOfComplaint": "2026-10-01"}, "beat:8": sortedQuery.DONE}
+    cursor = sortedQuery.encode_cursor("dateDesc", positions)
+    assert "+" not in cursor and "/" not in cursor
+    assert sortedQuery.decode_cursor(cursor) == {"sort": "dateDesc", "positions": positions}
+
+def test_resume_key_is_the_table_and_index_key():
+    item = {"complaintId": "C1", "beatNumber": "7", "complaintStatus": "Open", "dateOfComplaint": "2026-10-01", "description": "x"}
+    assert sortedQuery.resume_key(BEAT_DATE_INDEX, item) == {"complaintId": "C1", "beatNumber": "7", "dateOfComplaint": "2026-10-01"}
+    assert sortedQuery.resume_key(STATUS_DATE_INDEX, item) == {"complaintId": "C1", "complaintStatus": "Open", "dateOfComplaint": "2026-10-01"}
+
+def test_status_sort_reads_one_partition_per_status():
+    sources = sortedQuery.plan_sources({"complaintStatus": ["Open", "Closed"]}, "status")
+    assert [source[0] for source in sources] == ["status:Open", "status:Closed"]
+    assert all(source[1] == STATUS_DATE_INDEX and source[3] for source in sources)
+
+def test_date_sort_reads_selected_beats():
+    sources = sortedQuery.plan_sources({"beatNumber": [7, "3M"]}, "dateDesc")
+    assert [(source[0], source[1]) for source in sources] == [("beat:7", BEAT_DATE_INDEX), ("beat:3M", BEAT_DATE_INDEX)]
+
+def test_urgency_sort_reads_the_queue_then_the_rest_of_each_beat():
+    sources = sortedQuery.plan_sources({"beatNumber": "7"}, "urgency")
+    assert [(source[0], source[1], source[3]) for source in sources] == [
+        ("priority:7", PRIORITY_INDEX, False), ("rest:7", BEAT_DATE_INDEX, True)
+    ]
+
+def test_urgency_sort_without_beats_covers_unbeaten_complaints():
+    sources = sortedQuery.plan_sources({}, "urgency")
+    nobeat = [source[0] for source in sources if source[0].startswith("nobeat:")]
+    assert nobeat == [f"nobeat:{status}" for status in STATUS_ORDER]
+
+def test_archive_sources_read_by_date_without_the_queue():
+    sources = sortedQuery.plan_archive_sources({"beatNumber": "7"}, "urgency")
+    assert [source[0] for source in sources] == [ARCHIVE_PREFIX + "beat:7"]
+    assert sources[0][4] is None
+
+def complaint(complaint_id, date, status="Open", rank=None):
+    item = {"complaintId": complaint_id, "dateOfComplaint": date, "complaintStatus": status}
+    if rank is not None:
+        item[SORT_ATTRIBUTE] = f"{rank}#{date}"
+    return item
+
+def source(source_id, *items):
+    return [(source_id, item) for item in items]
+
+def test_merge_page_orders_by_date_and_reports_remaining_sources():
+    sources = [
+        source("a", complaint("A1", "2026-10-05"), complaint("A2", "2026-10-01")),
+        source("b", complaint("B1", "2026-10-04")),
+        source("c")
+    ]
+    page, heads = sortedQuery.merge_page(sources, sortedQuery.merge_key("dateDesc"), 2)
+    assert [item["complaintId"] for _, item in page] == ["A1", "B1"]
+    assert heads == {"a"}
+
+def test_merge_page_by_status_then_date():
+    sources = [
+        source("open", complaint("O1", "2026-10-05"), complaint("O2", "2026-10-01")),
+        source("red", complaint("R1", "2026-09-01", status="Red-Star"))
+    ]
+    page, heads = sortedQuery.merge_page(sources, sortedQuery.merge_key("status"), 10)
+    assert [item["complaintId"] for _, item in page] == ["R1", "O1", "O2"]
+    assert heads == set()
+
+def test_merge_page_by_urgency_puts_ranked_complaints_first():
+    sources = [
+        source("rest", complaint("N1", "2026-10-05")),
+        source("queue", complaint("Q1", "2026-09-01", rank=1), complaint("Q2", "2026-09-02", rank=2))
+    ]
+    page, _ = sortedQuery.merge_page(sources, sortedQuery.merge_key("urgency"), 3)
+    assert [item["complaintId"] for _, item in page] == ["Q1", "Q2", "N1"]
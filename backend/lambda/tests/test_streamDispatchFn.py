@@ -0,0 +1,20 @@
+import json
+from streamDispatchFn import MAX_PAYLOAD_BYTES, payloads
+
+
+def record(number, size):
+    return {"eventID": str(number), "eventName": "MODIFY", "dynamodb": {"NewImage": {"description": {"S": "x" * size}}}}
+
+
+def test_payloads_split_under_the_invoke_limit_in_stream_order():
+    records = [record(number, 3000) for number in range(100)]
+    bodies = payloads(records)
+    assert len(bodies) == 2
+    assert all(len(body) <= MAX_PAYLOAD_BYTES for body in bodies)
+    assert [each for body in bodies for each in json.loads(body)["Records"]] == records
+
+def test_small_batch_is_one_payload():
+    assert [json.loads(body) for body in payloads([record(1, 10)])] == [{"Records": [record(1, 10)]}]
+
+def test_no_records_no_payloads():
+    assert payloads([]) == []
@@ -0,0 +1,48 @@
+import pytest
+import textIndex
+from timeSlots import to_hex, window_bitmap
+
+
+@pytest.mark.parametrize("word, term", [
+    ("racing", "rac"), ("race", "rac"), ("cars", "car"), ("buses", "bus"), ("policies", "policy"),
+    ("stopped", "stop"), ("speed", "speed"), ("needed", "need"), ("falling", "fall"), ("passing", "pass")
+])
+def test_stem(word, term):
+    assert textIndex.stem(word) == term
+
+def test_stem_leaves_numbers_and_short_words():
+    assert textIndex.stem("1200") == "1200"
+    assert textIndex.stem("bus") == "bus"
+
+def test_tokenize_drops_stop_words_and_single_letters():
+    assert textIndex.tokenize("The cars were racing at 5 pm on Main St, a LOT!") == ["car", "rac", "5", "pm", "main", "st", "lot"]
+    assert textIndex.tokenize(None) == []
+
+def test_document_terms_counts_description_and_notes():
+    terms = textIndex.document_terms({"description": "Racing cars", "officersNotes": "More racing"})
+    assert terms == {"rac": 2, "car": 1, "mor": 1}
+
+def test_posting_items_carry_filters_and_time_window():
+    item = {
+        "complaintId": "C1", "description": "Speeding cars speeding", "beatNumber": "7", "complaintStatus": "Open",
+        "problemCategory": "Speed", "dateOfComplaint": "2026-10-01", "startDate": "", "startTime": "08:00:00", "endTime": "09:00:00"
+    }
+    postings = textIndex.posting_items(item)
+    assert set(postings) == {"speed", "car"}
+    speed = postings["speed"]
+    assert speed["tf"] == 2 and speed["docLength"] == 3 and speed["term"] == "speed"
+    assert speed["beatNumber"] == "7" and speed["complaintStatus"] == "Open"
+    # Empty filter attributes are left out, as on compact items
+    assert "startDate" not in speed
+    assert speed["activeSlots"] == to_hex(window_bitmap("08:00", "09:00"))
+
+def test_posting_items_empty_without_text():
+    assert textIndex.posting_items({"complaintId": "C1", "description": "", "beatNumber": "7"}) == {}
+
+def test_bm25_prefers_rarer_terms_and_higher_frequency():
+    postings = {
+        "rac": [{"complaintId": "A", "tf": 1, "docLength": 4}],
+        "car": [{"complaintId": "B", "tf": 1, "docLength": 4}, {"complaintId": "C", "tf": 3, "docLength": 4}]
+    }
+    scores = textIndex.bm25(postings, {"rac": 1, "car": 40}, doc_count=100, average_length=4)
+    assert scores["A"] > scores["C"] > scores["B"] > 0
@@ -0,0 +1,48 @@
+import timeSlots
+
+
+def slots(*indexes):
+    return sum(1 << index for index in indexes)
+
+def test_parse_minutes():
+    assert timeSlots.parse_minutes("07:30") == 450
+    assert timeSlots.parse_minutes("07:30:59") == 450
+    assert timeSlots.parse_minutes("00:00") == 0
+
+def test_parse_minutes_rejects_missing_and_invalid_values():
+    for value in [None, "", "24:00", "7", "ab:cd"]:
+        assert timeSlots.parse_minutes(value) is None
+
+def test_window_end_is_exclusive():
+    assert timeSlots.window_bitmap("08:00", "09:00") == slots(32, 33, 34, 35)
+    assert timeSlots.window_bitmap("08:00", "08:15") == slots(32)
+
+def test_window_touching_part_of_a_slot_occupies_it():
+    assert timeSlots.window_bitmap("08:10", "08:20") == slots(32, 33)
+
+def test_zero_length_window_occupies_its_slot():
+    assert timeSlots.window_bitmap("13:05", "13:05") == slots(52)
+
+def test_window_wraps_past_midnight():
+    assert timeSlots.window_bitmap("23:30", "00:30") == slots(94, 95, 0, 1)
+
+def test_window_with_a_missing_end_is_empty():
+    assert timeSlots.window_bitmap("08:00", "") == 0
+    assert timeSlots.window_bitmap(None, "09:00") == 0
+
+def test_hex_round_trip_is_fixed_width():
+    bitmap = timeSlots.window_bitmap("23:30", "00:30")
+    encoded = timeSlots.to_hex(bitmap)
+    assert len(encoded) == timeSlots.HEX_DIGITS
+    assert timeSlots.from_hex(encoded) == bitmap
+    assert timeSlots.from_hex("") == 0
+
+def test_item_bitmap_prefers_stored_slots():
+    stored = timeSlots.to_hex(slots(10))
+    assert timeSlots.item_bitmap({"activeSlots": stored, "startTime": "08:00:00", "endTime": "09:00:00"}) == slots(10)
+    assert timeSlots.item_bitmap({"startTime": "08:00:00", "endTime": "08:15:00"}) == slots(32)
+
+def test_overlaps():
+    item = {"startTime": "22:00:00", "endTime": "02:00:00"}
+    assert timeSlots.overlaps(item, timeSlots.window_bitmap("01:00", "01:30"))
+    assert not timeSlots.overlaps(item, timeSlots.window_bitmap("12:00", "13:00"))
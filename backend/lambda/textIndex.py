@@ -0,0 +1,96 @@
+# Inverted index over complaint text: one posting item per (term, complaint) in the text index table,
+# kept in step with the complaints table by its stream
+import math
+import re
+from collections import Counter
+from timeSlots import item_bitmap, to_hex
+
+# Complaint attributes that are searchable
+TEXT_ATTRIBUTES = ["description", "officersNotes"]
+# Copied onto postings so beat, status, category, date and time window filters apply without reading complaints
+POSTING_FILTERS = ["beatNumber", "complaintStatus", "problemCategory", "dateOfComplaint", "startDate"]
+
+# Collection statistics live under a term no token can produce
+STATS_TERM = "#stats"
+STATS_KEY = "all"
+# Each term's document frequency is kept under this sort key, which sorts before every complaint ID
+DF_KEY = "#df"
+
+# Usual BM25 parameters: term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = {
+    "a", "about", "after", "all", "also", "an", "and", "any", "are", "as", "at", "be", "been", "before",
+    "but", "by", "can", "could", "did", "do", "does", "for", "from", "had", "has", "have", "he", "her",
+    "here", "him", "his", "how", "i", "if", "in", "into", "is", "it", "its", "just", "me", "my", "no",
+    "not", "of", "on", "or", "our", "out", "she", "so", "some", "than", "that", "the", "their", "them",
+    "then", "there", "these", "they", "this", "to", "too", "up", "us", "very", "was", "we", "were",
+    "what", "when", "where", "which", "while", "who", "will", "with", "would", "you", "your"
+}
+
+
+def stem(token):
+    """
+    Light suffix stripping so plural, -ing and -ed forms share a term
+
+    Deliberately crude: it only has to map a word and its variants to the same key, not produce a
+    real word ("racing" and "race" both become "rac").
+    """
+    if token.isdigit() or len(token) <= 3:
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        token = token[:-3] + "y"
+    elif token.endswith(("sses", "shes", "ches", "xes", "zes")):
+        token = token[:-2]
+    elif token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        token = token[:-1]
+    for suffix in ("ing", "ed"):
+        # speed / need are not past tenses
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3 and not token.endswith("eed"):
+            token = token[:-len(suffix)]
+            # stopped -> stop, but keep fall / pass / buzz
+            if len(token) > 3 and token[-1] == token[-2] and token[-1] not in "lsz":
+                token = token[:-1]
+            break
+    if token.endswith("e") and len(token) > 3:
+        token = token[:-1]
+    return token
+
+def tokenize(text):
+    """Search terms of a text in order, stop words and single letters removed"""
+    return [
+        stem(token) for token in TOKEN_PATTERN.findall(str(text or "").lower())
+        if token not in STOP_WORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+def document_terms(item):
+    """Term frequencies of a complaint's searchable text"""
+    terms = Counter()
+    for attribute in TEXT_ATTRIBUTES:
+        terms.update(tokenize(item.get(attribute)))
+    return terms
+
+def posting_items(item):
+    """Posting items of a complaint keyed by term, empty when it has no searchable text"""
+    terms = document_terms(item)
+    length = sum(terms.values())
+    shared = {"complaintId": item["complaintId"], "docLength": length}
+    shared.update({name: item[name] for name in POSTING_FILTERS if item.get(name)})
+    slots = item_bitmap(item)
+    if slots:
+        shared["activeSlots"] = to_hex(slots)
+    return {term: dict(shared, term=term, tf=count) for term, count in terms.items()}
+
+def bm25(postings_by_term, df_by_term, doc_count, average_length):
+    """BM25 score per complaint over the given terms' postings"""
+    scores = Counter()
+    for term, postings in postings_by_term.items():
+        df = df_by_term[term]
+        idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+        for posting in postings:
+            tf = int(posting["tf"])
+            norm = 1 - BM25_B + BM25_B * int(posting["docLength"]) / (average_length or 1)
+            scores[posting["complaintId"]] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+    return scores
@@ -0,0 +1,82 @@
+#lambda function that keeps the complaint text index in step with the complaints table stream
+import boto3
+import os
+from collections import Counter
+from boto3.dynamodb.types import TypeDeserializer
+from textIndex import STATS_TERM, STATS_KEY, DF_KEY, posting_items
+from archiveTier import is_tier_move
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+deserializer = TypeDeserializer()
+
+TEXT_INDEX_TABLE = os.environ['TEXT_INDEX_TABLE_NAME']
+
+
+def deserialize(image):
+    return {name: deserializer.deserialize(value) for name, value in (image or {}).items()}
+
+def index_changes(records):
+    """
+    Postings to write and delete, document frequency deltas per term and the collection statistics
+    delta for a batch of stream records
+
+    Records are applied in order, so several changes to one complaint in a batch leave its final state.
+    """
+    writes, deletes = {}, {}
+    df_deltas = Counter()
+    doc_delta = length_delta = 0
+    for record in records:
+        # Archived complaints stay searchable, so moving between tiers changes nothing
+        if is_tier_move(record):
+            continue
+        old_image = deserialize(record['dynamodb'].get('OldImage'))
+        new_image = deserialize(record['dynamodb'].get('NewImage'))
+        old = posting_items(old_image) if old_image else {}
+        new = posting_items(new_image) if new_image else {}
+        # Edits that touch neither the text nor a filter attribute leave the postings as they are
+        df_deltas.update(term for term in new if term not in old)
+        df_deltas.subtract(term for term in old if term not in new)
+        for term, posting in new.items():
+            if old.get(term) != posting:
+                writes[(term, posting['complaintId'])] = posting
+                deletes.pop((term, posting['complaintId']), None)
+        for term, posting in old.items():
+            if term not in new:
+                deletes[(term, posting['complaintId'])] = posting
+                writes.pop((term, posting['complaintId']), None)
+
+        old_length = sum(posting['tf'] for posting in old.values())
+        new_length = sum(posting['tf'] for posting in new.values())
+        doc_delta += bool(new) - bool(old)
+        length_delta += new_length - old_length
+    return writes, deletes, {term: delta for term, delta in df_deltas.items() if delta}, doc_delta, length_delta
+
+@instrumented
+def lambda_handler(event, context):
+    records = event.get('Records', [])
+    writes, deletes, df_deltas, doc_delta, length_delta = index_changes(records)
+    table = dynamodb.Table(TEXT_INDEX_TABLE)
+
+    with table.batch_writer() as batch:
+        for term, complaint_id in deletes:
+            batch.delete_item(Key={'term': term, 'complaintId': complaint_id})
+        for posting in writes.values():
+            batch.put_item(Item=posting)
+    for term, delta in df_deltas.items():
+        table.update_item(
+            Key={'term': term, 'complaintId': DF_KEY},
+            UpdateExpression='ADD df :delta',
+            ExpressionAttributeValues={':delta': delta}
+        )
+    if doc_delta or length_delta:
+        table.update_item(
+            Key={'term': STATS_TERM, 'complaintId': STATS_KEY},
+            UpdateExpression='ADD docCount :docs, totalLength :length',
+            ExpressionAttributeValues={':docs': doc_delta, ':length': length_delta}
+        )
+    logger.info("Applied text index updates", records=len(records), written=len(writes), deleted=len(deletes))
+    return {'statusCode': 200, 'body': {"written": len(writes), "deleted": len(deletes)}}
@@ -0,0 +1,67 @@
+#lambda function that rebuilds the complaint tile buckets from the complaints table
+import boto3
+import os
+from collections import defaultdict
+from decimal import Decimal
+from tableScan import parallel_scan
+from complaintTiles import VERSION_PARTITION, bucket_entries
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+TILE_TABLE = os.environ['TILE_TABLE_NAME']
+
+
+def expected_buckets():
+    """Bucket items keyed by (cell, bucket) for every complaint with coordinates and a date"""
+    items = parallel_scan(COMPLAINTS_TABLE, ProjectionExpression="geohash, lat, lon, dateOfComplaint, complaintStatus, problemCategory")
+    buckets = defaultdict(lambda: {'count': 0, 'latSum': Decimal(0), 'lonSum': Decimal(0)})
+    for item in items:
+        for (cell, bucket), (lat, lon) in bucket_entries(item).items():
+            totals = buckets[(cell, bucket)]
+            totals['count'] += 1
+            totals['latSum'] += Decimal(str(lat))
+            totals['lonSum'] += Decimal(str(lon))
+    return {key: dict(totals, cell=key[0], bucket=key[1]) for key, totals in buckets.items()}, len(items)
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    dry_run = event.get('dryRun', False)
+
+    expected, scanned = expected_buckets()
+    existing = {(item['cell'], item['bucket']): item for item in parallel_scan(TILE_TABLE) if item['cell'] != VERSION_PARTITION}
+    stale = [key for key in existing if key not in expected]
+    # Buckets the stream emptied keep a zero count until a rebuild deletes them
+    changed = [item for key, item in expected.items() if existing.get(key) != item]
+    # Deleting an emptied bucket does not change any tile
+    cells = {key[0] for key in stale if existing[key]['count'] != 0} | {item['cell'] for item in changed}
+
+    if not dry_run:
+        # Only drifted buckets are rewritten; stream updates landing meanwhile are reconciled by the next rebuild
+        table = dynamodb.Table(TILE_TABLE)
+        with table.batch_writer() as batch:
+            for cell, bucket in stale:
+                batch.delete_item(Key={'cell': cell, 'bucket': bucket})
+            for item in changed:
+                batch.put_item(Item=item)
+        # Cached tiles of the rewritten cells are revalidated
+        for cell in cells:
+            table.update_item(Key={'cell': VERSION_PARTITION, 'bucket': cell}, UpdateExpression='ADD version :one', ExpressionAttributeValues={':one': 1})
+    logger.info("Rebuilt tile buckets", complaints=scanned, buckets=len(expected), rewritten=len(changed), deleted=len(stale), dryRun=dry_run)
+
+    return {
+        'statusCode': 200,
+        'body': {
+            "complaintsScanned": scanned,
+            "buckets": len(expected),
+            "rewritten": len(changed),
+            "deleted": len(stale),
+            "cellsInvalidated": len(cells),
+            "dryRun": dry_run
+        }
+    }
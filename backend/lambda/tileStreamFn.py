@@ -0,0 +1,65 @@
+#lambda function that keeps the complaint tile buckets and cell versions in step with the complaints table stream
+import boto3
+import os
+from collections import defaultdict
+from decimal import Decimal
+from boto3.dynamodb.types import TypeDeserializer
+from complaintTiles import VERSION_PARTITION, bucket_entries
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+deserializer = TypeDeserializer()
+
+TILE_TABLE = os.environ['TILE_TABLE_NAME']
+
+
+def deserialize(image):
+    return {name: deserializer.deserialize(value) for name, value in (image or {}).items()}
+
+def bucket_deltas(records):
+    """
+    Net (count, lat sum, lon sum) change per bucket for a batch of stream records, and the cells whose
+    tiles changed
+
+    Unlike the trend buckets, moves to the archive count as removals: the map shows the complaints table.
+    """
+    deltas = defaultdict(lambda: [0, Decimal(0), Decimal(0)])
+    for record in records:
+        old = bucket_entries(deserialize(record['dynamodb'].get('OldImage')))
+        new = bucket_entries(deserialize(record['dynamodb'].get('NewImage')))
+        # Edits that leave location, date, status and category unchanged touch no tile
+        if old == new:
+            continue
+        for entries, sign in ((old, -1), (new, 1)):
+            for key, (lat, lon) in entries.items():
+                delta = deltas[key]
+                delta[0] += sign
+                delta[1] += sign * Decimal(str(lat))
+                delta[2] += sign * Decimal(str(lon))
+    changed = {key: delta for key, delta in deltas.items() if any(delta)}
+    return changed, {cell for cell, _ in changed}
+
+@instrumented
+def lambda_handler(event, context):
+    records = event.get('Records', [])
+    deltas, cells = bucket_deltas(records)
+    table = dynamodb.Table(TILE_TABLE)
+    for (cell, bucket), (count, lat_sum, lon_sum) in deltas.items():
+        table.update_item(
+            Key={'cell': cell, 'bucket': bucket},
+            UpdateExpression='ADD #count :count, latSum :lat, lonSum :lon',
+            ExpressionAttributeNames={'#count': 'count'},
+            ExpressionAttributeValues={':count': count, ':lat': lat_sum, ':lon': lon_sum}
+        )
+    # Bumped after the buckets, so a tile read between the two is revalidated once more rather than cached stale
+    for cell in cells:
+        table.update_item(
+            Key={'cell': VERSION_PARTITION, 'bucket': cell},
+            UpdateExpression='ADD version :one',
+            ExpressionAttributeValues={':one': 1}
+        )
+    logger.info("Applied tile bucket updates", buckets=len(deltas), cells=len(cells), records=len(records))
+    return {'statusCode': 200, 'body': {"updatedBuckets": len(deltas), "updatedCells": len(cells)}}
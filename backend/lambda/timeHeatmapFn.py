@@ -0,0 +1,98 @@
+#lambda function that builds the weekday x hour-of-day heat matrix of complaint activity windows
+import os
+import numpy as np
+from boto3.dynamodb.conditions import Attr
+from hotspotEngine import DAYS_OF_WEEK
+from tableScan import parallel_scan
+from timeSlots import SLOTS_PER_DAY, SLOTS_PER_HOUR, HEX_DIGITS, item_bitmap, to_hex
+from instrumentation import instrumented
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+COMPLAINTS_TABLE = os.environ['COMPLAINT_TABLE_NAME']
+
+PROJECTION = {
+    "#daysOfWeek": "daysOfWeek",
+    "#startTime": "startTime",
+    "#endTime": "endTime",
+    "#activeSlots": "activeSlots"
+}
+
+
+def as_list(value):
+    """Accept a single value or a list for multi-value filters"""
+    if not value:
+        return []
+    return value if isinstance(value, list) else [value]
+
+def build_filter(event):
+    filters = []
+    for attribute in ['beatNumber', 'problemCategory', 'complaintStatus']:
+        values = as_list(event.get(attribute))
+        if values:
+            filters.append(Attr(attribute).is_in([str(value) for value in values]))
+    if event.get('startDate') and event.get('endDate'):
+        filters.append(Attr('dateOfComplaint').between(event['startDate'], event['endDate']))
+    if not filters:
+        return None
+    combined_filter = filters[0]
+    for filter_exp in filters[1:]:
+        combined_filter = combined_filter & filter_exp
+    return combined_filter
+
+def slot_matrix(items):
+    """(N, 96) boolean matrix of the slots each complaint is active in"""
+    # Fixed width hex -> 12 big-endian bytes; reversing puts slot 0 in the first byte
+    hex_bitmaps = "".join(item.get('activeSlots') or to_hex(item_bitmap(item)) for item in items)
+    raw = np.frombuffer(bytes.fromhex(hex_bitmaps), dtype=np.uint8).reshape(len(items), HEX_DIGITS // 2)
+    return np.unpackbits(raw[:, ::-1], axis=1, bitorder='little').astype(bool)
+
+def day_matrix(items):
+    """(N, 7) boolean matrix of the weekdays each complaint was reported for"""
+    days = np.zeros((len(items), len(DAYS_OF_WEEK)), dtype=bool)
+    day_index = {day.lower(): index for index, day in enumerate(DAYS_OF_WEEK)}
+    for row, item in enumerate(items):
+        for day in item.get('daysOfWeek') or []:
+            index = day_index.get(str(day).lower())
+            if index is not None:
+                days[row, index] = True
+    return days
+
+def heat_matrix(items):
+    """7 x 24 counts of complaints active in each weekday/hour cell"""
+    if not items:
+        return np.zeros((len(DAYS_OF_WEEK), 24), dtype=np.int64)
+    hours = slot_matrix(items).reshape(len(items), SLOTS_PER_DAY // SLOTS_PER_HOUR, SLOTS_PER_HOUR).any(axis=2)
+    return day_matrix(items).astype(np.int64).T @ hours.astype(np.int64)
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    try:
+        scan_kwargs = {
+            "ProjectionExpression": ", ".join(PROJECTION.keys()),
+            "ExpressionAttributeNames": PROJECTION
+        }
+        combined_filter = build_filter(event)
+        if combined_filter is not None:
+            scan_kwargs["FilterExpression"] = combined_filter
+        items = parallel_scan(COMPLAINTS_TABLE, **scan_kwargs)
+
+        matrix = heat_matrix(items)
+        return {
+            'statusCode': 200,
+            'body': {
+                "days": DAYS_OF_WEEK,
+                "hours": list(range(24)),
+                "matrix": matrix.tolist(),
+                "hourTotals": matrix.sum(axis=0).tolist(),
+                "dayTotals": matrix.sum(axis=1).tolist(),
+                "complaints": len(items)
+            }
+        }
+    except Exception as e:
+        logger.error("Error building time heatmap", error=str(e))
+        return {
+            'statusCode': 500,
+            'body': str(e)
+        }
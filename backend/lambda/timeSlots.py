@@ -0,0 +1,57 @@
+# Occupancy bitmaps of complaint time windows: 96 slots of 15 minutes, slot i is bit i
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+SLOTS_PER_HOUR = 60 // SLOT_MINUTES
+HEX_DIGITS = SLOTS_PER_DAY // 4
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+
+def parse_minutes(value):
+    """Convert "HH:MM" or "HH:MM:SS" to minutes after midnight, None when missing or invalid"""
+    if not value:
+        return None
+    try:
+        parts = str(value).split(':')
+        minutes = int(parts[0]) * 60 + int(parts[1])
+    except (ValueError, IndexError):
+        return None
+    return minutes if 0 <= minutes < 24 * 60 else None
+
+
+def window_bitmap(start_time, end_time):
+    """
+    Bitmap of the slots a time window touches
+
+    The end is exclusive and windows whose end is before their start wrap past midnight.
+    A zero length window occupies the slot it falls in. Returns 0 when either end is missing.
+    """
+    start, end = parse_minutes(start_time), parse_minutes(end_time)
+    if start is None or end is None:
+        return 0
+    first = start // SLOT_MINUTES
+    last = first if end == start else (end - 1) // SLOT_MINUTES
+    if end >= start:
+        return ((1 << (last - first + 1)) - 1) << first
+    # Wrapping window: from the first slot to midnight, then from midnight to the last slot
+    return (FULL_DAY & ~((1 << first) - 1)) | ((1 << (last + 1)) - 1)
+
+
+def to_hex(bitmap):
+    """Fixed width hex encoding stored on the item"""
+    return format(bitmap, f'0{HEX_DIGITS}x')
+
+
+def from_hex(value):
+    return int(value, 16) if value else 0
+
+
+def item_bitmap(item):
+    """Bitmap of a complaint, computed from its times when the item predates activeSlots"""
+    if item.get('activeSlots'):
+        return from_hex(item['activeSlots'])
+    return window_bitmap(item.get('startTime'), item.get('endTime'))
+
+
+def overlaps(item, query_bitmap):
+    """Whether a complaint is active at any moment of the queried window"""
+    return (item_bitmap(item) & query_bitmap) != 0
@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+
+# Daily complaint counts are stored one item per (day, beat, category, status), partitioned by month:
+#   month  = "YYYY-MM"
+#   bucket = "YYYY-MM-DD#<beat>#<category>#<status>"
+SEPARATOR = "#"
+DIMENSIONS = ["beatNumber", "problemCategory", "complaintStatus"]
+GRANULARITIES = ["day", "week", "month"]
+
+
+def bucket_key(item):
+    """(month, bucket) key counting a complaint, None when the complaint has no date"""
+    day = item.get('dateOfComplaint')
+    if not day:
+        return None
+    parts = [str(day)] + [str(item.get(dimension) or "") for dimension in DIMENSIONS]
+    return str(day)[:7], SEPARATOR.join(parts)
+
+def parse_bucket(bucket):
+    """Split a bucket sort key into its day and a dict of its dimensions"""
+    parts = bucket.split(SEPARATOR)
+    return parts[0], dict(zip(DIMENSIONS, parts[1:]))
+
+def period_start(day, granularity):
+    """First day of the day/week (Monday)/month period a YYYY-MM-DD day falls in"""
+    if granularity == "month":
+        return day[:7] + "-01"
+    if granularity == "week":
+        parsed = date.fromisoformat(day)
+        return str(parsed - timedelta(days=parsed.weekday()))
+    return day
+
+def periods_between(start_date, end_date, granularity):
+    """Every period start covering the inclusive date range, in order"""
+    current = date.fromisoformat(period_start(start_date, granularity))
+    end = date.fromisoformat(end_date)
+    periods = []
+    while current <= end:
+        periods.append(str(current))
+        if granularity == "month":
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        elif granularity == "week":
+            current += timedelta(days=7)
+        else:
+            current += timedelta(days=1)
+    return periods
+
+def months_between(start_date, end_date):
+    return [period[:7] for period in periods_between(start_date, end_date, "month")]
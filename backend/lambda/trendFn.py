@@ -0,0 +1,114 @@
+#lambda function returning daily, weekly or monthly complaint counts from the trend buckets
+import boto3
+import hashlib
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from boto3.dynamodb.conditions import Key
+from trendBuckets import DIMENSIONS, GRANULARITIES, parse_bucket, period_start, periods_between, months_between
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+
+TRENDS_TABLE = os.environ['TREND_TABLE_NAME']
+DEFAULT_RANGE_DAYS = 90
+QUERY_WORKERS = 8
+# Counts move only as the stream applies changes, so a few minutes of staleness is fine; then revalidated against the ETag
+CACHE_CONTROL = "private, max-age=300"
+
+
+def as_list(value):
+    """Comma-separated query string values of a multi-value filter"""
+    return [part.strip() for part in str(value or "").split(',') if part.strip()]
+
+def header(headers, name):
+    """Case-insensitive request header lookup"""
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+def query_month(month, start_date, end_date):
+    """Read the buckets of one month partition that fall inside the date range"""
+    # The day prefixes the sort key, so the range maps to a key condition on it
+    kwargs = {
+        "TableName": TRENDS_TABLE,
+        "KeyConditionExpression": Key('month').eq(month) & Key('bucket').between(start_date, end_date + "#~"),
+        "ProjectionExpression": "#bucket, #count",
+        "ExpressionAttributeNames": {"#bucket": "bucket", "#count": "count"}
+    }
+    items = []
+    while True:
+        response = dynamodb.meta.client.query(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def build_series(buckets, filters, group_by, granularity, periods):
+    """Sum matching buckets into one count array per group, aligned with periods"""
+    index = {period: position for position, period in enumerate(periods)}
+    series = defaultdict(lambda: [0] * len(periods))
+    for bucket in buckets:
+        day, dimensions = parse_bucket(bucket['bucket'])
+        if any(values and dimensions[name] not in values for name, values in filters.items()):
+            continue
+        position = index.get(period_start(day, granularity))
+        if position is None:
+            continue
+        group = dimensions[group_by] if group_by else "all"
+        series[group][position] += int(bucket['count'])
+    return dict(series)
+
+def etag_for(body):
+    return '"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest() + '"'
+
+@instrumented
+def lambda_handler(event, context):
+    logger.debug("Received event", event=event)
+    headers = {'Access-Control-Allow-Origin': '*', 'Access-Control-Expose-Headers': 'ETag'}
+    try:
+        # GET /trends?granularity=week&groupBy=beatNumber&beatNumber=7,9 through a proxy integration
+        params = event.get('queryStringParameters') or {}
+        granularity = params.get('granularity') or 'day'
+        group_by = params.get('groupBy') or None
+        if granularity not in GRANULARITIES or (group_by and group_by not in DIMENSIONS):
+            return {'statusCode': 400, 'headers': headers, 'body': f"granularity must be one of {GRANULARITIES}, groupBy one of {DIMENSIONS}"}
+
+        end_date = params.get('endDate') or str(date.today())
+        start_date = params.get('startDate') or str(date.fromisoformat(end_date) - timedelta(days=DEFAULT_RANGE_DAYS))
+        filters = {name: as_list(params.get(name)) for name in DIMENSIONS}
+
+        months = months_between(start_date, end_date)
+        with ThreadPoolExecutor(max_workers=min(QUERY_WORKERS, max(len(months), 1))) as executor:
+            results = executor.map(lambda month: query_month(month, start_date, end_date), months)
+            buckets = [bucket for month_buckets in results for bucket in month_buckets]
+
+        periods = periods_between(start_date, end_date, granularity)
+        body = {
+            "granularity": granularity,
+            "startDate": start_date,
+            "endDate": end_date,
+            "periods": periods,
+            "series": build_series(buckets, filters, group_by, granularity, periods)
+        }
+
+        # Unchanged counts let the browser keep its cached copy
+        etag = etag_for(body)
+        headers.update({'ETag': etag, 'Cache-Control': CACHE_CONTROL, 'Content-Type': 'application/json'})
+        if_none_match = header(event.get('headers'), 'if-none-match')
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(',')]:
+            return {'statusCode': 304, 'headers': headers, 'body': ''}
+        return {'statusCode': 200, 'headers': headers, 'body': json.dumps(body)}
+    except Exception as e:
+        logger.error("Error building trends", error=str(e))
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': str(e)
+        }
@@ -0,0 +1,50 @@
+#lambda function that keeps the daily trend buckets in step with the complaints table stream
+import boto3
+import os
+from collections import Counter
+from boto3.dynamodb.types import TypeDeserializer
+from trendBuckets import bucket_key
+from archiveTier import is_tier_move
+from instrumentation import instrumented, instrument_client
+from structuredlog import get_logger
+
+logger = get_logger(__name__)
+dynamodb = boto3.resource('dynamodb')
+instrument_client(dynamodb.meta.client)
+deserializer = TypeDeserializer()
+
+TRENDS_TABLE = os.environ['TREND_TABLE_NAME']
+
+
+def deserialize(image):
+    return {name: deserializer.deserialize(value) for name, value in (image or {}).items()}
+
+def bucket_deltas(records):
+    """Net count change per bucket for a batch of stream records"""
+    deltas = Counter()
+    for record in records:
+        # Archived complaints keep counting towards trends, so moving between tiers changes nothing
+        if is_tier_move(record):
+            continue
+        old_key = bucket_key(deserialize(record['dynamodb'].get('OldImage')))
+        new_key = bucket_key(deserialize(record['dynamodb'].get('NewImage')))
+        # Edits that leave date, beat, category and status unchanged cancel out here
+        if old_key:
+            deltas[old_key] -= 1
+        if new_key:
+            deltas[new_key] += 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+@instrumented
+def lambda_handler(event, context):
+    deltas = bucket_deltas(event.get('Records', []))
+    table = dynamodb.Table(TRENDS_TABLE)
+    for (month, bucket), delta in deltas.items():
+        table.update_item(
+            Key={'month': month, 'bucket': bucket},
+            UpdateExpression='ADD #count :delta',
+            ExpressionAttributeNames={'#count': 'count'},
+            ExpressionAttributeValues={':delta': delta}
+        )
+    logger.info("Applied trend bucket updates", buckets=len(deltas), records=len(event.get('Records', [])))
+    return {'statusCode': 200, 'body': {"updatedBuckets": len(deltas)}}
@@ -12,6 +12,7 @@ const statusColors = {
   Closed: "#D32F2F",
   "Follow-Up": "#1976D2",
   "Red-Star": "#EF6C00",
+  Duplicate: "#757575",
 };
 
 const ComplaintsTable = () => {
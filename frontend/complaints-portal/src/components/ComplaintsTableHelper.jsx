@@ -11,6 +11,7 @@ export const statusColors = {
   Closed: "#D32F2F",
   "Follow-Up": "#1976D2",
   "Red-Star": "#EF6C00",
+  Duplicate: "#757575",
 };
 // Custom Footer with Pagination on Left & Buttons on Right
 export const CustomFooter = () => {
@@ -1,4 +1,4 @@
-import React, { useEffect, useMemo, useState } from "react";
+import React, { useEffect, useMemo, useRef, useState } from "react";
 import { Autocomplete, Button, Stack, TextField, MenuItem, Select, FormControl, InputLabel, RadioGroup, FormControlLabel, Radio, Chip } from "@mui/material";
 import { DatePicker, DateTimePicker, LocalizationProvider, TimePicker } from "@mui/x-date-pickers";
 import { AdapterDayjs } from "@mui/x-date-pickers/AdapterDayjs";
@@ -8,10 +8,12 @@ import useStore from "../store/store";
 import { useLocation, useNavigate } from "react-router-dom";
 import { beatsList } from "../beatsData/beats";
 import SendEmail from "./SendEmail";
+import { loadDashboardBootstrap, isDefaultView } from "../utilities/dashboardBootstrap";
+import { connectChangeFeed, filterMatcher } from "../utilities/changeFeed";
 const API_URL = import.meta.env.VITE_API_URL;
 
 const Filters = () => {
-  const { setComplaints, isAdmin, setTotalStatusCounts, selectedRows, refresh, currentPage, setLoading, setPagination } = useStore();
+  const { setComplaints, isAdmin, setTotalStatusCounts, selectedRows, refresh, setRefresh, currentPage, setLoading, setPagination, applyComplaintChanges } = useStore();
 
   const resetState = {
     mainFilter: "",
@@ -23,8 +25,13 @@ const Filters = () => {
     page: 1,
   };
   const [filtersState, setFiltersState] = useState(resetState);
+  // The first unfiltered load is served by the dashboard bootstrap, later ones by the filter API
+  const bootstrapped = useRef(false);
+  // Live changes for the beats and status being viewed, and whether they match the rest of the filters
+  const changeFeed = useRef(null);
+  const changeMatcher = useRef(null);
 
-  const [statusOptions, setStatusOptions] = useState(["Open", "Closed", "Follow-Up", "Red-Star"]);
+  const [statusOptions, setStatusOptions] = useState(["Open", "Closed", "Follow-Up", "Red-Star", "Duplicate"]);
   const [problemCategoryOptions, setProblemCategoryOptions] = useState(["Speed", "Stop sign", "Red light", "School traffic complaint", "Racing", "Reckless Driving"]);
   const mainFilterOptions = [
     {
@@ -94,7 +101,24 @@ const Filters = () => {
       complaintStatus: filters.complaintStatus ? filters.complaintStatus : [],
       page: currentPage + 1 || 1, // Default to page 1 if not set
     };
+    changeMatcher.current = filterMatcher(apiPayload);
+    changeFeed.current?.subscribe({ beatNumber: apiPayload.beatNumber, complaintStatus: apiPayload.complaintStatus });
     setLoading(true);
+    if (!bootstrapped.current) {
+      bootstrapped.current = true;
+      if (isDefaultView(filters, currentPage)) {
+        try {
+          const bootstrap = await loadDashboardBootstrap();
+          setComplaints(bootstrap.complaintsData || []);
+          setPagination(0, bootstrap.totalComplaint, bootstrap.page === -1 ? 1 : bootstrap.totalPages);
+          setTotalStatusCounts(bootstrap.totalStatusCounts);
+          setLoading(false);
+          return;
+        } catch (error) {
+          console.error("Error fetching dashboard bootstrap, falling back to the filter API:", error);
+        }
+      }
+    }
     try {
       const response = await fetch(API_URL + "db-filter-query-api", {
         method: "PUT",
@@ -116,6 +140,7 @@ const Filters = () => {
           "TotalFollow-Up": 0,
           TotalOpen: 0,
           "TotalRed-Star": 0,
+          TotalDuplicate: 0,
         });
         setPagination(0, 0, 1);
       } else {
@@ -131,6 +156,15 @@ const Filters = () => {
     }
   };
 
+  useEffect(() => {
+    // After a reconnect the view is reloaded, since changes may have been missed
+    changeFeed.current = connectChangeFeed(
+      (deltas) => applyComplaintChanges(deltas, changeMatcher.current),
+      () => setRefresh(!useStore.getState().refresh)
+    );
+    return () => changeFeed.current.close();
+  }, []);
+
   useEffect(() => {
     applyFilters();
   }, [currentPage, refresh]);
@@ -2,6 +2,7 @@ import React, { useEffect, useRef, useState } from "react";
 import { loadModules } from "esri-loader";
 import { beatsData } from "../beatsData/beats";
 import CustomBeatPopup from "./CustomBeatPopup"; // Import the custom popup component
+import { loadDashboardBootstrap } from "../utilities/dashboardBootstrap";
 
 // // Apply counts directly to your beats layer
 // beatsData.features.forEach((feature) => {
@@ -10,8 +11,6 @@ import CustomBeatPopup from "./CustomBeatPopup"; // Import the custom popup comp
 //   // If the beat ID exists in complaintsData, use that count; otherwise, use 0
 //   feature.attributes.COMPLAINT_COUNT = complaintsData[beatId] || 0;
 // });
-const API_URL = import.meta.env.VITE_API_URL;
-
 const PoliceBeatsMap = () => {
   const mapRef = useRef(null);
   const [loading, setLoading] = useState(true);
@@ -27,12 +26,10 @@ const PoliceBeatsMap = () => {
     const fetchComplaintsData = async () => {
       setLoading(true);
       try {
-        // Replace with actual API endpoint from one of the available police API services
-        // For example, using the Police API Client or DOJ Crime Data API
-        const response = await fetch(API_URL + "beat-open-cases");
-        const data = await response.json();
+        // Open cases per beat come with the dashboard bootstrap the complaints table also uses
+        const data = await loadDashboardBootstrap();
 
-        setComplaintsData(data.body);
+        setComplaintsData(data.heatmap);
       } catch (error) {
         console.error("Error fetching complaints data:", error);
         // Fallback to default data if API fails
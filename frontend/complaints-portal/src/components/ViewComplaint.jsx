@@ -25,8 +25,9 @@ export const handleFieldChange = async (complaintId, field, value, updateComplai
       body: JSON.stringify(payload), // Convert payload object to JSON
     });
 
-    if (response.ok) {
-      const responseData = await response.json(); // Parse the JSON response if needed
+    // The function reports an unknown complaint ID as statusCode 404 in the body
+    const responseData = response.ok ? await response.json() : null;
+    if (responseData && responseData.statusCode === 200) {
       updateComplaint(complaintId, field, value);
       if (onSuccess) {
         onSuccess();
@@ -43,7 +44,7 @@ export const handleFieldChange = async (complaintId, field, value, updateComplai
         theme: "dark",
       });
     } else {
-      console.error("Error:", response.statusText);
+      console.error("Error:", responseData ? responseData.message : response.statusText);
       toast("Failed to update field", {
         position: "bottom-right",
         autoClose: 5000,
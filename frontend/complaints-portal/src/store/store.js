@@ -1,5 +1,9 @@
 import { create } from "zustand";
 
+// Changes made in this session are already in the reload they trigger, so their feed deltas leave the counts alone
+const LOCAL_EDIT_WINDOW_MS = 30 * 1000;
+const locallyEdited = new Map();
+
 const useStore = create((set) => ({
   complaints: [],
   appliedFilters: [],
@@ -22,6 +26,7 @@ const useStore = create((set) => ({
   setComplaints: (aComplaints) => set({ complaints: aComplaints }),
   setTotalStatusCounts: (totalStatusCounts) => set({ totalStatusCounts: totalStatusCounts }),
   updateComplaint: (complaintId, field, value) => {
+    locallyEdited.set(complaintId, Date.now());
     set((state) => {
       const complaintIndex = state.complaints.findIndex((complaint) => complaint.complaintId === complaintId);
 
@@ -36,6 +41,42 @@ const useStore = create((set) => ({
       return { complaints: updatedComplaints, refresh: true };
     });
   },
+  // Apply change feed deltas: patch rows on the page, and move status counts when `matches` (see filterMatcher) can tell
+  applyComplaintChanges: (deltas, matches) => {
+    set((state) => {
+      let complaints = state.complaints;
+      const totalStatusCounts = { ...state.totalStatusCounts };
+      let totalComplaints = state.totalComplaints;
+
+      for (const delta of deltas) {
+        const editedAt = locallyEdited.get(delta.complaintId);
+        if (matches && !(editedAt && Date.now() - editedAt < LOCAL_EDIT_WINDOW_MS)) {
+          const before = delta.type === "insert" ? null : { ...delta.keys, ...delta.previous };
+          const after = delta.type === "remove" ? null : delta.keys;
+          if (before && matches(before)) {
+            const key = `Total${before.complaintStatus}`;
+            totalStatusCounts[key] = Math.max((totalStatusCounts[key] || 0) - 1, 0);
+            totalComplaints -= 1;
+          }
+          if (after && matches(after)) {
+            const key = `Total${after.complaintStatus}`;
+            totalStatusCounts[key] = (totalStatusCounts[key] || 0) + 1;
+            totalComplaints += 1;
+            // New complaints show up at the top of the first page
+            if (delta.type === "insert" && state.currentPage === 0 && !complaints.some((complaint) => complaint.complaintId === delta.complaintId)) {
+              complaints = [delta.complaint, ...complaints].slice(0, state.rowsPerPage);
+            }
+          }
+        }
+        if (delta.type === "update") {
+          complaints = complaints.map((complaint) => (complaint.complaintId === delta.complaintId ? { ...complaint, ...delta.changes } : complaint));
+        } else if (delta.type === "remove") {
+          complaints = complaints.filter((complaint) => complaint.complaintId !== delta.complaintId);
+        }
+      }
+      return { complaints, totalStatusCounts, totalComplaints: Math.max(totalComplaints, 0) };
+    });
+  },
   setSelectedRows: (rows) => {
     set({ selectedRows: rows });
   },
@@ -0,0 +1,100 @@
+const CHANGE_FEED_URL = import.meta.env.VITE_CHANGE_FEED_URL;
+
+// Reconnect delays double up to this
+const MAX_RETRY_MS = 30 * 1000;
+// API Gateway closes WebSocket connections idle for 10 minutes
+const PING_INTERVAL_MS = 5 * 60 * 1000;
+
+/**
+ * Open the live change feed, reconnecting with backoff until closed. Without VITE_CHANGE_FEED_URL
+ * the feed is disabled and the returned handle does nothing.
+ *
+ * @param {Function} onChanges - Called with the deltas of every change message.
+ * @param {Function} onResync - Called after a reconnect, since changes may have been missed meanwhile.
+ * @returns {{ subscribe: Function, close: Function }} - subscribe({ beatNumber, complaintStatus }) replaces
+ *   the subscription; no beats or no status means all of them.
+ */
+export const connectChangeFeed = (onChanges, onResync) => {
+  if (!CHANGE_FEED_URL) {
+    return { subscribe: () => {}, close: () => {} };
+  }
+  let socket = null;
+  let subscription = null;
+  let retryMs = 1000;
+  let retryTimer = null;
+  let pingTimer = null;
+  let closed = false;
+  let connectedBefore = false;
+
+  const send = (message) => {
+    if (socket?.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify(message));
+    }
+  };
+
+  const open = () => {
+    socket = new WebSocket(CHANGE_FEED_URL);
+    socket.onopen = () => {
+      retryMs = 1000;
+      if (subscription) {
+        send({ action: "subscribe", ...subscription });
+      }
+      pingTimer = setInterval(() => send({ action: "ping" }), PING_INTERVAL_MS);
+      if (connectedBefore && onResync) {
+        onResync();
+      }
+      connectedBefore = true;
+    };
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === "changes") {
+        onChanges(message.deltas);
+      } else if (message.type === "error") {
+        console.error("Change feed error:", message.message);
+      }
+    };
+    socket.onclose = () => {
+      clearInterval(pingTimer);
+      if (!closed) {
+        retryTimer = setTimeout(open, retryMs);
+        retryMs = Math.min(retryMs * 2, MAX_RETRY_MS);
+      }
+    };
+  };
+  open();
+
+  return {
+    subscribe: (filters) => {
+      subscription = filters;
+      send({ action: "subscribe", ...filters });
+    },
+    close: () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      clearInterval(pingTimer);
+      socket?.close();
+    },
+  };
+};
+
+/**
+ * Predicate telling whether a complaint's keys (beat, status, category, date) pass the filters of a
+ * filter API payload, or null when the filters use times or complaint IDs the keys cannot be checked against.
+ *
+ * @param {Object} payload - The db-filter-query-api request of the current view.
+ * @returns {Function|null}
+ */
+export const filterMatcher = (payload) => {
+  if (payload.startTime || payload.endTime || payload.complaintId?.length) {
+    return null;
+  }
+  const beats = payload.beatNumber || [];
+  const categories = payload.problemCategory || [];
+  const status = typeof payload.complaintStatus === "string" ? payload.complaintStatus : "";
+  return (keys) =>
+    (!beats.length || beats.includes(keys.beatNumber)) &&
+    (!status || keys.complaintStatus === status) &&
+    (!categories.length || categories.includes(keys.problemCategory)) &&
+    (!payload.startDate || keys.dateOfComplaint >= payload.startDate) &&
+    (!payload.endDate || keys.dateOfComplaint <= payload.endDate);
+};
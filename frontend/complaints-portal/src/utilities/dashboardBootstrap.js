@@ -0,0 +1,49 @@
+const API_URL = import.meta.env.VITE_API_URL;
+
+// The bootstrap response is shared by the heatmap and the complaints table for this long
+const MAX_AGE_MS = 60 * 1000;
+
+let pending = null;
+let fetchedAt = 0;
+
+/**
+ * Load the open cases per beat, the status totals and the first page of the unfiltered
+ * complaints table in one request. Callers within MAX_AGE_MS share the same response.
+ *
+ * @returns {Promise<Object>} - { heatmap, complaintsData, page, totalComplaint, totalStatusCounts, totalPages }
+ */
+export const loadDashboardBootstrap = () => {
+  if (!pending || Date.now() - fetchedAt > MAX_AGE_MS) {
+    fetchedAt = Date.now();
+    pending = fetch(API_URL + "dashboard-bootstrap")
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error(`HTTP error! Status: ${response.status}`);
+        }
+        // A 304 from revalidation reaches fetch as the cached 200
+        return response.json();
+      })
+      .catch((error) => {
+        // Let the next caller retry instead of sharing the failure
+        pending = null;
+        throw error;
+      });
+  }
+  return pending;
+};
+
+/**
+ * Whether the filters describe the default, unfiltered first page the bootstrap covers.
+ *
+ * @param {Object} filters - The filters state of the complaints table.
+ * @param {number} page - Zero based table page.
+ * @returns {boolean}
+ */
+export const isDefaultView = (filters, page) =>
+  page === 0 &&
+  !filters.complaintId &&
+  !filters.complaintStatus &&
+  !filters.beatNumber?.length &&
+  !filters.problemCategory?.length &&
+  !filters.dateRange?.some(Boolean) &&
+  !filters.timeRange?.some(Boolean);